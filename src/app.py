@@ -1,10 +1,10 @@
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -39,31 +39,19 @@ def carregar_dados_financeiros():
 def criar_filtros_globais():
     """Criar filtros globais na sidebar que serão aplicados em todas as seções"""
     
-    # Carregar dados dos contratos para popular os filtros
+    # Opções dos filtros vêm do resumo inicial em disco (sem MongoDB na primeira pintura);
+    # sem resumo, de uma única agregação em cache (sem carregar os contratos)
     try:
-        from mongodb_connector import load_contracts_data
-        df_contratos = load_contracts_data(limit=1000)
-        
-        if df_contratos.empty:
-            # Fallback com dados vazios se não conseguir carregar
-            df_contratos = pd.DataFrame({
-                'grainName': [],
-                'status': [],
-                'closeDate': [],
-                'isGrain': [],
-                'isFreight': [],
-                'isService': []
-            })
+        from resumo_inicial import opcoes_iniciais
+        iniciais = opcoes_iniciais()
+        if iniciais:
+            opcoes_filtros = iniciais['filtros']
+        else:
+            from mongodb_connector import load_filter_options
+            opcoes_filtros = load_filter_options(limit=1000)
     except Exception as e:
-        # Fallback com dados vazios em caso de erro
-        df_contratos = pd.DataFrame({
-            'grainName': [],
-            'status': [],
-            'closeDate': [],
-            'isGrain': [],
-            'isFreight': [],
-            'isService': []
-        })
+        # Fallback com opções vazias em caso de erro
+        opcoes_filtros = {}
     
     st.sidebar.markdown("### 🎯 Filtros Principais")
     st.sidebar.markdown("---")
@@ -85,10 +73,7 @@ def criar_filtros_globais():
     
     # 2. Filtro por PRODUTO (segundo principal)
     st.sidebar.markdown("**🌾 Produto**")
-    if not df_contratos.empty:
-        graos_disponiveis = ['Todos'] + sorted([g for g in df_contratos['grainName'].unique() if pd.notna(g) and g != 'Não informado'])
-    else:
-        graos_disponiveis = ['Todos']
+    graos_disponiveis = ['Todos'] + opcoes_filtros.get('graos', [])
     
     grao_selecionado = st.sidebar.selectbox(
         "Produto",  # Label visível
@@ -105,10 +90,7 @@ def criar_filtros_globais():
     # FILTROS SECUNDÁRIOS
     
     # Filtro por status
-    if not df_contratos.empty:
-        status_disponiveis = ['Todos'] + sorted([s for s in df_contratos['status'].unique() if pd.notna(s)])
-    else:
-        status_disponiveis = ['Todos']
+    status_disponiveis = ['Todos'] + opcoes_filtros.get('status', [])
     
     status_selecionado = st.sidebar.selectbox(
         "Status",
@@ -117,13 +99,8 @@ def criar_filtros_globais():
     )
     
     # Filtro por ano
-    if not df_contratos.empty and 'closeDate' in df_contratos.columns:
-        try:
-            anos_validos = df_contratos['closeDate'].dt.year.dropna().unique()
-            anos_contratos = sorted([int(ano) for ano in anos_validos if pd.notna(ano)], reverse=True)
-            anos_opcoes = ['Todos'] + [str(ano) for ano in anos_contratos]
-        except:
-            anos_opcoes = ['Todos', '2025', '2024', '2023']
+    if opcoes_filtros.get('anos'):
+        anos_opcoes = ['Todos'] + [str(ano) for ano in opcoes_filtros['anos']]
     else:
         anos_opcoes = ['Todos', '2025', '2024', '2023']
     
@@ -134,10 +111,7 @@ def criar_filtros_globais():
     )
     
     # Filtro por vendedor
-    if not df_contratos.empty and 'sellerName' in df_contratos.columns:
-        vendedores_disponiveis = ['Todos'] + sorted([v for v in df_contratos['sellerName'].unique() if pd.notna(v) and v != 'Não informado'])
-    else:
-        vendedores_disponiveis = ['Todos']
+    vendedores_disponiveis = ['Todos'] + opcoes_filtros.get('vendedores', [])
     
     vendedor_selecionado = st.sidebar.selectbox(
         "Vendedor",
@@ -167,49 +141,49 @@ def criar_filtros_globais():
         'vendedor': vendedor_selecionado
     }
 
+# Condições (flag, valor) de cada tipo de operação nos filtros globais
+CONDICOES_TIPO_OPERACAO_GLOBAL = {
+    'Supply': [('isBuying', True)],
+    'Originação': [('isBuying', False)],
+    'Frete': [('isFreight', True)],
+    'Clube FX': [('isService', True)]
+}
+
 def aplicar_filtros_globais(df, filtros):
-    """Aplicar os filtros globais a um DataFrame"""
+    """Aplicar os filtros globais a um DataFrame (via índice de filtros do snapshot)"""
     if df.empty:
         return df
     
-    df_filtrado = df.copy()
+    from filtros_indice import filtrar_com_cache
+    condicoes = []
     
     # Filtro por produto
-    if filtros['grao'] != 'Todos' and 'grainName' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['grainName'] == filtros['grao']]
+    if filtros['grao'] != 'Todos' and 'grainName' in df.columns:
+        condicoes.append(('grainName', filtros['grao']))
     
     # Filtro por status
-    if filtros['status'] != 'Todos' and 'status' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['status'] == filtros['status']]
+    if filtros['status'] != 'Todos' and 'status' in df.columns:
+        condicoes.append(('status', filtros['status']))
     
     # Filtro por tipo de operação
-    if filtros['tipo_operacao'] != 'Todos':
-        if filtros['tipo_operacao'] == 'Supply':
-            if 'isBuying' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isBuying'] == True]
-        elif filtros['tipo_operacao'] == 'Originação':
-            if 'isBuying' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isBuying'] == False]
-        elif filtros['tipo_operacao'] == 'Frete':
-            if 'isFreight' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isFreight'] == True]
-        elif filtros['tipo_operacao'] == 'Clube FX':
-            if 'isService' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isService'] == True]
+    for flag, valor in CONDICOES_TIPO_OPERACAO_GLOBAL.get(filtros['tipo_operacao'], []):
+        if flag in df.columns:
+            condicoes.append((flag, valor))
     
     # Filtro por ano
-    if filtros['ano'] != 'Todos' and 'closeDate' in df_filtrado.columns:
+    if filtros['ano'] != 'Todos' and 'closeDate' in df.columns:
         try:
-            ano_int = int(filtros['ano'])
-            df_filtrado = df_filtrado[df_filtrado['closeDate'].dt.year == ano_int]
+            condicoes.append(('ano', int(filtros['ano'])))
         except:
             pass
     
     # Filtro por vendedor
-    if filtros['vendedor'] != 'Todos' and 'sellerName' in df_filtrado.columns:
-        df_filtrado = df_filtrado[df_filtrado['sellerName'] == filtros['vendedor']]
+    if filtros['vendedor'] != 'Todos' and 'sellerName' in df.columns:
+        condicoes.append(('sellerName', filtros['vendedor']))
     
-    return df_filtrado
+    # Visões memorizadas por (snapshot, grao, status, tipo_operacao, ano, vendedor)
+    chave = ('globais', filtros['grao'], filtros['status'], filtros['tipo_operacao'], filtros['ano'], filtros['vendedor'])
+    return filtrar_com_cache(df, chave, condicoes)
 
 # ============================================================================
 # SISTEMA DE IDIOMAS
@@ -564,9 +538,15 @@ def tela_boas_vindas(lang='pt'):
     
     with col3:
         st.markdown(f"**{get_text('data_status', lang)}**")
-        ultima_atualizacao = datetime.now().strftime("%d/%m/%Y às %H:%M:%S")
-        # Informação de última atualização (removida)
-        pass
+        # Última atualização e KPIs do resumo pré-calculado (não espera o MongoDB)
+        from resumo_inicial import ler_resumo
+        resumo = ler_resumo()
+        if resumo:
+            ultima_atualizacao = datetime.fromisoformat(resumo['gerado_em']).strftime("%d/%m/%Y às %H:%M:%S")
+            st.caption(f"Atualizado em {ultima_atualizacao}")
+            for ano, kpis in sorted(resumo['anos'].items(), reverse=True)[:1]:
+                st.metric(f"💵 Receita Líquida {ano}", f"R$ {kpis['receita_liquida']/1000000:.1f}M")
+                st.metric(f"📋 Contratos {ano}", f"{kpis['numero_contratos']:,.0f}")
         
         if st.button(get_text('update_data', lang), key="refresh_welcome"):
             st.rerun()
@@ -904,6 +884,7 @@ def criar_grafico_receita_ebitda_real(dados_consolidados, lang='pt'):
 
 def criar_grafico_distribuicao_real(dados_consolidados, lang='pt'):
     """Gráfico de distribuição por grão com dados reais"""
+    import plotly.express as px
     
     receita_por_grao = dados_consolidados.get('receita_por_grao', {})
     
@@ -997,16 +978,66 @@ def criar_grafico_performance_real(dados_performance, tema, lang='pt'):
 # VISÃO CONSOLIDADA (ATUALIZADA COM IDIOMAS)
 # ============================================================================
 
+def exibir_metricas_principais(valores):
+    """Quatro métricas de cabeçalho da Visão Consolidada (dados consolidados ou resumo pré-calculado)"""
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        receita_liquida = valores['receita_liquida']
+        st.metric(
+            label="💵 Receita Líquida",
+            value=f"R$ {receita_liquida/1000000:.1f}M",
+            delta="+12.5%"
+        )
+    
+    with col2:
+        custo_total = valores['custo_total']
+        st.metric(
+            label="📦 Custo Total",
+            value=f"R$ {custo_total/1000000:.1f}M",
+            delta="+8.2%"
+        )
+    
+    with col3:
+        despesas_operacionais = valores['despesas_operacionais']
+        st.metric(
+            label="💸 Despesas Operacionais",
+            value=f"R$ {despesas_operacionais/1000000:.1f}M",
+            delta="+5.1%"
+        )
+    
+    with col4:
+        margem_liquida = valores['margem_liquida']
+        st.metric(
+            label="📈 Margem Líquida",
+            value=f"{margem_liquida:.1f}%",
+            delta="+2.3pp"
+        )
+
 def visao_consolidada(dados_eda, dados_financeiros, lang='pt', ano_selecionado=2024, filtros_globais=None):
     """Dashboard geral consolidado com dados reais do MongoDB"""
+    import plotly.express as px
     
     st.markdown(f'<h2 style="color: #FFFFFF; border-bottom: 2px solid #C0C0C0; padding-bottom: 0.5rem;">📊 {get_text("consolidated_view", lang)}</h2>', unsafe_allow_html=True)
     
     # Mostrar filtros aplicados se houver
-    if filtros_globais:
-        filtros_ativos = [k for k, v in filtros_globais.items() if v != 'Todos']
-        if filtros_ativos:
-            st.info(f"Filtros aplicados: {', '.join([f'{k}: {v}' for k, v in filtros_globais.items() if v != 'Todos'])}")
+    filtros_ativos = [k for k, v in filtros_globais.items() if v != 'Todos'] if filtros_globais else []
+    if filtros_ativos:
+        st.info(f"Filtros aplicados: {', '.join([f'{k}: {v}' for k, v in filtros_globais.items() if v != 'Todos'])}")
+    
+    # === MÉTRICAS FINANCEIRAS PRINCIPAIS ===
+    st.markdown("### 💰 Métricas Financeiras Principais")
+    
+    # Primeira pintura com o resumo pré-calculado (sem filtros), substituído quando os dados detalhados chegam
+    painel_metricas = st.empty()
+    aviso_resumo = st.empty()
+    if not filtros_ativos:
+        from resumo_inicial import resumo_do_ano
+        resumo = resumo_do_ano(ano_selecionado)
+        if resumo:
+            with painel_metricas.container():
+                exibir_metricas_principais(resumo)
+            aviso_resumo.caption(f"Resumo de {resumo['gerado_em'].strftime('%d/%m/%Y %H:%M')} · carregando dados detalhados...")
     
     # Carregar dados reais do MongoDB
     with st.spinner("Carregando dados consolidados..."):
@@ -1026,54 +1057,21 @@ def visao_consolidada(dados_eda, dados_financeiros, lang='pt', ano_selecionado=2
         except Exception as e:
             usar_dados_reais = False
     
-    # === MÉTRICAS FINANCEIRAS PRINCIPAIS ===
-    st.markdown("### 💰 Métricas Financeiras Principais")
-    
-    if usar_dados_reais:
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            receita_liquida = dados_consolidados['receita_liquida']
-            st.metric(
-                label="💵 Receita Líquida",
-                value=f"R$ {receita_liquida/1000000:.1f}M",
-                delta="+12.5%"
-            )
-        
-        with col2:
-            custo_total = dados_consolidados['custo_total']
-            st.metric(
-                label="📦 Custo Total",
-                value=f"R$ {custo_total/1000000:.1f}M",
-                delta="+8.2%"
-            )
-        
-        with col3:
-            despesas_operacionais = dados_consolidados['despesas_operacionais']
-            st.metric(
-                label="💸 Despesas Operacionais",
-                value=f"R$ {despesas_operacionais/1000000:.1f}M",
-                delta="+5.1%"
-            )
-        
-        with col4:
-            margem_liquida = dados_consolidados['margem_liquida']
-            st.metric(
-                label="📈 Margem Líquida",
-                value=f"{margem_liquida:.1f}%",
-                delta="+2.3pp"
-            )
-    else:
-        # Fallback com dados simulados
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.metric("💵 Receita Líquida", "R$ 185M", "+12.5%")
-        with col2:
-            st.metric("📦 Custo Total", "R$ 142M", "+8.2%")
-        with col3:
-            st.metric("💸 Despesas Operacionais", "R$ 28M", "+5.1%")
-        with col4:
-            st.metric("📈 Margem Líquida", "8.1%", "+2.3pp")
+    aviso_resumo.empty()
+    with painel_metricas.container():
+        if usar_dados_reais:
+            exibir_metricas_principais(dados_consolidados)
+        else:
+            # Fallback com dados simulados
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("💵 Receita Líquida", "R$ 185M", "+12.5%")
+            with col2:
+                st.metric("📦 Custo Total", "R$ 142M", "+8.2%")
+            with col3:
+                st.metric("💸 Despesas Operacionais", "R$ 28M", "+5.1%")
+            with col4:
+                st.metric("📈 Margem Líquida", "8.1%", "+2.3pp")
     
     st.markdown("---")
     
@@ -2291,8 +2289,18 @@ def dre_tempo_real(lang='pt', tema='light', filtros_globais=None):
         if filtros_ativos:
             st.info(f"Filtros aplicados: {', '.join([f'{k}: {v}' for k, v in filtros_globais.items() if v != 'Todos'])}")
     
+    secao_dados_dre(lang, tema)
+
+@st.fragment
+def secao_dados_dre(lang='pt', tema='light'):
+    """
+    Unidade e ano do DRE, tabela e gráficos de evolução.
+
+    Fragmento: trocar unidade ou ano recarrega só o DRE; a tabela é um fragmento
+    aninhado, então trocar o formato dos valores reexecuta apenas a tabela.
+    """
     # Filtros
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
     
     with col1:
         unidade_filtro = st.selectbox(
@@ -2316,13 +2324,6 @@ def dre_tempo_real(lang='pt', tema='light', filtros_globais=None):
             key="dre_ano_filter"
         )
     
-    with col3:
-        formato_valores = st.selectbox(
-            "Formato" if lang == 'pt' else "Format",
-            ["R$ Milhões", "R$ Milhares", "Valores Absolutos"],
-            key="dre_formato_filter"
-        )
-    
     # Carregar dados DRE reais do MongoDB
     with st.spinner("Carregando dados do DRE..."):
         try:
@@ -2331,23 +2332,14 @@ def dre_tempo_real(lang='pt', tema='light', filtros_globais=None):
             
             if dados_dre_reais:
                 dados_dre = dados_dre_reais
-                usar_dados_reais = True
             else:
                 dados_dre = gerar_dados_dre(unidade_filtro, ano_filtro)
-                usar_dados_reais = False
                 
         except Exception as e:
             dados_dre = gerar_dados_dre(unidade_filtro, ano_filtro)
-            usar_dados_reais = False
     
-    # Exibir indicador de fonte dos dados
-    if usar_dados_reais:
-        pass  # Auto-generated pass
-    else:
-        pass  # Empty else block
-
     # Exibir tabela hierárquica
-    exibir_tabela_dre_hierarquica(dados_dre, formato_valores, tema)
+    secao_tabela_dre(dados_dre, tema, lang)
     
     # Gráfico de evolução mensal
     st.markdown('<h3 style="color: inherit; margin: 2rem 0 1rem 0;">📊 Evolução Mensal</h3>', unsafe_allow_html=True)
@@ -2364,6 +2356,220 @@ def dre_tempo_real(lang='pt', tema='light', filtros_globais=None):
         fig_margem = criar_grafico_margem_ebitda(dados_dre, tema, lang)
         st.plotly_chart(fig_margem, use_container_width=True)
 
+@st.fragment
+def secao_tabela_dre(dados_dre, tema, lang='pt'):
+    """Formato dos valores e tabela DRE; trocar o formato ou expandir seções reexecuta só este fragmento"""
+    formato_valores = st.selectbox(
+        "Formato" if lang == 'pt' else "Format",
+        ["R$ Milhões", "R$ Milhares", "Valores Absolutos"],
+        key="dre_formato_filter"
+    )
+    
+    exibir_tabela_dre_hierarquica(dados_dre, formato_valores, tema)
+
+# Linhas principais do DRE: tipo de linha, seção expansível e subcategorias
+ESTRUTURA_DRE = {
+    'RECEITA BRUTA': {
+        'tipo': 'macro',
+        'secao': 'receita_bruta',
+        'subcategorias': ['  Comercialização de Grãos', '  Serviços Logísticos', '  Consultoria']
+    },
+    '(-) DEDUÇÕES E IMPOSTOS': {
+        'tipo': 'macro',
+        'secao': 'deducoes',
+        'subcategorias': ['  ICMS sobre vendas', '  PIS/COFINS', '  ISS (serviços)', '  Outras deduções']
+    },
+    '= RECEITA LÍQUIDA': {
+        'tipo': 'resultado',
+        'secao': None,
+        'subcategorias': []
+    },
+    '(-) CPV': {
+        'tipo': 'macro',
+        'secao': 'cpv',
+        'subcategorias': ['  Compra de grãos', '  Frete de aquisição', '  Armazenagem inicial']
+    },
+    '= LUCRO BRUTO': {
+        'tipo': 'resultado',
+        'secao': None,
+        'subcategorias': []
+    },
+    '(-) DESPESAS OPERACIONAIS': {
+        'tipo': 'macro',
+        'secao': 'despesas_op',
+        'subcategorias': ['  Pessoal e benefícios', '  Marketing e vendas', '  Despesas administrativas']
+    },
+    '= EBITDA': {
+        'tipo': 'resultado',
+        'secao': None,
+        'subcategorias': []
+    },
+    '(-) Depreciação & Amortização': {
+        'tipo': 'linha',
+        'secao': None,
+        'subcategorias': []
+    },
+    '= RESULTADO OPERACIONAL': {
+        'tipo': 'resultado',
+        'secao': None,
+        'subcategorias': []
+    },
+    '(+/-) RESULTADO FINANCEIRO': {
+        'tipo': 'macro',
+        'secao': 'resultado_fin',
+        'subcategorias': ['  Receitas financeiras', '  Despesas financeiras']
+    },
+    '= LUCRO ANTES IR/CSLL': {
+        'tipo': 'resultado',
+        'secao': None,
+        'subcategorias': []
+    },
+    '(-) IR e CSLL': {
+        'tipo': 'linha',
+        'secao': None,
+        'subcategorias': []
+    },
+    '= LUCRO LÍQUIDO': {
+        'tipo': 'resultado_final',
+        'secao': None,
+        'subcategorias': []
+    }
+}
+
+MESES_DRE = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Cores por tema e tipo de linha
+CORES_DRE = {
+    'dark': {
+        'macro': '#2D3748',      # Cinza escuro
+        'resultado': '#1A365D',   # Azul escuro
+        'resultado_final': '#2D5016', # Verde escuro
+        'linha': '#4A5568',       # Cinza médio
+        'subcategoria': '#4A5568', # Cinza médio
+        'texto_macro': '#FFFFFF',
+        'texto_sub': '#E2E8F0'
+    },
+    'light': {
+        'macro': '#E2E8F0',      # Cinza claro
+        'resultado': '#BEE3F8',   # Azul claro
+        'resultado_final': '#C6F6D5', # Verde claro
+        'linha': '#F7FAFC',       # Cinza muito claro
+        'subcategoria': '#F7FAFC', # Cinza muito claro
+        'texto_macro': '#1A202C',
+        'texto_sub': '#4A5568'
+    }
+}
+
+# Peso e tamanho da fonte por tipo de linha
+FONTES_DRE = {
+    'macro': ('bold', '14px'),
+    'resultado': ('bold', '14px'),
+    'resultado_final': ('bold', '16px'),
+    'subcategoria': ('normal', '12px'),
+    'linha': ('normal', '13px')
+}
+
+def _estilos_linhas_dre(cores):
+    """CSS da coluna Conta e das colunas de valores para cada tipo de linha"""
+    estilos = {}
+    for tipo, (peso, tamanho) in FONTES_DRE.items():
+        texto = cores['texto_sub'] if tipo == 'subcategoria' else cores['texto_macro']
+        base = f'background-color: {cores[tipo]}; color: {texto}; font-weight: {peso}; font-size: {tamanho};'
+        recuo = '30px' if tipo == 'subcategoria' else '10px'
+        estilos[tipo] = (
+            f'{base} text-align: left; padding-left: {recuo};',
+            f'{base} text-align: right; padding-right: 10px;'
+        )
+    return estilos
+
+# Estilos precomputados por tema e tipo de linha
+ESTILOS_DRE = {tema: _estilos_linhas_dre(cores) for tema, cores in CORES_DRE.items()}
+
+# Escala (a partir de R$ milhões) e molde de cada formato de exibição
+FORMATOS_DRE = {
+    "R$ Milhões": (1, '{:,.1f}'),
+    "R$ Milhares": (1_000, '{:,.0f}'),
+    "Valores Absolutos": (1_000_000, 'R$ {:,.0f}')
+}
+
+# Troca separadores en-US (1,234.5) por pt-BR (1.234,5)
+SEPARADORES_PT_BR = str.maketrans({',': '.', '.': ','})
+
+def formatar_bloco_dre(valores, formato):
+    """
+    Formata uma matriz de valores do DRE em pt-BR de uma vez.
+
+    Mesmo resultado de formatar_valor_dre célula a célula: o bloco é formatado com
+    um único molde, os separadores são trocados em uma só chamada de translate
+    sobre o texto concatenado e zeros viram "0,0".
+    """
+    valores = np.asarray(valores, dtype=float)
+    if valores.size == 0:
+        return valores.astype(object)
+    escala, molde = FORMATOS_DRE.get(formato, FORMATOS_DRE["Valores Absolutos"])
+    textos = '\x1f'.join(map(molde.format, (valores * escala).ravel().tolist()))
+    formatados = np.array(textos.translate(SEPARADORES_PT_BR).split('\x1f'), dtype=object).reshape(valores.shape)
+    return np.where(valores == 0, '0,0', formatados)
+
+def montar_linhas_dre(contas, secoes_expandidas):
+    """
+    Linhas visíveis do DRE: posição em 'contas', rótulo exibido e tipo de linha.
+
+    Linhas principais seguem ESTRUTURA_DRE; subcategorias entram logo abaixo da
+    linha da sua seção quando ela está expandida.
+    """
+    posicoes_contas = {}
+    for posicao, conta in enumerate(contas):
+        posicoes_contas.setdefault(conta, posicao)
+    
+    posicoes, rotulos, tipos = [], [], []
+    for conta in contas:
+        info = ESTRUTURA_DRE.get(conta)
+        if info is None:
+            continue
+        posicoes.append(posicoes_contas[conta])
+        rotulos.append(conta)
+        tipos.append(info['tipo'])
+        if info['secao'] and secoes_expandidas.get(info['secao'], True):
+            for sub in info['subcategorias']:
+                if sub in posicoes_contas:
+                    posicoes.append(posicoes_contas[sub])
+                    rotulos.append(f"    {sub.strip()}")
+                    tipos.append('subcategoria')
+    return posicoes, rotulos, tipos
+
+def construir_tabela_dre(dados_dre, formato, tema, secoes_expandidas):
+    """
+    Tabela DRE formatada e estilizada (Styler) pronta para st.dataframe.
+
+    Os valores de todas as colunas (meses, ou anos × meses) são formatados como um
+    bloco e os estilos vêm de ESTILOS_DRE pelo tipo de cada linha.
+    """
+    colunas = [coluna for coluna in dados_dre if coluna != 'Conta']
+    posicoes, rotulos, tipos = montar_linhas_dre(dados_dre['Conta'], secoes_expandidas)
+    
+    valores = np.column_stack([np.asarray(dados_dre[coluna], dtype=float) for coluna in colunas]) if colunas else np.empty((len(dados_dre['Conta']), 0))
+    df_exibicao = pd.DataFrame(formatar_bloco_dre(valores[posicoes], formato), columns=colunas)
+    df_exibicao.insert(0, 'Conta', rotulos)
+    
+    estilos = ESTILOS_DRE['dark' if tema == 'dark' else 'light']
+    css_linhas = np.array([estilos[tipo] for tipo in tipos], dtype=object).reshape(len(tipos), 2)
+    css = pd.DataFrame(
+        np.column_stack([css_linhas[:, 0]] + [css_linhas[:, 1]] * len(colunas)),
+        index=df_exibicao.index,
+        columns=df_exibicao.columns
+    )
+    return df_exibicao.style.apply(lambda _: css, axis=None)
+
+def _definir_secoes_dre(secoes, expandida):
+    """Expande ou recolhe todas as seções do DRE (callback dos botões)"""
+    for secao in secoes:
+        st.session_state.dre_expanded_sections[secao] = expandida
+
+def _alternar_secao_dre(secao):
+    """Alterna uma seção do DRE entre expandida e recolhida (callback dos botões)"""
+    st.session_state.dre_expanded_sections[secao] = not st.session_state.dre_expanded_sections[secao]
+
 def exibir_tabela_dre_hierarquica(dados_dre, formato, tema):
     """Exibir tabela DRE com hierarquia e funcionalidade de expandir/recolher"""
     
@@ -2377,224 +2583,38 @@ def exibir_tabela_dre_hierarquica(dados_dre, formato, tema):
             'resultado_fin': True
         }
     
-    # Definir estrutura hierárquica
-    estrutura_hierarquica = {
-        'RECEITA BRUTA': {
-            'tipo': 'macro',
-            'secao': 'receita_bruta',
-            'subcategorias': ['  Comercialização de Grãos', '  Serviços Logísticos', '  Consultoria']
-        },
-        '(-) DEDUÇÕES E IMPOSTOS': {
-            'tipo': 'macro',
-            'secao': 'deducoes',
-            'subcategorias': ['  ICMS sobre vendas', '  PIS/COFINS', '  ISS (serviços)', '  Outras deduções']
-        },
-        '= RECEITA LÍQUIDA': {
-            'tipo': 'resultado',
-            'secao': None,
-            'subcategorias': []
-        },
-        '(-) CPV': {
-            'tipo': 'macro',
-            'secao': 'cpv',
-            'subcategorias': ['  Compra de grãos', '  Frete de aquisição', '  Armazenagem inicial']
-        },
-        '= LUCRO BRUTO': {
-            'tipo': 'resultado',
-            'secao': None,
-            'subcategorias': []
-        },
-        '(-) DESPESAS OPERACIONAIS': {
-            'tipo': 'macro',
-            'secao': 'despesas_op',
-            'subcategorias': ['  Pessoal e benefícios', '  Marketing e vendas', '  Despesas administrativas']
-        },
-        '= EBITDA': {
-            'tipo': 'resultado',
-            'secao': None,
-            'subcategorias': []
-        },
-        '(-) Depreciação & Amortização': {
-            'tipo': 'linha',
-            'secao': None,
-            'subcategorias': []
-        },
-        '= RESULTADO OPERACIONAL': {
-            'tipo': 'resultado',
-            'secao': None,
-            'subcategorias': []
-        },
-        '(+/-) RESULTADO FINANCEIRO': {
-            'tipo': 'macro',
-            'secao': 'resultado_fin',
-            'subcategorias': ['  Receitas financeiras', '  Despesas financeiras']
-        },
-        '= LUCRO ANTES IR/CSLL': {
-            'tipo': 'resultado',
-            'secao': None,
-            'subcategorias': []
-        },
-        '(-) IR e CSLL': {
-            'tipo': 'linha',
-            'secao': None,
-            'subcategorias': []
-        },
-        '= LUCRO LÍQUIDO': {
-            'tipo': 'resultado_final',
-            'secao': None,
-            'subcategorias': []
-        }
-    }
-    
-    # Cores por tema e tipo
-    if tema == 'dark':
-        cores = {
-            'macro': '#2D3748',      # Cinza escuro
-            'resultado': '#1A365D',   # Azul escuro
-            'resultado_final': '#2D5016', # Verde escuro
-            'linha': '#4A5568',       # Cinza médio
-            'subcategoria': '#4A5568', # Cinza médio
-            'texto_macro': '#FFFFFF',
-            'texto_sub': '#E2E8F0'
-        }
-    else:
-        cores = {
-            'macro': '#E2E8F0',      # Cinza claro
-            'resultado': '#BEE3F8',   # Azul claro
-            'resultado_final': '#C6F6D5', # Verde claro
-            'linha': '#F7FAFC',       # Cinza muito claro
-            'subcategoria': '#F7FAFC', # Cinza muito claro
-            'texto_macro': '#1A202C',
-            'texto_sub': '#4A5568'
-        }
-    
     # Controles de expansão
     st.markdown("### 📊 Controles de Visualização")
     col1, col2, col3, col4, col5, col6 = st.columns(6)
     
+    # Callbacks alteram o estado antes do rerun do fragmento, sem st.rerun() extra
+    secoes = list(st.session_state.dre_expanded_sections)
+    
     with col1:
-        pass  # Auto-generated pass
-        if st.button("🔽 Expandir Tudo"):
-            for secao in st.session_state.dre_expanded_sections:
-                st.session_state.dre_expanded_sections[secao] = True
-            st.rerun()
+        st.button("🔽 Expandir Tudo", on_click=_definir_secoes_dre, args=(secoes, True))
     
     with col2:
-        pass  # Auto-generated pass
-        if st.button("🔼 Recolher Tudo"):
-            for secao in st.session_state.dre_expanded_sections:
-                st.session_state.dre_expanded_sections[secao] = False
-            st.rerun()
+        st.button("🔼 Recolher Tudo", on_click=_definir_secoes_dre, args=(secoes, False))
     
     with col3:
         icon = "🔽" if st.session_state.dre_expanded_sections['receita_bruta'] else "▶️"
-        if st.button(f"{icon} Receitas"):
-            st.session_state.dre_expanded_sections['receita_bruta'] = not st.session_state.dre_expanded_sections['receita_bruta']
-            st.rerun()
+        st.button(f"{icon} Receitas", on_click=_alternar_secao_dre, args=('receita_bruta',))
     
     with col4:
         icon = "🔽" if st.session_state.dre_expanded_sections['deducoes'] else "▶️"
-        if st.button(f"{icon} Deduções"):
-            st.session_state.dre_expanded_sections['deducoes'] = not st.session_state.dre_expanded_sections['deducoes']
-            st.rerun()
+        st.button(f"{icon} Deduções", on_click=_alternar_secao_dre, args=('deducoes',))
     
     with col4:
         icon = "🔽" if st.session_state.dre_expanded_sections['cpv'] else "▶️"
-        if st.button(f"{icon} CPV"):
-            st.session_state.dre_expanded_sections['cpv'] = not st.session_state.dre_expanded_sections['cpv']
-            st.rerun()
+        st.button(f"{icon} CPV", on_click=_alternar_secao_dre, args=('cpv',))
     
     with col6:
         icon = "🔽" if st.session_state.dre_expanded_sections['despesas_op'] else "▶️"
-        if st.button(f"{icon} Despesas"):
-            st.session_state.dre_expanded_sections['despesas_op'] = not st.session_state.dre_expanded_sections['despesas_op']
-            st.rerun()
+        st.button(f"{icon} Despesas", on_click=_alternar_secao_dre, args=('despesas_op',))
     
     st.markdown("---")
     
-    # Construir dados para exibição
-    dados_exibicao = []
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-    
-    for conta in dados_dre['Conta']:
-        idx = dados_dre['Conta'].index(conta)
-        
-        # Verificar se é macro categoria
-        if conta in estrutura_hierarquica:
-            info = estrutura_hierarquica[conta]
-            
-            # Adicionar macro categoria
-            linha = {'Conta': conta, 'Tipo': info['tipo'], 'Secao': info['secao']}
-            for mes in meses:
-                valor = dados_dre[mes][idx]
-                linha[mes] = formatar_valor_dre(valor, formato)
-            dados_exibicao.append(linha)
-            
-            # Adicionar subcategorias se expandido
-            if info['secao'] and st.session_state.dre_expanded_sections.get(info['secao'], True):
-                for sub in info['subcategorias']:
-                    pass  # Auto-generated pass
-                    if sub in dados_dre['Conta']:
-                        sub_idx = dados_dre['Conta'].index(sub)
-                        linha_sub = {'Conta': f"    {sub.strip()}", 'Tipo': 'subcategoria', 'Secao': info['secao']}
-                        for mes in meses:
-                            valor = dados_dre[mes][sub_idx]
-                            linha_sub[mes] = formatar_valor_dre(valor, formato)
-                        dados_exibicao.append(linha_sub)
-    
-    # Criar DataFrame
-    df_exibicao = pd.DataFrame(dados_exibicao)
-    
-    # Função para aplicar estilos
-    def aplicar_estilos(row):
-        # Encontrar o tipo da linha baseado no índice
-        idx = row.name
-        if idx < len(dados_exibicao):
-            tipo = dados_exibicao[idx]['Tipo']
-        else:
-            tipo = 'linha'
-            
-        styles = [''] * len(row)
-        
-        if tipo == 'macro':
-            bg_color = cores['macro']
-            text_color = cores['texto_macro']
-            font_weight = 'bold'
-            font_size = '14px'
-        elif tipo == 'resultado':
-            bg_color = cores['resultado']
-            text_color = cores['texto_macro']
-            font_weight = 'bold'
-            font_size = '14px'
-        elif tipo == 'resultado_final':
-            bg_color = cores['resultado_final']
-            text_color = cores['texto_macro']
-            font_weight = 'bold'
-            font_size = '16px'
-        elif tipo == 'subcategoria':
-            bg_color = cores['subcategoria']
-            text_color = cores['texto_sub']
-            font_weight = 'normal'
-            font_size = '12px'
-        else:  # linha
-            bg_color = cores['linha']
-            text_color = cores['texto_macro']
-            font_weight = 'normal'
-            font_size = '13px'
-        
-        for i in range(len(styles)):
-            styles[i] = f'background-color: {bg_color}; color: {text_color}; font-weight: {font_weight}; font-size: {font_size};'
-            if i == 0 and tipo == 'subcategoria':  # Primeira coluna (Conta)
-                styles[i] += ' text-align: left; padding-left: 30px;'
-            elif i == 0:  # Primeira coluna para outros tipos
-                styles[i] += ' text-align: left; padding-left: 10px;'
-            else:  # Colunas de valores
-                styles[i] += ' text-align: right; padding-right: 10px;'
-        
-        return styles
-    
-    # Aplicar estilos e exibir tabela
-    df_styled = df_exibicao.drop(['Tipo', 'Secao'], axis=1).style.apply(aplicar_estilos, axis=1)
+    df_styled = construir_tabela_dre(dados_dre, formato, tema, st.session_state.dre_expanded_sections)
     
     st.markdown("### 📋 Demonstrativo de Resultado do Exercício (DRE)")
     st.dataframe(df_styled, use_container_width=True, height=800)
@@ -2612,158 +2632,9 @@ def formatar_valor_dre(valor, formato):
         return f"R$ {valor*1000000:,.0f}".replace(',', 'X').replace('.', ',').replace('X', '.')
 
 def gerar_dados_dre(unidade, ano):
-    """Gerar dados simulados de DRE por mês com estrutura específica do agronegócio"""
-    
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
-    
-    # Multiplicadores por unidade
-    if unidade == "Fox Grãos":
-        mult_comercializacao = 1.0
-        mult_logistica = 0.6
-        mult_consultoria = 0.0
-    elif unidade == "Fox Log":
-        mult_comercializacao = 0.0
-        mult_logistica = 1.0
-        mult_consultoria = 0.0
-    elif unidade == "Clube FX":
-        mult_comercializacao = 0.0
-        mult_logistica = 0.0
-        mult_consultoria = 1.0
-    else:  # Consolidado
-        mult_comercializacao = 1.0
-        mult_logistica = 1.6
-        mult_consultoria = 1.0
-    
-    # Receitas por linha de negócio (em milhões)
-    comercializacao_graos = [round((15.2 + i * 0.7) * mult_comercializacao, 1) for i in range(12)]
-    servicos_logisticos = [round((8.5 + i * 0.4) * mult_logistica, 1) for i in range(12)]
-    consultoria = [round((2.8 + i * 0.1) * mult_consultoria, 1) for i in range(12)]
-    
-    # Receita Bruta
-    receita_bruta = [round(cg + sl + c, 1) for cg, sl, c in zip(comercializacao_graos, servicos_logisticos, consultoria)]
-    
-    # Deduções e Impostos
-    icms_vendas = [round(sl * 0.045, 1) for sl in servicos_logisticos]  # 4.5% ICMS apenas sobre frete
-    pis_cofins = [round(rb * 0.0365, 1) for rb in receita_bruta]  # 3.65% PIS/COFINS
-    iss_servicos = [round((sl + c) * 0.05, 1) for sl, c in zip(servicos_logisticos, consultoria)]  # 5% ISS sobre serviços
-    outras_deducoes = [round(rb * 0.015, 1) for rb in receita_bruta]  # 1.5% outras deduções
-    
-    total_deducoes = [round(icms + pis + iss + outras, 1) 
-                     for icms, pis, iss, outras in zip(icms_vendas, pis_cofins, iss_servicos, outras_deducoes)]
-    
-    # Receita Líquida
-    receita_liquida = [round(rb - td, 1) for rb, td in zip(receita_bruta, total_deducoes)]
-    
-    # Custo de Produtos Vendidos (CPV) - específico para comercialização de grãos
-    compra_graos = [round(cg * 0.82, 1) for cg in comercializacao_graos]  # 82% do valor de comercialização
-    frete_aquisicao = [round(cg * 0.04, 1) for cg in comercializacao_graos]  # 4% frete
-    armazenagem_inicial = [round(cg * 0.02, 1) for cg in comercializacao_graos]  # 2% armazenagem
-    
-    total_cpv = [round(comp + frete + arm, 1) 
-                for comp, frete, arm in zip(compra_graos, frete_aquisicao, armazenagem_inicial)]
-    
-    # Lucro Bruto
-    lucro_bruto = [round(rl - cpv, 1) for rl, cpv in zip(receita_liquida, total_cpv)]
-    
-    # Despesas Operacionais (SG&A)
-    pessoal_beneficios = [round(rl * 0.08, 1) for rl in receita_liquida]  # 8% pessoal
-    marketing_vendas = [round(rl * 0.03, 1) for rl in receita_liquida]  # 3% marketing
-    despesas_admin = [round(rl * 0.04, 1) for rl in receita_liquida]  # 4% administrativas
-    
-    total_sga = [round(pessoal + mkt + admin, 1) 
-                for pessoal, mkt, admin in zip(pessoal_beneficios, marketing_vendas, despesas_admin)]
-    
-    # EBITDA
-    ebitda = [round(lb - sga, 1) for lb, sga in zip(lucro_bruto, total_sga)]
-    
-    # Depreciação & Amortização
-    depreciacao = [round(rl * 0.015, 1) for rl in receita_liquida]  # 1.5% depreciação
-    
-    # Resultado Operacional
-    resultado_operacional = [round(e - d, 1) for e, d in zip(ebitda, depreciacao)]
-    
-    # Resultado Financeiro
-    receitas_financeiras = [round(rl * 0.008, 1) for rl in receita_liquida]  # 0.8% receitas financeiras
-    despesas_financeiras = [round(rl * 0.012, 1) for rl in receita_liquida]  # 1.2% despesas financeiras
-    resultado_financeiro = [round(rf - df, 1) for rf, df in zip(receitas_financeiras, despesas_financeiras)]
-    
-    # Lucro Antes do IR e CSLL
-    lucro_antes_ir = [round(ro + res_fin, 1) for ro, res_fin in zip(resultado_operacional, resultado_financeiro)]
-    
-    # IR e CSLL
-    ir_csll = [round(max(lai * 0.34, 0), 1) for lai in lucro_antes_ir]  # 34% IR+CSLL
-    
-    # Lucro Líquido
-    lucro_liquido = [round(lai - ir, 1) for lai, ir in zip(lucro_antes_ir, ir_csll)]
-    
-    return {
-        'Conta': [
-            'RECEITA BRUTA',
-            '  Comercialização de Grãos',
-            '  Serviços Logísticos', 
-            '  Consultoria',
-            '(-) DEDUÇÕES E IMPOSTOS',
-            '  ICMS sobre vendas',
-            '  PIS/COFINS',
-            '  ISS (serviços)',
-            '  Outras deduções',
-            '= RECEITA LÍQUIDA',
-            '(-) CPV',
-            '  Compra de grãos',
-            '  Frete de aquisição',
-            '  Armazenagem inicial',
-            '= LUCRO BRUTO',
-            '(-) DESPESAS OPERACIONAIS',
-            '  Pessoal e benefícios',
-            '  Marketing e vendas',
-            '  Despesas administrativas',
-            '= EBITDA',
-            '(-) Depreciação & Amortização',
-            '= RESULTADO OPERACIONAL',
-            '(+/-) RESULTADO FINANCEIRO',
-            '  Receitas financeiras',
-            '  Despesas financeiras',
-            '= LUCRO ANTES IR/CSLL',
-            '(-) IR e CSLL',
-            '= LUCRO LÍQUIDO'
-        ],
-        **{mes: [
-            rb,  # Receita Bruta
-            cg,  # Comercialização de Grãos
-            sl,  # Serviços Logísticos
-            c,   # Consultoria
-            -td, # Total Deduções (negativo)
-            -icms, # ICMS (negativo)
-            -pis,  # PIS/COFINS (negativo)
-            -iss,  # ISS (negativo)
-            -outras, # Outras deduções (negativo)
-            rl,  # Receita Líquida
-            -cpv, # CPV (negativo)
-            -comp, # Compra de grãos (negativo)
-            -frete, # Frete aquisição (negativo)
-            -arm,  # Armazenagem (negativo)
-            lb,  # Lucro Bruto
-            -sga, # SG&A (negativo)
-            -pessoal, # Pessoal (negativo)
-            -mkt,  # Marketing (negativo)
-            -admin, # Administrativas (negativo)
-            ebit,  # EBITDA
-            -dep,  # Depreciação (negativo)
-            ro,    # Resultado Operacional
-            res_fin, # Resultado Financeiro
-            rf,    # Receitas financeiras
-            -df,   # Despesas financeiras (negativo)
-            lai,   # Lucro Antes IR
-            -ir,   # IR/CSLL (negativo)
-            ll     # Lucro Líquido
-        ] for mes, rb, cg, sl, c, td, icms, pis, iss, outras, rl, cpv, comp, frete, arm, lb, sga, pessoal, mkt, admin, ebit, dep, ro, res_fin, rf, df, lai, ir, ll in 
-           zip(meses, receita_bruta, comercializacao_graos, servicos_logisticos, consultoria, 
-               total_deducoes, icms_vendas, pis_cofins, iss_servicos, outras_deducoes,
-               receita_liquida, total_cpv, compra_graos, frete_aquisicao, armazenagem_inicial,
-               lucro_bruto, total_sga, pessoal_beneficios, marketing_vendas, despesas_admin,
-               ebitda, depreciacao, resultado_operacional, resultado_financeiro, 
-               receitas_financeiras, despesas_financeiras, lucro_antes_ir, ir_csll, lucro_liquido)}
-    }
+    """Gerar dados simulados de DRE por mês com estrutura específica do agronegócio (ver dre_modelo)"""
+    from dre_modelo import gerar_dre_simulado
+    return gerar_dre_simulado((unidade,))[unidade]
 
 def formatar_valores_dre(dados, formato):
     """Formatar valores conforme seleção do usuário"""
@@ -3146,6 +3017,129 @@ def main():
 # SEÇÃO DE BALANÇO PATRIMONIAL
 # ============================================================================
 
+def exibir_metricas_sincronizacao(metricas):
+    """Tabela e gráfico das etapas (read/transform/write/commit) de uma sincronização"""
+    import plotly.express as px
+    if not metricas:
+        return
+
+    df_metricas = pd.DataFrame(metricas)
+    fig = px.bar(
+        df_metricas,
+        x='colecao',
+        y='duracao_s',
+        color='etapa',
+        title="Duração por Etapa (s)",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_layout(height=300, xaxis_title="Coleção", yaxis_title="Segundos")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        df_metricas[['colecao', 'etapa', 'duracao_s', 'linhas', 'bytes', 'linhas_por_s']],
+        use_container_width=True,
+        hide_index=True
+    )
+
+def exibir_historico_sincronizacao():
+    """Evolução do tempo de sincronização por etapa ao longo das execuções (tabela sync_runs)"""
+    import plotly.express as px
+    try:
+        from sync_financials import carregar_historico_sync
+        historico = carregar_historico_sync()
+    except Exception as e:
+        st.warning(f"Histórico de sincronizações indisponível: {str(e)}")
+        return
+
+    if historico.empty:
+        st.info("Nenhuma sincronização registrada em 'sync_runs' ainda.")
+        return
+
+    # Soma das coleções por etapa: mostra se a lentidão é de rede (read), transformação ou banco (write/commit)
+    por_etapa = historico.groupby(['started_at', 'stage'], as_index=False)['duration_s'].sum()
+    fig = px.bar(
+        por_etapa,
+        x='started_at',
+        y='duration_s',
+        color='stage',
+        title="Tempo de Sincronização por Etapa",
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_layout(height=350, xaxis_title="Execução", yaxis_title="Segundos")
+    st.plotly_chart(fig, use_container_width=True)
+
+    vazao = historico[historico['stage'] == 'write']
+    fig_vazao = px.line(
+        vazao,
+        x='started_at',
+        y='rows_per_s',
+        color='collection',
+        markers=True,
+        title="Vazão de Escrita (linhas/s)"
+    )
+    fig_vazao.update_layout(height=300, xaxis_title="Execução", yaxis_title="Linhas/s")
+    st.plotly_chart(fig_vazao, use_container_width=True)
+
+def painel_desempenho_habilitado():
+    """Painel de desempenho visível para administradores ou com FOX_PAINEL_DESEMPENHO=1"""
+    from auth import check_permission
+    return check_permission('admin') or os.environ.get('FOX_PAINEL_DESEMPENHO') == '1'
+
+def pagina_desempenho():
+    """Tempo, taxa de acerto do cache e volume por loader do MongoDB (métricas deste processo)"""
+    import plotly.express as px
+    from instrumentacao import exportar_json, exportar_prometheus, iniciado_em, resetar, tabela_metricas
+
+    st.markdown('<h2 style="color: inherit;">⏱️ Desempenho dos Loaders</h2>', unsafe_allow_html=True)
+    st.caption(f"Métricas deste processo desde {iniciado_em:%d/%m/%Y %H:%M:%S}. Tempos inclusivos (um loader inclui os que ele chama).")
+
+    tabela = tabela_metricas()
+    if tabela.empty:
+        st.info("Nenhum loader executado ainda neste processo.")
+        return
+
+    fig = px.bar(
+        tabela.head(15),
+        x='Total (s)',
+        y='Loader',
+        orientation='h',
+        color='Acerto cache',
+        color_continuous_scale='RdYlGn',
+        range_color=(0, 1),
+        title="Tempo Total por Loader (s)"
+    )
+    fig.update_layout(height=450, yaxis={'categoryorder': 'total ascending'}, yaxis_title="")
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(
+        tabela,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Acerto cache': st.column_config.NumberColumn(format="percent"),
+            'Total (s)': st.column_config.NumberColumn(format="%.2f"),
+            'Médio (ms)': st.column_config.NumberColumn(format="%.1f"),
+            'p95 (ms)': st.column_config.NumberColumn(format="%.1f"),
+            'Máx (ms)': st.column_config.NumberColumn(format="%.1f"),
+            'MB': st.column_config.NumberColumn(format="%.2f")
+        }
+    )
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("📥 Métricas (JSON)", exportar_json(), file_name="metricas_loaders.json", mime="application/json")
+    with col2:
+        st.download_button("📥 Métricas (Prometheus)", exportar_prometheus(), file_name="metricas_loaders.prom", mime="text/plain")
+    with col3:
+        st.button("🗑️ Zerar métricas", on_click=resetar, key="zerar_metricas")
+
+@st.fragment
+def secao_historico_sincronizacao():
+    """Histórico das sincronizações sob demanda; o checkbox reexecuta só este fragmento"""
+    # Consulta o PostgreSQL só quando solicitado (o conteúdo de um expander roda mesmo fechado)
+    if st.checkbox("📈 Mostrar histórico de desempenho das sincronizações", key="balanco_historico_sync"):
+        exibir_historico_sincronizacao()
+
 def secao_balanco_patrimonial(lang='pt', ano=2025, filtros_globais=None):
     """Seção de balanço patrimonial com dados reais do MongoDB"""
     
@@ -3185,6 +3179,9 @@ def secao_balanco_patrimonial(lang='pt', ano=2025, filtros_globais=None):
                     if resultado["status"] == "success":
                         st.success(f"✅ Sincronização concluída com sucesso! ({resultado['total_logs']} operações)")
                         
+                        with st.expander("⏱️ Desempenho desta sincronização"):
+                            exibir_metricas_sincronizacao(resultado.get("metricas"))
+
                         # Mostrar logs em um expander
                         with st.expander("📋 Ver logs detalhados da sincronização"):
                             for log in resultado["logs"]:
@@ -3204,7 +3201,37 @@ def secao_balanco_patrimonial(lang='pt', ano=2025, filtros_globais=None):
                                 
                 except Exception as e:
                     st.error(f"Erro ao executar sincronização: {str(e)}")
-    
+
+    with col_btn3:
+        # Verificação rápida: compara contagem e soma por mês e ressincroniza só os meses divergentes
+        if st.button("🔍 Verificar Sincronização", help="Compara MongoDB e PostgreSQL mês a mês e corrige apenas os meses divergentes"):
+            with st.spinner("Verificando sincronização financeira..."):
+                try:
+                    from sync_financials import verificar_sincronizacao_financeira
+                    resultado = verificar_sincronizacao_financeira()
+
+                    if resultado["status"] != "success":
+                        st.error("❌ Erro durante a verificação!")
+                    elif resultado["meses_divergentes"]:
+                        st.warning(
+                            f"⚠️ {len(resultado['meses_divergentes'])} meses divergentes, "
+                            f"{len(resultado['meses_corrigidos'])} ressincronizados."
+                        )
+                    else:
+                        st.success("✅ PostgreSQL confere com o MongoDB.")
+
+                    with st.expander("📋 Ver logs detalhados da verificação"):
+                        for log in resultado["logs"]:
+                            if "[error]" in log:
+                                st.error(log)
+                            else:
+                                st.text(log)
+
+                except Exception as e:
+                    st.error(f"Erro ao executar verificação: {str(e)}")
+
+    secao_historico_sincronizacao()
+
     # Carregar dados do balanço patrimonial
     with st.spinner("Carregando dados do balanço patrimonial..."):
         try:
@@ -3376,6 +3403,14 @@ def main():
     # Aplicar CSS
     aplicar_css_tema("light")
     
+    # Caches aquecidos e resumo da página inicial recalculado em segundo plano (uma thread por processo)
+    from mongodb_connector import aquecer_caches
+    from resumo_inicial import iniciar_atualizacao_resumo
+    from instrumentacao import iniciar_exportacao_prometheus
+    aquecer_caches()
+    iniciar_atualizacao_resumo()
+    iniciar_exportacao_prometheus()
+    
     # Criar filtros globais na sidebar
     filtros_globais = criar_filtros_globais()
     
@@ -3408,6 +3443,8 @@ def main():
             "Balanço Patrimonial",
             get_text('due_diligence', st.session_state.language)
         ]
+        if painel_desempenho_habilitado():
+            opcoes.append("Performance")
         opcao = st.selectbox(
             "Menu",  # Alterado de select_view para Menu
             opcoes,
@@ -3416,10 +3453,15 @@ def main():
         )
     
     with col2:
-        # Carregar anos disponíveis dos dados reais
+        # Carregar anos disponíveis dos dados reais (do resumo inicial, se já existir)
         try:
-            from mongodb_connector import get_available_years
-            anos_disponiveis = get_available_years()
+            from resumo_inicial import opcoes_iniciais
+            iniciais = opcoes_iniciais()
+            if iniciais:
+                anos_disponiveis = iniciais['anos']
+            else:
+                from mongodb_connector import get_available_years
+                anos_disponiveis = get_available_years()
         except:
             # Fallback se houver erro
             anos_disponiveis = [2025, 2024, 2023, 2022, 2021, 2020]
@@ -3482,6 +3524,9 @@ def main():
     elif opcao == get_text('due_diligence', st.session_state.language):
         secao_due_diligence(st.session_state.language, filtros_globais)
     
+    elif opcao == "Performance":
+        pagina_desempenho()
+    
     else:
         st.markdown(f'<h2 style="color: inherit;">🚧 {opcao}</h2>', unsafe_allow_html=True)
 
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+benchmark_desempenho.py
+
+Benchmarks das rotinas de processamento pesado do dashboard, com dados sintéticos.
+Uso: python benchmark_desempenho.py
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Importação robusta do BSON para compatibilidade com diferentes versões
+try:
+    from bson import ObjectId
+except ImportError:
+    from bson.objectid import ObjectId
+import bson
+
+np.random.seed(42)  # Para reprodutibilidade
+
+
+def medir(funcao, *args, repeticoes=1):
+    """Executa a função e retorna (melhor tempo em segundos, último resultado)"""
+    melhor = float('inf')
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+
+def gerar_docs_finances(n_docs):
+    """Gera documentos no formato da collection finances"""
+    datas = np.random.randint(0, 6 * 365 * 86400, n_docs) + 1577836800  # a partir de 2020
+    datas = datas.astype('datetime64[s]').astype(str)
+    datas = np.char.replace(np.char.replace(np.char.replace(datas, '-', ''), 'T', ''), ':', '')
+    valores = np.round(np.random.uniform(-50000, 50000, n_docs), 2)
+    qtd_orders = np.random.randint(0, 4, n_docs)
+    categorias = [ObjectId() for _ in range(50)]
+
+    docs = []
+    for i in range(n_docs):
+        docs.append({
+            "_id": ObjectId(),
+            "date": str(datas[i]) if i % 3 else str(datas[i])[:8],
+            "name": f"Lançamento {i}",
+            "value": float(valores[i]),
+            "category": categorias[i % 50],
+            "account_id": "conta",
+            "orders": [ObjectId() for _ in range(qtd_orders[i])],
+            "isForecast": bool(i % 7 == 0)
+        })
+    return docs
+
+
+def benchmark_transformacao_finances(n_docs=1_000_000):
+    """Compara o laço por documento original com a transformação colunar de sync_financials"""
+    from sync_financials import safe_val, parse_date, transformar_finances_colunar
+
+    def transformacao_legada(fin_docs):
+        fin_records = []
+        for doc in fin_docs:
+            orders_json = json.dumps([str(o) for o in doc.get("orders", [])])
+            fin_records.append((
+                safe_val(doc.get("_id")),
+                parse_date(doc.get("date")),
+                safe_val(doc.get("name")),
+                doc.get("value"),
+                safe_val(doc.get("category")),
+                safe_val(doc.get("account_id")),
+                orders_json,
+                bool(doc.get("isForecast", False))
+            ))
+        return fin_records
+
+    docs = gerar_docs_finances(n_docs)
+    tempo_legado, _ = medir(transformacao_legada, docs)
+    tempo_colunar, (registros, _) = medir(transformar_finances_colunar, docs)
+
+    # Referência: decodificar os mesmos documentos do BSON (o que o pymongo faz antes da transformação)
+    bson_docs = b''.join(map(bson.encode, docs))
+    tempo_bson, _ = medir(bson.decode_all, bson_docs)
+
+    print(f"finances ({n_docs:,} docs)")
+    print(f"- laço por documento: {tempo_legado:.2f}s")
+    print(f"- colunar:            {tempo_colunar:.2f}s ({tempo_legado / tempo_colunar:.1f}x)")
+    print(f"- decodificação BSON: {tempo_bson:.2f}s (colunar = {tempo_colunar / tempo_bson:.0%} da decodificação)")
+    return registros
+
+
+def gerar_contratos(n_contratos):
+    """Gera um DataFrame no formato processado de contratos (colunas usadas pelo mapa)"""
+    import pandas as pd
+
+    tipos = np.array(['Supply', 'Originação', 'Frete', 'Clube FX'], dtype=object)
+    cidades = np.array([f'Cidade {i}' for i in range(400)], dtype=object)
+    estados = np.array(['GO', 'MT', 'MS', 'PR', 'BA', 'MG'], dtype=object)
+    graos = np.array(['Soja', 'Milho', 'Trigo', 'Sorgo'], dtype=object)
+
+    # Coordenadas repetidas por cidade (como endereços reais), com alguns pontos sem localização
+    lat_cidades = np.random.uniform(-30, -5, 400).astype('float32')
+    lng_cidades = np.random.uniform(-60, -40, 400).astype('float32')
+    cidade_to = np.random.randint(0, 400, n_contratos)
+    cidade_from = np.random.randint(0, 400, n_contratos)
+    sem_local = np.random.random(n_contratos) < 0.1
+
+    df = pd.DataFrame({
+        'tipoOperacao': tipos[np.random.randint(0, 4, n_contratos)],
+        'toLat': np.where(sem_local, np.nan, lat_cidades[cidade_to]).astype('float32'),
+        'toLng': np.where(sem_local, np.nan, lng_cidades[cidade_to]).astype('float32'),
+        'fromLat': lat_cidades[cidade_from],
+        'fromLng': lng_cidades[cidade_from],
+        'toCity': cidades[cidade_to],
+        'fromCity': cidades[cidade_from],
+        'toState': estados[cidade_to % 6],
+        'fromState': estados[cidade_from % 6],
+        'grainName': graos[np.random.randint(0, 4, n_contratos)],
+        'amount': np.random.randint(100, 10000, n_contratos).astype(float),
+        'bagPrice': np.round(np.random.uniform(50, 150, n_contratos), 2)
+    })
+    df['valorTotal'] = df['amount'] * df['bagPrice']
+    for coluna in ['tipoOperacao', 'toCity', 'fromCity', 'toState', 'fromState', 'grainName']:
+        df[coluna] = df[coluna].astype('category')
+    return df
+
+
+def benchmark_mapa_contratos(n_contratos=50_000):
+    """Compara o laço iterrows original do mapa com construir_pontos_mapa de contratos_reais"""
+    import pandas as pd
+    from contratos_reais import construir_pontos_mapa
+
+    def pontos_legado(df):
+        map_data = []
+        for _, row in df.iterrows():
+            tipo_operacao = row.get('tipoOperacao', '')
+            if tipo_operacao == 'Supply':
+                prefixo = 'to'
+            elif tipo_operacao == 'Originação':
+                prefixo = 'from'
+            else:
+                continue
+            lat = row.get(f'{prefixo}Lat')
+            lon = row.get(f'{prefixo}Lng')
+            if pd.isna(lat) or pd.isna(lon):
+                continue
+            map_data.append({
+                'lat': float(lat),
+                'lon': float(lon),
+                'quantidade': float(row.get('amount', 0)) if pd.notna(row.get('amount', 0)) else 0,
+                'valor': float(row.get('valorTotal', 0)) if pd.notna(row.get('valorTotal', 0)) else 0,
+                'tipo': tipo_operacao,
+                'cidade': str(row.get(f'{prefixo}City', 'Não informado')),
+                'estado': str(row.get(f'{prefixo}State', 'Não informado')),
+                'produto': str(row.get('grainName', 'Não informado')),
+                'preco': float(row.get('bagPrice', 0)) if pd.notna(row.get('bagPrice', 0)) else 0
+            })
+        df_map = pd.DataFrame(map_data)
+        return df_map.groupby(['lat', 'lon', 'cidade', 'estado', 'tipo']).agg({
+            'quantidade': 'sum',
+            'valor': 'sum',
+            'produto': lambda x: ', '.join(x.unique()),
+            'preco': 'mean'
+        }).reset_index()
+
+    df = gerar_contratos(n_contratos)
+    tempo_legado, esperado = medir(pontos_legado, df)
+    tempo_colunar, pontos = medir(construir_pontos_mapa, df, repeticoes=3)
+
+    pd.testing.assert_frame_equal(pontos, esperado, check_dtype=False)
+    print(f"mapa de contratos ({n_contratos:,} contratos, {len(pontos):,} pontos)")
+    print(f"- laço iterrows: {tempo_legado:.2f}s")
+    print(f"- colunar:       {tempo_colunar:.3f}s ({tempo_legado / tempo_colunar:.0f}x)")
+    return pontos
+
+
+def benchmark_mapa_em_grade(n_contratos=200_000):
+    """Marcadores e tempo do mapa com coordenadas dispersas (uma localização por contrato)"""
+    from contratos_reais import construir_pontos_mapa, construir_pontos_mapa_em_grade
+    from mapa_grade import MAX_PONTOS_MAPA
+
+    df = gerar_contratos(n_contratos)
+    for prefixo in ('to', 'from'):
+        df[f'{prefixo}Lat'] = np.random.uniform(-30, -5, n_contratos).astype('float32')
+        df[f'{prefixo}Lng'] = np.random.uniform(-60, -40, n_contratos).astype('float32')
+
+    tempo_exato, exatos = medir(construir_pontos_mapa, df)
+    tempo_grade, (pontos, precisao) = medir(construir_pontos_mapa_em_grade, df, repeticoes=3)
+
+    assert len(pontos) <= MAX_PONTOS_MAPA
+    assert np.isclose(pontos['quantidade'].sum(), exatos['quantidade'].sum())
+    print(f"mapa em grade ({n_contratos:,} contratos)")
+    print(f"- localizações exatas: {len(exatos):,} pontos em {tempo_exato:.2f}s")
+    print(f"- geohash precisão {precisao}: {len(pontos):,} pontos em {tempo_grade:.2f}s")
+    return pontos
+
+
+def benchmark_cenarios_dre(n_cenarios=10_000):
+    """Cenários Monte Carlo (todas as premissas ±20%) sobre o DRE simulado das quatro unidades"""
+    from dre_modelo import MULTIPLICADORES_DRE, PREMISSAS_DRE, avaliar_dre, entradas_simuladas
+    from cenarios_dre import avaliar_cenarios, resumir_cenarios, sortear_cenarios
+
+    unidades = list(MULTIPLICADORES_DRE)
+    entradas = entradas_simuladas(unidades)
+    faixas = {premissa: (taxa * 0.8, taxa * 1.2) for premissa, taxa in PREMISSAS_DRE.items()}
+    cenarios = sortear_cenarios(n_cenarios, faixas, semente=42)
+
+    tempo, resultados = medir(avaliar_cenarios, entradas, cenarios, repeticoes=3)
+
+    # O cenário com as premissas padrão reproduz o DRE avaliado diretamente
+    base = avaliar_cenarios(entradas, {premissa: [taxa] for premissa, taxa in PREMISSAS_DRE.items()})
+    assert np.allclose(base['lucro_liquido'][0], avaliar_dre(entradas)['lucro_liquido'].sum(axis=-1))
+
+    print(f"cenários do DRE ({n_cenarios:,} cenários x {len(unidades)} unidades x 12 meses)")
+    print(f"- avaliação vetorizada: {tempo:.3f}s")
+    return resumir_cenarios(resultados, unidades)
+
+
+# Dependências que não devem ser carregadas só por abrir o app
+IMPORTS_SOB_DEMANDA = ('plotly.express', 'pymongo', 'psycopg2')
+
+
+def benchmark_importacao(modulo='app', top=15):
+    """Auditoria de cold start: python -X importtime do módulo, com os imports mais caros"""
+    diretorio = os.path.dirname(os.path.abspath(__file__))
+    saida = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=diretorio, capture_output=True, text=True, check=True
+    ).stderr
+
+    # Linhas "import time: self [us] | cumulative | pacote" (a indentação do nome indica a profundidade)
+    tempos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        tempos[nome.strip()] = int(acumulado) / 1e6
+
+    carregados = [nome for nome in IMPORTS_SOB_DEMANDA if nome in tempos]
+    assert not carregados, f"Importados na inicialização: {', '.join(carregados)}"
+
+    print(f"importação de {modulo}: {tempos[modulo]:.2f}s")
+    for nome, tempo in sorted(tempos.items(), key=lambda item: -item[1])[1:top + 1]:
+        print(f"- {nome}: {tempo:.3f}s")
+    return tempos
+
+
+if __name__ == "__main__":
+    print("Executando benchmarks de desempenho...\n")
+    benchmark_importacao()
+    print()
+    benchmark_importacao('mongodb_connector', top=5)
+    print()
+    benchmark_transformacao_finances()
+    print()
+    benchmark_mapa_contratos()
+    print()
+    benchmark_mapa_em_grade()
+    print()
+    benchmark_cenarios_dre()
@@ -0,0 +1,408 @@
+"""
+Segundo nível de cache, compartilhado entre processos, para os loaders do MongoDB.
+
+O st.cache_data dos loaders vive só na memória do processo: cada deploy ou
+reinício começa frio, e cada réplica repete as mesmas agregações pesadas do
+MongoDB. Aqui os resultados ficam num armazenamento compartilhado (por padrão,
+um diretório local com um manifesto JSON que guarda, por entrada, o arquivo e
+a versão da origem no momento da gravação): DataFrames em Parquet, dicionários,
+listas (opções de filtros, métricas, dados consolidados) e DataFrames com
+colunas object em pickle, para que a leitura devolva o mesmo que o MongoDB.
+
+A versão vem de uma sonda barata (ex.: maior updatedAt + contagem de cada coleção
+lida, ver mongodb_connector.versao_contratos). Se a sonda devolve a mesma versão do
+armazenamento, o resultado é lido de lá em vez de reagregado; se a sonda
+falha (None), o armazenamento é ignorado.
+
+Quando a versão muda, só um processo consulta o MongoDB: o recálculo de cada
+chave é feito sob uma trava exclusiva entre processos (flock), e quem
+esperava relê o resultado gravado. Com N réplicas apontando para o mesmo
+diretório (FOX_CACHE_DISCO), a carga no MongoDB fica em uma agregação por
+mudança de versão, mais as sondas.
+
+Ordem de consulta: st.cache_data (memória) -> armazenamento (versão conferida) -> MongoDB.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from instrumentacao import anotar
+
+try:
+    import fcntl
+except ImportError:  # Windows: travas valem só dentro do processo
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DIRETORIO_CACHE_DISCO = os.environ.get(
+    'FOX_CACHE_DISCO', os.path.join(tempfile.gettempdir(), 'fox_cache_disco')
+)
+ARQUIVO_MANIFESTO = 'manifesto.json'
+
+# Muda quando o formato dos arquivos muda (entradas de outro formato são ignoradas)
+FORMATO_CACHE_DISCO = 3
+
+# Segundos em que o resultado de uma sonda de versão é reaproveitado (evita uma sonda por loader no mesmo rerun)
+TTL_SONDA = 30
+
+# Espera máxima (s) pela trava de uma chave; depois disso o processo carrega sem coordenação
+TEMPO_MAXIMO_TRAVA = 120
+
+# Intervalo (s) entre tentativas de obter uma trava ocupada
+INTERVALO_TRAVA = 0.1
+
+_travas_locais = {}
+_lock_travas_locais = threading.Lock()
+
+_sondas = {}
+_travas_sondas = {}
+_lock_sondas = threading.Lock()
+
+_thread_aquecimento = None
+_lock_aquecimento = threading.Lock()
+
+
+def _trava_local(caminho):
+    with _lock_travas_locais:
+        return _travas_locais.setdefault(caminho, threading.Lock())
+
+
+@contextmanager
+def _obter_trava(trava, espera):
+    """threading.Lock com espera máxima; yields True se obtida"""
+    obtida = trava.acquire(timeout=espera) if espera > 0 else trava.acquire(blocking=False)
+    try:
+        yield obtida
+    finally:
+        if obtida:
+            trava.release()
+
+
+@contextmanager
+def trava_arquivo(caminho, espera=TEMPO_MAXIMO_TRAVA):
+    """
+    Trava exclusiva entre processos (flock) sobre um arquivo de trava.
+
+    Sem fcntl (Windows), a trava vale só entre as threads do processo.
+
+    Yields:
+        True se a trava foi obtida em até 'espera' segundos (0 = não espera), senão False
+    """
+    if fcntl is None:
+        with _obter_trava(_trava_local(caminho), espera) as obtida:
+            yield obtida
+        return
+
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'a') as arquivo:
+        limite = time.monotonic() + espera
+        while True:
+            try:
+                fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= limite:
+                    yield False
+                    return
+                time.sleep(INTERVALO_TRAVA)
+        try:
+            yield True
+        finally:
+            fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def _gravar_atomico(caminho, escrever):
+    """Grava num arquivo temporário do mesmo diretório e troca com os.replace (leitores nunca veem arquivo parcial)"""
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.tmp_')
+    os.close(descritor)
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except Exception:
+        if os.path.exists(temporario):
+            os.unlink(temporario)
+        raise
+
+
+def _em_parquet(df):
+    """
+    True se o DataFrame volta do Parquet igual: sem colunas object.
+
+    Colunas object (ObjectId, dicionários, mistura de int e str) não têm
+    representação exata no Arrow; esses DataFrames vão em pickle.
+    """
+    return not (df.dtypes == object).any()
+
+
+class ArmazenamentoArquivos:
+    """
+    Armazenamento padrão: um arquivo por chave e um manifesto JSON num diretório.
+
+    DataFrames sem colunas object vão em Parquet; os demais valores (DataFrames
+    com ObjectId ou dicionários, dicionários, listas) em pickle, que só deve ser
+    lido de um diretório gravado pelo próprio dashboard.
+
+    Outro backend (ex.: Redis) pode ser usado com definir_armazenamento, desde que
+    ofereça ler(chave, versao), gravar(chave, valor, versao) e trava(chave, espera).
+    """
+
+    def __init__(self, diretorio=DIRETORIO_CACHE_DISCO):
+        self.diretorio = diretorio
+
+    def _caminho(self, nome):
+        return os.path.join(self.diretorio, nome)
+
+    def _arquivo(self, chave):
+        return hashlib.sha1(chave.encode('utf-8')).hexdigest()[:16]
+
+    def ler_manifesto(self):
+        """Manifesto {chave: {'arquivo', 'versao', 'gravado_em', 'linhas'}} (vazio se ausente, ilegível ou de outro formato)"""
+        try:
+            with open(self._caminho(ARQUIVO_MANIFESTO), encoding='utf-8') as arquivo:
+                manifesto = json.load(arquivo)
+        except (OSError, ValueError):
+            return {}
+        if manifesto.get('formato') != FORMATO_CACHE_DISCO:
+            return {}
+        return manifesto.get('entradas', {})
+
+    def ler(self, chave, versao):
+        """Valor gravado para a chave, se a versão do manifesto for a informada; senão None"""
+        entrada = self.ler_manifesto().get(chave)
+        if entrada is None or entrada['versao'] != versao:
+            return None
+        caminho = self._caminho(entrada['arquivo'])
+        try:
+            if caminho.endswith('.pkl'):
+                with open(caminho, 'rb') as arquivo:
+                    return pickle.load(arquivo)
+            return pd.read_parquet(caminho, engine='pyarrow')
+        except Exception as e:
+            logger.warning(f"Erro ao ler cache em disco '{chave}': {str(e)}")
+            return None
+
+    def gravar(self, chave, valor, versao):
+        """Grava o valor (Parquet ou pickle) e registra a entrada (com a versão da origem) no manifesto"""
+        if isinstance(valor, pd.DataFrame) and _em_parquet(valor):
+            arquivo = self._arquivo(chave) + '.parquet'
+            _gravar_atomico(self._caminho(arquivo), lambda caminho: valor.to_parquet(caminho, engine='pyarrow'))
+        else:
+            arquivo = self._arquivo(chave) + '.pkl'
+
+            def serializar(caminho):
+                with open(caminho, 'wb') as destino:
+                    pickle.dump(valor, destino, protocol=pickle.HIGHEST_PROTOCOL)
+
+            _gravar_atomico(self._caminho(arquivo), serializar)
+
+        # Leitura-modificação-escrita do manifesto serializada entre processos
+        with trava_arquivo(self._caminho(ARQUIVO_MANIFESTO + '.lock')) as obtida:
+            if not obtida:
+                logger.warning(f"Manifesto ocupado; entrada '{chave}' não registrada")
+                return
+            entradas = self.ler_manifesto()
+            entradas[chave] = {
+                'arquivo': arquivo,
+                'versao': versao,
+                'gravado_em': datetime.now().isoformat(timespec='seconds'),
+                'linhas': len(valor)
+            }
+            conteudo = {'formato': FORMATO_CACHE_DISCO, 'entradas': entradas}
+
+            def escrever(caminho):
+                with open(caminho, 'w', encoding='utf-8') as destino:
+                    json.dump(conteudo, destino, indent=1, default=str)
+
+            _gravar_atomico(self._caminho(ARQUIVO_MANIFESTO), escrever)
+
+    def trava(self, chave, espera=TEMPO_MAXIMO_TRAVA):
+        """Trava exclusiva entre processos da chave (ver trava_arquivo)"""
+        return trava_arquivo(self._caminho(self._arquivo(chave) + '.lock'), espera)
+
+
+def _copiar(valor):
+    return valor.copy() if isinstance(valor, pd.DataFrame) else copy.deepcopy(valor)
+
+
+def _vazio(valor):
+    """DataFrame sem linhas, None ou coleção vazia: resultado de falha ou sem dados, que não é gravado"""
+    if isinstance(valor, pd.DataFrame):
+        return valor.empty
+    return not valor
+
+
+class ArmazenamentoMemoria:
+    """
+    Armazenamento dentro do processo, com a mesma interface de ArmazenamentoArquivos.
+
+    Serve para testes e para uma única réplica sem disco gravável; as travas
+    valem só entre as threads do processo.
+    """
+
+    def __init__(self):
+        self.entradas = {}
+        self._travas = {}
+        self._lock = threading.Lock()
+
+    def ler(self, chave, versao):
+        """Cópia do valor gravado para a chave, se a versão for a informada; senão None"""
+        with self._lock:
+            entrada = self.entradas.get(chave)
+        if entrada is None or entrada[0] != versao:
+            return None
+        return _copiar(entrada[1])
+
+    def gravar(self, chave, valor, versao):
+        """Guarda uma cópia do valor com a versão da origem"""
+        with self._lock:
+            self.entradas[chave] = (versao, _copiar(valor))
+
+    def trava(self, chave, espera=TEMPO_MAXIMO_TRAVA):
+        """Trava exclusiva da chave entre as threads do processo"""
+        with self._lock:
+            trava = self._travas.setdefault(chave, threading.Lock())
+        return _obter_trava(trava, espera)
+
+
+_armazenamento = ArmazenamentoArquivos()
+
+
+def definir_armazenamento(armazenamento):
+    """Troca o armazenamento compartilhado (ex.: outro diretório ou outro backend)"""
+    global _armazenamento
+    _armazenamento = armazenamento
+
+
+def obter_armazenamento():
+    """Armazenamento compartilhado em uso"""
+    return _armazenamento
+
+
+def versao_com_cache(nome, sonda):
+    """
+    Resultado da sonda de versão, reaproveitado por TTL_SONDA segundos (None se a sonda falhar).
+
+    Threads que pedem a mesma sonda ao mesmo tempo esperam uma única consulta.
+    """
+    with _lock_sondas:
+        trava = _travas_sondas.setdefault(nome, threading.Lock())
+
+    with trava:
+        anterior = _sondas.get(nome)
+        if anterior is not None and time.monotonic() - anterior[0] < TTL_SONDA:
+            return anterior[1]
+        try:
+            versao = sonda()
+        except Exception as e:
+            logger.warning(f"Erro na sonda de versão '{nome}': {str(e)}")
+            versao = None
+        _sondas[nome] = (time.monotonic(), versao)
+        return versao
+
+
+def _janela_idade(idade_maxima):
+    """Número da janela de 'idade_maxima' segundos do relógio (igual em todas as réplicas)"""
+    return int(time.time() // idade_maxima)
+
+
+def em_disco(nome, sonda, idade_maxima=None):
+    """
+    Decorador do segundo nível de cache para loaders (DataFrame, dicionário ou lista).
+
+    Deve ficar abaixo do st.cache_data, que continua sendo o primeiro nível.
+    Em caso de falta, o loader roda sob a trava da chave (um processo por vez);
+    quem esperava pela trava relê o que foi gravado. Resultados vazios (falha
+    ou ausência de dados) não são gravados.
+
+    Com idade_maxima, a versão inclui a janela do relógio: uma entrada vale no
+    máximo idade_maxima segundos mesmo que a sonda não mude (para origens que a
+    sonda não enxerga por inteiro, como as coleções de um $lookup sem updatedAt).
+
+    Args:
+        nome: prefixo das chaves no armazenamento (a chave inclui os argumentos da chamada)
+        sonda: função sem argumentos que devolve a versão atual da origem (str) ou None
+        idade_maxima: segundos de validade de uma entrada (None = só a sonda decide)
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            versao = versao_com_cache(nome, sonda)
+            if versao is None:
+                return funcao(*args, **kwargs)
+            if idade_maxima:
+                versao = f"{versao}|{_janela_idade(idade_maxima)}"
+
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            chave = f"{nome}({', '.join(f'{k}={v!r}' for k, v in argumentos.arguments.items())})"
+            armazenamento = obter_armazenamento()
+
+            valor = armazenamento.ler(chave, versao)
+            if valor is not None:
+                logger.info(f"Cache compartilhado: '{chave}' lido ({len(valor)} itens)")
+                anotar('disco_acertos')
+                return valor
+
+            with armazenamento.trava(chave) as obtida:
+                if obtida:
+                    # Outro processo pode ter gravado esta versão enquanto esperávamos
+                    valor = armazenamento.ler(chave, versao)
+                    if valor is not None:
+                        logger.info(f"Cache compartilhado: '{chave}' gravado por outro processo")
+                        anotar('disco_acertos_apos_espera')
+                        return valor
+                else:
+                    logger.warning(f"Trava de '{chave}' não obtida em {TEMPO_MAXIMO_TRAVA}s; carregando sem coordenação")
+
+                anotar('disco_faltas')
+                valor = funcao(*args, **kwargs)
+                if not _vazio(valor):
+                    try:
+                        armazenamento.gravar(chave, valor, versao)
+                    except Exception as e:
+                        logger.warning(f"Erro ao gravar cache em disco '{chave}': {str(e)}")
+                return valor
+
+        return envoltorio
+    return decorador
+
+
+def iniciar_aquecimento(carregadores):
+    """
+    Chama os loaders numa thread em segundo plano (uma vez por processo).
+
+    Logo após um reinício, os loaders leem o disco (versão conferida pela sonda) e
+    preenchem o st.cache_data antes do primeiro acesso às páginas.
+    """
+    global _thread_aquecimento
+
+    def aquecer():
+        for carregar in carregadores:
+            try:
+                carregar()
+            except Exception as e:
+                logger.warning(f"Erro ao aquecer cache: {str(e)}")
+
+    with _lock_aquecimento:
+        if _thread_aquecimento is None:
+            _thread_aquecimento = threading.Thread(target=aquecer, name='aquecimento_cache', daemon=True)
+            _thread_aquecimento.start()
+        return _thread_aquecimento
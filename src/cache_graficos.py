@@ -0,0 +1,71 @@
+"""
+Cache dos gráficos de contratos.
+
+Cada gráfico é separado em agregação (DataFrame -> dados agregados) e desenho
+(dados agregados + tema -> figura Plotly). Os dois resultados ficam em memória
+por (snapshot, chave dos filtros, id do gráfico), a figura também pelo tema,
+e a figura é guardada serializada em JSON. Reruns disparados por widgets que
+não mudam os filtros apenas desserializam a figura; trocar o tema redesenha
+sem reagregar.
+"""
+
+from collections import OrderedDict
+import threading
+
+import plotly.io as pio
+
+from filtros_indice import versao_snapshot
+
+# Entradas mantidas em memória (dados agregados e figuras, LRU)
+MAX_ENTRADAS_GRAFICOS = 128
+
+_entradas = OrderedDict()
+_lock_entradas = threading.Lock()
+
+
+def _obter(chave):
+    with _lock_entradas:
+        valor = _entradas.get(chave)
+        if valor is not None:
+            _entradas.move_to_end(chave)
+        return valor
+
+
+def _guardar(chave, valor):
+    with _lock_entradas:
+        _entradas[chave] = valor
+        while len(_entradas) > MAX_ENTRADAS_GRAFICOS:
+            _entradas.popitem(last=False)
+
+
+def figura_em_cache(df, chave_filtros, id_grafico, tema, agregar, desenhar):
+    """
+    Figura Plotly do gráfico, reaproveitando dados agregados e figura já calculados.
+
+    Sem chave de filtros ou sem versão de snapshot a figura é construída sem cache.
+
+    Args:
+        df: DataFrame de contratos (já filtrado)
+        chave_filtros: tupla que identifica os filtros aplicados ao snapshot
+        id_grafico: identificador do gráfico (ex.: 'contratos_mensais')
+        tema: tema da página ('escuro' ou 'claro')
+        agregar: função df -> dados agregados
+        desenhar: função (dados agregados, tema) -> go.Figure
+    """
+    versao = versao_snapshot(df)
+    if versao is None or chave_filtros is None:
+        return desenhar(agregar(df), tema)
+
+    base = (versao,) + tuple(chave_filtros) + (id_grafico,)
+    figura_json = _obter(('figura',) + base + (tema,))
+    if figura_json is not None:
+        return pio.from_json(figura_json)
+
+    dados = _obter(('dados',) + base)
+    if dados is None:
+        dados = agregar(df)
+        _guardar(('dados',) + base, dados)
+
+    fig = desenhar(dados, tema)
+    _guardar(('figura',) + base + (tema,), fig.to_json())
+    return fig
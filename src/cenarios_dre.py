@@ -0,0 +1,146 @@
+"""
+Cenários "e se" para as premissas do DRE.
+
+As taxas de PREMISSAS_DRE (ICMS, PIS/COFINS, ISS, CPV, IR/CSLL...) viram
+parâmetros: uma grade de valores ou sorteios Monte Carlo geram milhares de
+cenários, avaliados de uma vez pelo modelo de dre_modelo sobre as receitas
+mensais já agregadas (matriz unidade × mês). O resultado é a distribuição do
+EBITDA e do lucro líquido anual de cada unidade.
+
+Por enquanto é só biblioteca: nenhuma página do painel chama
+cenarios_dre_mongo; ela serve para análises no console ou num notebook.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from dre_modelo import PREMISSAS_DRE, avaliar_dre
+
+# Cenários avaliados por vez (limita a memória: cenários × unidades × meses por linha do DRE)
+LOTE_CENARIOS = 2_000
+
+# Linhas do DRE resumidas por cenário (soma anual)
+METRICAS_CENARIOS = ('ebitda', 'lucro_liquido')
+
+
+def grade_cenarios(faixas):
+    """
+    Todas as combinações de valores das premissas informadas.
+
+    Args:
+        faixas: premissa -> lista de valores (ex.: {'icms': [0.04, 0.045], 'ir_csll': [0.34]})
+
+    Returns:
+        Dicionário premissa -> array com um valor por cenário
+    """
+    desconhecidas = set(faixas) - set(PREMISSAS_DRE)
+    if desconhecidas:
+        raise ValueError(f"Premissas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    combinacoes = np.array(list(itertools.product(*faixas.values())), dtype=float).reshape(-1, len(faixas))
+    return {premissa: combinacoes[:, i] for i, premissa in enumerate(faixas)}
+
+
+def sortear_cenarios(n, faixas, semente=None):
+    """
+    Cenários Monte Carlo com premissas sorteadas uniformemente.
+
+    Args:
+        n: número de cenários
+        faixas: premissa -> (mínimo, máximo)
+        semente: semente do gerador, para resultados reproduzíveis
+
+    Returns:
+        Dicionário premissa -> array com um valor por cenário
+    """
+    desconhecidas = set(faixas) - set(PREMISSAS_DRE)
+    if desconhecidas:
+        raise ValueError(f"Premissas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    gerador = np.random.default_rng(semente)
+    return {premissa: gerador.uniform(minimo, maximo, n) for premissa, (minimo, maximo) in faixas.items()}
+
+
+def empilhar_entradas(entradas_por_unidade):
+    """Entradas do DRE de cada unidade (vetores de 12 meses) empilhadas em matrizes unidade × mês"""
+    chaves = entradas_por_unidade[0].keys()
+    return {chave: np.stack([np.asarray(entradas[chave], dtype=float) for entradas in entradas_por_unidade]) for chave in chaves}
+
+
+def avaliar_cenarios(entradas, cenarios, lote=LOTE_CENARIOS):
+    """
+    Avalia o DRE em todos os cenários, em lotes vetorizados.
+
+    Args:
+        entradas: entradas do DRE (ver avaliar_dre), com meses no último eixo
+            (ex.: matrizes unidade × mês de empilhar_entradas)
+        cenarios: premissa -> array de valores por cenário (grade_cenarios / sortear_cenarios);
+            premissas ausentes ficam no valor de PREMISSAS_DRE
+
+    Returns:
+        Dicionário métrica -> array (cenário, *eixos das entradas sem o mês) com a soma anual
+    """
+    tamanhos = {len(valores) for valores in cenarios.values()}
+    if len(tamanhos) != 1:
+        raise ValueError("Todas as premissas dos cenários devem ter o mesmo número de valores")
+    total = tamanhos.pop()
+
+    forma = np.broadcast_shapes(*(np.shape(valor) for valor in entradas.values()))
+    resultados = {metrica: np.empty((total,) + forma[:-1]) for metrica in METRICAS_CENARIOS}
+
+    for inicio in range(0, total, lote):
+        fim = min(inicio + lote, total)
+        # (cenários, 1, ..., 1): cada premissa se espalha sobre unidades e meses
+        premissas = {
+            premissa: np.asarray(valores[inicio:fim], dtype=float).reshape((-1,) + (1,) * len(forma))
+            for premissa, valores in cenarios.items()
+        }
+        valores = avaliar_dre(entradas, premissas)
+        for metrica in METRICAS_CENARIOS:
+            resultados[metrica][inicio:fim] = np.broadcast_to(valores[metrica].sum(axis=-1), (fim - inicio,) + forma[:-1])
+    return resultados
+
+
+def resumir_cenarios(resultados, unidades, percentis=(5, 50, 95)):
+    """
+    Distribuição de cada métrica por unidade.
+
+    Args:
+        resultados: saída de avaliar_cenarios com entradas unidade × mês
+        unidades: nomes das unidades, na ordem das linhas das entradas
+
+    Returns:
+        DataFrame com unidade, métrica, média, desvio, percentis e probabilidade de valor negativo
+    """
+    linhas = []
+    for metrica, valores in resultados.items():
+        quantis = np.percentile(valores, percentis, axis=0)
+        for u, unidade in enumerate(unidades):
+            linha = {
+                'unidade': unidade,
+                'metrica': metrica,
+                'media': valores[:, u].mean(),
+                'desvio': valores[:, u].std()
+            }
+            linha.update({f'p{p}': quantis[i, u] for i, p in enumerate(percentis)})
+            linha['prob_negativo'] = (valores[:, u] < 0).mean()
+            linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def cenarios_dre_mongo(cenarios, year=None, unidades=('Consolidado', 'Fox Grãos', 'Fox Log', 'Clube FX')):
+    """
+    Distribuições de EBITDA e lucro líquido por unidade sobre os contratos reais.
+
+    Usa as entradas mensais em cache de load_dre_inputs_from_mongo; unidades sem
+    contratos ficam de fora.
+    """
+    from mongodb_connector import load_dre_inputs_from_mongo
+
+    entradas = {unidade: load_dre_inputs_from_mongo(year, unidade) for unidade in unidades}
+    unidades = [unidade for unidade in unidades if entradas[unidade]]
+    if not unidades:
+        return pd.DataFrame()
+
+    resultados = avaliar_cenarios(empilhar_entradas([entradas[unidade] for unidade in unidades]), cenarios)
+    return resumir_cenarios(resultados, unidades)
@@ -11,7 +11,23 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import numpy as np
+import io
+import tempfile
 from mongodb_connector import load_contracts_data, load_financial_summary, load_monthly_performance
+from cache_graficos import figura_em_cache
+from kpis_janela import obter_serie_diaria, comparar_janelas
+from mapa_grade import MAX_PONTOS_MAPA, PRECISAO_MAXIMA, celulas_contratos, escolher_precisao, geohash_texto
+
+# pyarrow é opcional: sem ele a exportação Parquet fica indisponível
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Linhas por lote na exportação CSV/Parquet
+LOTE_EXPORTACAO = 20_000
 
 def pagina_contratos_reais(tema='escuro', filtros_globais=None):
     """Página principal dos contratos reais"""
@@ -48,8 +64,9 @@ def pagina_contratos_reais(tema='escuro', filtros_globais=None):
     else:
         df_filtrado = df_contratos
     
-    # KPIs principais
-    exibir_kpis_contratos(df_filtrado, tema)
+    # KPIs principais (chave_filtros identifica a visão filtrada nos caches de KPIs e gráficos)
+    chave_filtros = ('globais',) + tuple(sorted(filtros_globais.items())) if filtros_globais else ('globais',)
+    exibir_kpis_contratos(df_filtrado, tema, chave_filtros)
     
     st.divider()
     
@@ -58,24 +75,22 @@ def pagina_contratos_reais(tema='escuro', filtros_globais=None):
     
     with col1:
         # Gráfico de contratos por mês
-        criar_grafico_contratos_mensais(df_filtrado, tema)
+        criar_grafico_contratos_mensais(df_filtrado, tema, chave_filtros)
     
     with col2:
         # Gráfico de valor por produto
-        fig_valor_grao = criar_grafico_valor_por_grao(df_filtrado, tema)
-        if fig_valor_grao:
-            st.plotly_chart(fig_valor_grao, use_container_width=True)
+        criar_grafico_valor_por_grao(df_filtrado, tema, chave_filtros)
     
     # Segunda linha de gráficos
     col1, col2 = st.columns(2)
     
     with col1:
         # Status dos contratos
-        criar_grafico_status_contratos(df_filtrado, tema)
+        criar_grafico_status_contratos(df_filtrado, tema, chave_filtros)
     
     with col2:
         # Modalidade de frete
-        criar_grafico_modalidade_frete(df_filtrado, tema)
+        criar_grafico_modalidade_frete(df_filtrado, tema, chave_filtros)
     
     # Mapa de localizações
     st.markdown("---")
@@ -112,109 +127,89 @@ def pagina_contratos_reais(tema='escuro', filtros_globais=None):
     st.divider()
     exibir_analises_avancadas(df_filtrado, tema)
 
+# Condições (flag, valor) de cada tipo de operação nesta página
+CONDICOES_TIPO_OPERACAO = {
+    # Supply: isBuying: false, isGrain: true
+    'Supply': [('isBuying', False), ('isGrain', True)],
+    # Originação: isBuying: true, isGrain: true
+    'Originação': [('isBuying', True), ('isGrain', True)],
+    # Frete: isFreight: true
+    'Frete': [('isFreight', True)],
+    # Clube FX: isService: true
+    'Clube FX': [('isService', True)]
+}
+
 def aplicar_filtros_contratos(df, grao, status, tipo_operacao, ano):
-    """Aplica filtros aos dados dos contratos"""
-    df_filtrado = df.copy()
+    """Aplica filtros aos dados dos contratos (via índice de filtros do snapshot)"""
+    from filtros_indice import filtrar_com_cache
+    condicoes = []
     
     # Filtro por produto
     if grao != 'Todos':
-        if 'grainName' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['grainName'] == grao]
+        if 'grainName' in df.columns:
+            condicoes.append(('grainName', grao))
         else:
             st.warning("⚠️ Campo grainName não encontrado. Filtro por produto não aplicado.")
     
     # Filtro por status
     if status != 'Todos':
-        if 'status' in df_filtrado.columns:
-            df_filtrado = df_filtrado[df_filtrado['status'] == status]
+        if 'status' in df.columns:
+            condicoes.append(('status', status))
         else:
             st.warning("⚠️ Campo status não encontrado. Filtro por status não aplicado.")
     
     # Filtro por tipo de operação
-    if tipo_operacao != 'Todos':
-        if tipo_operacao == 'Supply':
-            # Supply: isBuying: false, isGrain: true
-            if 'isGrain' in df_filtrado.columns and 'isBuying' in df_filtrado.columns:
-                df_filtrado = df_filtrado[
-                    (df_filtrado['isBuying'] == False) & 
-                    (df_filtrado['isGrain'] == True)
-                ]
-            else:
-                st.warning("⚠️ Campos isGrain/isBuying não encontrados. Filtro Supply não aplicado.")
-        elif tipo_operacao == 'Originação':
-            # Originação: isBuying: true, isGrain: true
-            if 'isGrain' in df_filtrado.columns and 'isBuying' in df_filtrado.columns:
-                df_filtrado = df_filtrado[
-                    (df_filtrado['isBuying'] == True) & 
-                    (df_filtrado['isGrain'] == True)
-                ]
-            else:
-                st.warning("⚠️ Campos isGrain/isBuying não encontrados. Filtro Originação não aplicado.")
-        elif tipo_operacao == 'Frete':
-            # Frete: isFreight: true
-            if 'isFreight' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isFreight'] == True]
-            else:
-                st.warning("⚠️ Campo isFreight não encontrado. Filtro Frete não aplicado.")
-        elif tipo_operacao == 'Clube FX':
-            # Clube FX: isService: true
-            if 'isService' in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado['isService'] == True]
-            else:
-                st.warning("⚠️ Campo isService não encontrado. Filtro Clube FX não aplicado.")
+    if tipo_operacao in CONDICOES_TIPO_OPERACAO:
+        condicoes_tipo = CONDICOES_TIPO_OPERACAO[tipo_operacao]
+        flags_ausentes = [flag for flag, _ in condicoes_tipo if flag not in df.columns]
+        if flags_ausentes:
+            st.warning(f"⚠️ Campos {'/'.join(flags_ausentes)} não encontrados. Filtro {tipo_operacao} não aplicado.")
+        else:
+            condicoes.extend(condicoes_tipo)
     
     # Filtro por ano
     if ano and ano != 'Todos':
         try:
-            ano_int = int(ano)
-            df_filtrado = df_filtrado[df_filtrado['closeDate'].dt.year == ano_int]
+            condicoes.append(('ano', int(ano)))
         except (ValueError, TypeError):
             # Se não conseguir converter para int, ignora o filtro
             st.warning(f"⚠️ Valor de ano inválido: {ano} (tipo: {type(ano)})")
             pass
     
-    return df_filtrado
+    return filtrar_com_cache(df, ('contratos', grao, status, tipo_operacao, ano), condicoes)
+
+def exibir_kpis_contratos(df, tema, chave_filtros=None):
+    """
+    Exibe KPIs principais dos contratos.
 
-def exibir_kpis_contratos(df, tema):
-    """Exibe KPIs principais dos contratos"""
+    Totais e variações (últimos 30 dias vs 30 dias anteriores) saem da série diária
+    acumulada de kpis_janela, memorizada por snapshot + chave_filtros.
+    """
     
     if df.empty:
         st.warning("⚠️ Nenhum contrato encontrado com os filtros aplicados")
         return
     
-    # Calcular métricas
-    total_contratos = len(df)
-    valor_total = df['valorTotal'].sum()
-    
-    # Separar volumes por tipo de operação
-    volume_comprado = df[df['isBuying'] == True]['amount'].sum()
-    volume_vendido = df[df['isBuying'] == False]['amount'].sum()
+    serie = obter_serie_diaria(df, chave_filtros)
     
-    preco_medio = df['bagPrice'].mean()
+    # Calcular métricas
+    totais = serie['totais']
+    total_contratos = int(totais['contratos'])
+    valor_total = totais['valor']
+    volume_comprado = totais['volume_comprado']
+    volume_vendido = totais['volume_vendido']
+    preco_medio = totais['preco_medio']
     
     # Comparação com período anterior (últimos 30 dias vs 30 dias anteriores)
-    hoje = datetime.now()
-    data_30_dias = hoje - timedelta(days=30)
-    data_60_dias = hoje - timedelta(days=60)
-    
-    df_atual = df[df['closeDate'] >= data_30_dias]
-    df_anterior = df[(df['closeDate'] >= data_60_dias) & (df['closeDate'] < data_30_dias)]
+    janelas = comparar_janelas(serie, dias=30)
+    atual, anterior = janelas['atual'], janelas['anterior']
     
     # Calcular variações
-    var_contratos = calcular_variacao(len(df_atual), len(df_anterior))
-    var_valor = calcular_variacao(df_atual['valorTotal'].sum(), df_anterior['valorTotal'].sum())
-    
-    # Variações de volume por tipo
-    var_volume_comprado = calcular_variacao(
-        df_atual[df_atual['isBuying'] == True]['amount'].sum(),
-        df_anterior[df_anterior['isBuying'] == True]['amount'].sum()
-    )
-    var_volume_vendido = calcular_variacao(
-        df_atual[df_atual['isBuying'] == False]['amount'].sum(),
-        df_anterior[df_anterior['isBuying'] == False]['amount'].sum()
-    )
-    
-    var_preco = calcular_variacao(df_atual['bagPrice'].mean(), df_anterior['bagPrice'].mean())
+    var_contratos = calcular_variacao(atual['contratos'], anterior['contratos'])
+    var_valor = calcular_variacao(atual['valor'], anterior['valor'])
+    var_volume_comprado = calcular_variacao(atual['volume_comprado'], anterior['volume_comprado'])
+    var_volume_vendido = calcular_variacao(atual['volume_vendido'], anterior['volume_vendido'])
+    var_preco = calcular_variacao(atual['preco_medio'], anterior['preco_medio'])
     
     # Exibir KPIs em 5 colunas
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -260,23 +255,25 @@ def calcular_variacao(atual, anterior):
         return 0
     return ((atual - anterior) / anterior) * 100
 
-def criar_grafico_contratos_mensais(df, tema):
-    """Cria gráfico de contratos por mês"""
-    
-    if df.empty:
-        st.info("Sem dados para exibir")
-        return
-    
-    # Agrupar por mês
+def _layout_tema(tema):
+    """Cores de fundo e fonte dos gráficos conforme o tema"""
+    return dict(
+        plot_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
+        paper_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
+        font_color='white' if tema == 'escuro' else 'black'
+    )
+
+def _agregar_contratos_mensais(df):
+    """Número de contratos e valor total por mês de fechamento"""
     df_mensal = df.groupby(df['closeDate'].dt.to_period('M')).agg({
         'orderId': 'count',
         'valorTotal': 'sum'
     }).reset_index()
     
     df_mensal['mes'] = df_mensal['closeDate'].astype(str)
-    df_mensal = df_mensal.sort_values('closeDate')
-    
-    # Criar gráfico
+    return df_mensal.sort_values('closeDate')
+
+def _desenhar_contratos_mensais(df_mensal, tema):
     fig = go.Figure()
     
     # Barras para número de contratos
@@ -306,30 +303,34 @@ def criar_grafico_contratos_mensais(df, tema):
         yaxis2=dict(title="Valor Total (R$ Milhões)", side="right", overlaying="y"),
         height=400,
         showlegend=True,
-        plot_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        paper_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        font_color='white' if tema == 'escuro' else 'black'
+        **_layout_tema(tema)
     )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
 
-def criar_grafico_valor_por_grao(df, tema):
-    """Cria gráfico de valor por tipo de grão"""
+def criar_grafico_contratos_mensais(df, tema, chave_filtros=None):
+    """Cria gráfico de contratos por mês"""
     
     if df.empty:
         st.info("Sem dados para exibir")
         return
     
-    # Agrupar por grão
-    df_graos = df.groupby('grainName').agg({
+    fig = figura_em_cache(
+        df, chave_filtros, 'contratos_mensais', tema,
+        _agregar_contratos_mensais, _desenhar_contratos_mensais
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def _agregar_valor_por_grao(df):
+    """Valor, quantidade e número de contratos por grão (crescente por valor)"""
+    df_graos = df.groupby('grainName', observed=True).agg({
         'valorTotal': 'sum',
         'amount': 'sum',
         'orderId': 'count'
     }).reset_index()
     
-    df_graos = df_graos.sort_values('valorTotal', ascending=True)
-    
-    # Criar gráfico
+    return df_graos.sort_values('valorTotal', ascending=True)
+
+def _desenhar_valor_por_grao(df_graos, tema):
     fig = px.bar(
         df_graos,
         x='valorTotal',
@@ -341,37 +342,42 @@ def criar_grafico_valor_por_grao(df, tema):
         color_continuous_scale='Viridis'
     )
     
-    fig.update_layout(
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        paper_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        font_color='white' if tema == 'escuro' else 'black'
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(height=400, **_layout_tema(tema))
+    return fig
 
-def criar_grafico_status_contratos(df, tema):
-    """Cria gráfico de status dos contratos"""
+def criar_grafico_valor_por_grao(df, tema, chave_filtros=None):
+    """Cria gráfico de valor por tipo de grão"""
     
     if df.empty:
         st.info("Sem dados para exibir")
         return
     
-    # Contar por status
-    status_counts = df['status'].value_counts()
-    
-    # Cores por status
-    cores_status = {
-        'Concluído': '#10B981',
-        'Em Andamento': '#3B82F6',
-        'Ativo': '#F59E0B',
-        'Vencido': '#EF4444',
-        'Próximo ao Vencimento': '#F97316'
-    }
-    
-    cores = [cores_status.get(status, '#6B7280') for status in status_counts.index]
+    fig = figura_em_cache(
+        df, chave_filtros, 'valor_por_grao', tema,
+        _agregar_valor_por_grao, _desenhar_valor_por_grao
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+# Cores por status
+CORES_STATUS = {
+    'Concluído': '#10B981',
+    'Em Andamento': '#3B82F6',
+    'Ativo': '#F59E0B',
+    'Vencido': '#EF4444',
+    'Próximo ao Vencimento': '#F97316'
+}
+
+def _contagem_positiva(df, coluna):
+    """value_counts sem as categorias que não têm contratos no filtro"""
+    contagem = df[coluna].value_counts()
+    return contagem[contagem > 0]
+
+def _agregar_status(df):
+    return _contagem_positiva(df, 'status')
+
+def _desenhar_status(status_counts, tema):
+    cores = [CORES_STATUS.get(status, '#6B7280') for status in status_counts.index]
     
-    # Criar gráfico
     fig = px.pie(
         values=status_counts.values,
         names=status_counts.index,
@@ -379,26 +385,23 @@ def criar_grafico_status_contratos(df, tema):
         color_discrete_sequence=cores
     )
     
-    fig.update_layout(
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        paper_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        font_color='white' if tema == 'escuro' else 'black'
-    )
-    
-    st.plotly_chart(fig, use_container_width=True)
+    fig.update_layout(height=400, **_layout_tema(tema))
+    return fig
 
-def criar_grafico_modalidade_frete(df, tema):
-    """Cria gráfico de modalidade de frete"""
+def criar_grafico_status_contratos(df, tema, chave_filtros=None):
+    """Cria gráfico de status dos contratos"""
     
     if df.empty:
         st.info("Sem dados para exibir")
         return
     
-    # Contar por modalidade
-    frete_counts = df['modalidadeFrete'].value_counts()
-    
-    # Criar gráfico
+    fig = figura_em_cache(df, chave_filtros, 'status', tema, _agregar_status, _desenhar_status)
+    st.plotly_chart(fig, use_container_width=True)
+
+def _agregar_modalidade_frete(df):
+    return _contagem_positiva(df, 'modalidadeFrete')
+
+def _desenhar_modalidade_frete(frete_counts, tema):
     fig = px.bar(
         x=frete_counts.index,
         y=frete_counts.values,
@@ -408,17 +411,117 @@ def criar_grafico_modalidade_frete(df, tema):
         color_continuous_scale='Blues'
     )
     
-    fig.update_layout(
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        paper_bgcolor='rgba(0,0,0,0)' if tema == 'escuro' else 'white',
-        font_color='white' if tema == 'escuro' else 'black'
-    )
+    fig.update_layout(height=400, **_layout_tema(tema))
+    return fig
+
+def criar_grafico_modalidade_frete(df, tema, chave_filtros=None):
+    """Cria gráfico de modalidade de frete"""
+    
+    if df.empty:
+        st.info("Sem dados para exibir")
+        return
     
+    fig = figura_em_cache(
+        df, chave_filtros, 'modalidade_frete', tema,
+        _agregar_modalidade_frete, _desenhar_modalidade_frete
+    )
     st.plotly_chart(fig, use_container_width=True)
 
+# Colunas da tabela de contratos e seus nomes de exibição
+NOMES_COLUNAS_CONTRATOS = {
+    'orderId': 'ID Pedido',
+    'closeDate': 'Data Fechamento',
+    'grainName': 'Produto',
+    'amount': 'Quantidade',
+    'bagPrice': 'Preço/Un.',
+    'valorTotal': 'Valor Total',
+    'status': 'Status',
+    'tipoOperacao': 'Operação',
+    'modalidadeFrete': 'Frete',
+    'deliveryDeadline': 'Entrega Início',
+    'deliveryDeadlineEnd': 'Entrega Fim',
+    'buyerName': 'Comprador',
+    'sellerName': 'Vendedor',
+    'fromCity': 'Cidade Origem',
+    'fromState': 'Estado Origem',
+    'fromLat': 'Lat Origem',
+    'fromLng': 'Lng Origem',
+    'toCity': 'Cidade Destino',
+    'toState': 'Estado Destino',
+    'toLat': 'Lat Destino',
+    'toLng': 'Lng Destino'
+}
+
+TAMANHOS_PAGINA_CONTRATOS = [50, 100, 250, 500]
+
+def _formatar_numeros(serie, formato, prefixo=''):
+    """Formata uma coluna numérica inteira de uma vez (NaN vira 'nan', como no f-string)"""
+    return prefixo + pd.Series(serie.to_numpy(dtype=float), index=serie.index).map(formato.format)
+
+def formatar_tabela_contratos(df):
+    """
+    Formata as colunas da tabela de contratos para exibição.
+
+    Chamado só com as linhas visíveis (uma página), não com o DataFrame inteiro.
+    """
+    df_tabela = df[[col for col in NOMES_COLUNAS_CONTRATOS if col in df.columns]].copy()
+    
+    # Datas
+    for col in ['closeDate', 'deliveryDeadline', 'deliveryDeadlineEnd']:
+        if col in df_tabela.columns:
+            df_tabela[col] = df_tabela[col].dt.strftime('%d/%m/%Y')
+    
+    # Valores
+    if 'valorTotal' in df_tabela.columns:
+        df_tabela['valorTotal'] = _formatar_numeros(df_tabela['valorTotal'], '{:,.2f}', 'R$ ')
+    if 'bagPrice' in df_tabela.columns:
+        df_tabela['bagPrice'] = _formatar_numeros(df_tabela['bagPrice'], '{:.2f}', 'R$ ')
+    if 'amount' in df_tabela.columns:
+        df_tabela['amount'] = _formatar_numeros(df_tabela['amount'], '{:,.0f}')
+    
+    # Coordenadas
+    for col in ['fromLat', 'fromLng', 'toLat', 'toLng']:
+        if col in df_tabela.columns:
+            df_tabela[col] = _formatar_numeros(df_tabela[col], '{:.6f}').where(df_tabela[col].notna(), 'N/A')
+    
+    # Texto (inclui category e ObjectIds) como string, ausentes como 'N/A'
+    for col in df_tabela.columns:
+        if df_tabela[col].dtype == 'object' or isinstance(df_tabela[col].dtype, pd.CategoricalDtype):
+            valores = df_tabela[col].astype(object)
+            df_tabela[col] = valores.where(valores.notna(), 'N/A').astype(str)
+    
+    df_tabela.columns = [NOMES_COLUNAS_CONTRATOS[col] for col in df_tabela.columns]
+    return df_tabela
+
+def ordenar_posicoes(df, coluna, crescente=True):
+    """
+    Posições das linhas ordenadas pelo valor bruto da coluna (ausentes no fim).
+
+    Colunas object podem misturar tipos (ex.: orderId int e str), que não se
+    comparam entre si: números vêm antes, em ordem numérica, e o restante em
+    ordem de texto.
+    """
+    valores = df[coluna].reset_index(drop=True)
+    if valores.dtype != object:
+        return valores.sort_values(ascending=crescente, kind='stable', na_position='last').index.to_numpy()
+
+    ausentes = valores.isna()
+    chaves = pd.DataFrame({
+        'ausente': ausentes,
+        'numero': pd.to_numeric(valores, errors='coerce'),
+        'texto': valores.astype(str).where(~ausentes)
+    })
+    return chaves.sort_values(
+        ['ausente', 'numero', 'texto'], ascending=[True, crescente, crescente], kind='stable', na_position='last'
+    ).index.to_numpy()
+
+@st.fragment
 def exibir_tabela_contratos(df):
-    """Exibe tabela detalhada dos contratos"""
+    """
+    Exibe tabela detalhada dos contratos (paginada: só a página visível é ordenada, formatada e enviada).
+
+    Fragmento: ordenar ou trocar de página reexecuta só a tabela, não os gráficos e o mapa.
+    """
     
     st.markdown("### 📋 Detalhes dos Contratos")
     
@@ -426,88 +529,129 @@ def exibir_tabela_contratos(df):
         st.info("Nenhum contrato encontrado com os filtros aplicados")
         return
     
-    # Selecionar colunas para exibição
-    colunas_exibicao = [
-        'orderId', 'closeDate', 'grainName', 'amount', 'bagPrice', 
-        'valorTotal', 'status', 'tipoOperacao', 'modalidadeFrete',
-        'deliveryDeadline', 'deliveryDeadlineEnd', 'buyerName', 'sellerName',
-        'fromCity', 'fromState', 'fromLat', 'fromLng',
-        'toCity', 'toState', 'toLat', 'toLng'
-    ]
-    
-    # Verificar se as colunas existem no DataFrame
-    colunas_existentes = [col for col in colunas_exibicao if col in df.columns]
-    df_tabela = df[colunas_existentes].copy()
-    
-    # Formatação
-    if 'closeDate' in df_tabela.columns:
-        df_tabela['closeDate'] = df_tabela['closeDate'].dt.strftime('%d/%m/%Y')
-    if 'deliveryDeadline' in df_tabela.columns:
-        df_tabela['deliveryDeadline'] = df_tabela['deliveryDeadline'].dt.strftime('%d/%m/%Y')
-    if 'deliveryDeadlineEnd' in df_tabela.columns:
-        df_tabela['deliveryDeadlineEnd'] = df_tabela['deliveryDeadlineEnd'].dt.strftime('%d/%m/%Y')
-    if 'valorTotal' in df_tabela.columns:
-        df_tabela['valorTotal'] = df_tabela['valorTotal'].apply(lambda x: f"R$ {x:,.2f}")
-    if 'bagPrice' in df_tabela.columns:
-        df_tabela['bagPrice'] = df_tabela['bagPrice'].apply(lambda x: f"R$ {x:.2f}")
-    if 'amount' in df_tabela.columns:
-        df_tabela['amount'] = df_tabela['amount'].apply(lambda x: f"{x:,.0f}")
-    
-    # Formatação das coordenadas
-    for coord_col in ['fromLat', 'fromLng', 'toLat', 'toLng']:
-        if coord_col in df_tabela.columns:
-            df_tabela[coord_col] = df_tabela[coord_col].apply(
-                lambda x: f"{x:.6f}" if pd.notna(x) else "N/A"
-            )
+    colunas_existentes = [col for col in NOMES_COLUNAS_CONTRATOS if col in df.columns]
+    total = len(df)
+    
+    # Controles de ordenação e paginação
+    col_ordem, col_direcao, col_tamanho, col_pagina = st.columns([3, 2, 2, 2])
+    with col_ordem:
+        coluna_ordem = st.selectbox(
+            "Ordenar por",
+            colunas_existentes,
+            index=colunas_existentes.index('closeDate') if 'closeDate' in colunas_existentes else 0,
+            format_func=lambda col: NOMES_COLUNAS_CONTRATOS[col],
+            key="contratos_tabela_ordem"
+        )
+    with col_direcao:
+        direcao = st.selectbox("Direção", ["Decrescente", "Crescente"], key="contratos_tabela_direcao")
+    with col_tamanho:
+        tamanho_pagina = st.selectbox("Linhas por página", TAMANHOS_PAGINA_CONTRATOS, key="contratos_tabela_tamanho")
+    
+    total_paginas = max(1, -(-total // tamanho_pagina))
+    with col_pagina:
+        pagina = st.number_input(
+            f"Página (de {total_paginas})",
+            min_value=1,
+            max_value=total_paginas,
+            value=1,
+            step=1,
+            key="contratos_tabela_pagina"
+        )
+    pagina = min(int(pagina), total_paginas)
     
-    # Renomear colunas
-    rename_dict = {
-        'orderId': 'ID Pedido',
-        'closeDate': 'Data Fechamento',
-        'grainName': 'Produto',
-        'amount': 'Quantidade',
-        'bagPrice': 'Preço/Un.',
-        'valorTotal': 'Valor Total',
-        'status': 'Status',
-        'tipoOperacao': 'Operação',
-        'modalidadeFrete': 'Frete',
-        'deliveryDeadline': 'Entrega Início',
-        'deliveryDeadlineEnd': 'Entrega Fim',
-        'buyerName': 'Comprador',
-        'sellerName': 'Vendedor',
-        'fromCity': 'Cidade Origem',
-        'fromState': 'Estado Origem',
-        'fromLat': 'Lat Origem',
-        'fromLng': 'Lng Origem',
-        'toCity': 'Cidade Destino',
-        'toState': 'Estado Destino',
-        'toLat': 'Lat Destino',
-        'toLng': 'Lng Destino'
-    }
-    
-    # Aplicar renomeação apenas para colunas existentes
-    df_tabela.columns = [rename_dict.get(col, col) for col in df_tabela.columns]
-    
-    # Converter ObjectIds para strings em todas as colunas object
-    for col in df_tabela.columns:
-        if df_tabela[col].dtype == 'object':
-            df_tabela[col] = df_tabela[col].apply(lambda x: str(x) if x is not None else 'N/A')
+    # Ordena sobre os valores brutos e recorta só a página visível
+    posicoes = ordenar_posicoes(df, coluna_ordem, crescente=(direcao == "Crescente"))
+    inicio = (pagina - 1) * tamanho_pagina
+    df_pagina = df.take(posicoes[inicio:inicio + tamanho_pagina])
     
     # Exibir tabela
     st.dataframe(
-        df_tabela,
+        formatar_tabela_contratos(df_pagina),
         use_container_width=True,
-        height=400
-    )
-    
-    # Botão para download
-    csv = df_tabela.to_csv(index=False)
-    st.download_button(
-        label="📥 Baixar dados em CSV",
-        data=csv,
-        file_name=f"contratos_fox_sa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-        mime="text/csv"
+        height=400,
+        hide_index=True
     )
+    st.caption(f"Exibindo {inicio + 1:,}–{min(inicio + tamanho_pagina, total):,} de {total:,} contratos".replace(',', '.'))
+    
+    # Botões para download: o arquivo só é gerado no clique (callable), em lotes, e enviado inteiro
+    sufixo_arquivo = datetime.now().strftime('%Y%m%d_%H%M%S')
+    col_csv, col_parquet = st.columns(2)
+    with col_csv:
+        st.download_button(
+            label="📥 Baixar dados em CSV",
+            data=lambda: exportar_csv_contratos(df),
+            file_name=f"contratos_fox_sa_{sufixo_arquivo}.csv",
+            mime="text/csv",
+            key="contratos_download_csv"
+        )
+    with col_parquet:
+        if pq is not None:
+            st.download_button(
+                label="📥 Baixar dados em Parquet",
+                data=lambda: exportar_parquet_contratos(df),
+                file_name=f"contratos_fox_sa_{sufixo_arquivo}.parquet",
+                mime="application/vnd.apache.parquet",
+                key="contratos_download_parquet"
+            )
+        else:
+            st.caption("Exportação Parquet indisponível (pyarrow não instalado)")
+
+def exportar_csv_contratos(df, tamanho_lote=None):
+    """
+    Gera o CSV formatado da tabela de contratos em lotes.
+
+    Cada lote é formatado e gravado num arquivo temporário antes do próximo, então
+    a cópia formatada completa (DataFrame de texto) nunca existe em memória. O
+    download_button não faz streaming: o arquivo inteiro volta como bytes, então
+    a memória ainda cresce com o tamanho da exportação (O(tamanho do CSV)).
+
+    Returns:
+        Conteúdo do CSV (bytes, UTF-8)
+    """
+    tamanho_lote = tamanho_lote or LOTE_EXPORTACAO
+    with tempfile.TemporaryFile() as arquivo:
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8', newline='', write_through=True)
+        for inicio in range(0, len(df), tamanho_lote):
+            lote = formatar_tabela_contratos(df.iloc[inicio:inicio + tamanho_lote])
+            lote.to_csv(texto, index=False, header=(inicio == 0))
+        texto.flush()
+        texto.detach()
+        arquivo.seek(0)
+        return arquivo.read()
+
+def exportar_parquet_contratos(df, tamanho_lote=None):
+    """
+    Gera o Parquet da tabela de contratos com os tipos originais (datas, números,
+    categorias), um row group por lote.
+
+    Como no CSV, só a conversão é feita por lote: o resultado volta inteiro como
+    bytes para o download_button, então a memória é O(tamanho do Parquet).
+
+    Returns:
+        Conteúdo do Parquet (bytes)
+    """
+    tamanho_lote = tamanho_lote or LOTE_EXPORTACAO
+    colunas = [col for col in NOMES_COLUNAS_CONTRATOS if col in df.columns]
+    with tempfile.TemporaryFile() as arquivo:
+        escritor = None
+        try:
+            for inicio in range(0, len(df), tamanho_lote):
+                lote = df.iloc[inicio:inicio + tamanho_lote][colunas].copy()
+                # Colunas object podem misturar tipos (ObjectId, None); no Parquet viram texto
+                for col in lote.columns:
+                    if lote[col].dtype == 'object':
+                        lote[col] = lote[col].map(lambda x: None if x is None else str(x))
+                tabela = pa.Table.from_pandas(lote, preserve_index=False)
+                if escritor is None:
+                    escritor = pq.ParquetWriter(arquivo, tabela.schema)
+                else:
+                    tabela = tabela.cast(escritor.schema)
+                escritor.write_table(tabela)
+        finally:
+            if escritor is not None:
+                escritor.close()
+        arquivo.seek(0)
+        return arquivo.read()
 
 def exibir_analises_avancadas(df, tema):
     """Exibe análises avançadas dos contratos"""
@@ -569,6 +713,148 @@ def exibir_analises_avancadas(df, tema):
     st.plotly_chart(fig, use_container_width=True)
 
 
+def _coluna_ou_vazio(df, coluna, padrao):
+    """Valores da coluna como array, ou preenchidos com 'padrao' se a coluna não existir"""
+    if coluna in df.columns:
+        return df[coluna].to_numpy()
+    return np.full(len(df), padrao, dtype=object)
+
+def _coluna_texto(df, coluna, selecionados):
+    """Linhas selecionadas da coluna como texto (str de cada valor), 'Não informado' se ausente"""
+    if coluna not in df.columns:
+        return np.full(int(selecionados.sum()), 'Não informado', dtype=object)
+    serie = df[coluna]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Converte só as categorias; o código -1 (ausente) cai no último item, 'nan'
+        textos = np.array([str(c) for c in serie.cat.categories] + ['nan'], dtype=object)
+        return textos[serie.cat.codes.to_numpy()[selecionados]]
+    return np.array([str(v) for v in serie.to_numpy()[selecionados]], dtype=object)
+
+def _linhas_mapa(df):
+    """
+    Uma linha por contrato de Supply (destino) ou Originação (origem) com coordenadas.
+
+    Seleciona toLat/toLng ou fromLat/fromLng por tipo de operação com np.where sobre as
+    colunas inteiras; 'celula' é o geohash do ponto (coluna 'celulaMapa' do snapshot,
+    ou calculado aqui se o DataFrame não a tiver).
+    """
+    tipo = _coluna_ou_vazio(df, 'tipoOperacao', '')
+    supply = tipo == 'Supply'
+    originacao = tipo == 'Originação'
+    
+    # Supply usa o destino (to); Originação usa a origem (from)
+    lat = np.where(supply, _coluna_ou_vazio(df, 'toLat', np.nan), _coluna_ou_vazio(df, 'fromLat', np.nan)).astype(float)
+    lon = np.where(supply, _coluna_ou_vazio(df, 'toLng', np.nan), _coluna_ou_vazio(df, 'fromLng', np.nan)).astype(float)
+    selecionados = (supply | originacao) & ~np.isnan(lat) & ~np.isnan(lon)
+    
+    def numero(coluna):
+        return pd.to_numeric(pd.Series(_coluna_ou_vazio(df, coluna, 0)[selecionados]), errors='coerce').fillna(0).astype(float).to_numpy()
+    
+    celulas = df['celulaMapa'].to_numpy() if 'celulaMapa' in df.columns else celulas_contratos(df)
+    
+    supply_sel = supply[selecionados]
+    return pd.DataFrame({
+        'lat': lat[selecionados],
+        'lon': lon[selecionados],
+        'cidade': np.where(supply_sel, _coluna_texto(df, 'toCity', selecionados), _coluna_texto(df, 'fromCity', selecionados)),
+        'estado': np.where(supply_sel, _coluna_texto(df, 'toState', selecionados), _coluna_texto(df, 'fromState', selecionados)),
+        'tipo': np.where(supply_sel, 'Supply', 'Originação'),
+        'quantidade': numero('amount'),
+        'valor': numero('valorTotal'),
+        'produto': _coluna_texto(df, 'grainName', selecionados),
+        'preco': numero('bagPrice'),
+        'celula': celulas[selecionados]
+    })
+
+def _agregar_localizacoes(df_map):
+    """Agrega as linhas do mapa por localização exata (lat, lon, cidade, estado, tipo)"""
+    df_map_agg = df_map.groupby(['lat', 'lon', 'cidade', 'estado', 'tipo']).agg(
+        quantidade=('quantidade', 'sum'),
+        valor=('valor', 'sum'),
+        produto=('produto', 'unique'),
+        preco=('preco', 'mean')
+    ).reset_index()
+    df_map_agg['produto'] = df_map_agg['produto'].map(', '.join)
+    return df_map_agg
+
+def _agregar_celulas(df_map, precisao, codigos):
+    """
+    Agrega as linhas do mapa por célula geohash e tipo de operação.
+
+    O marcador fica no centroide dos contratos da célula e leva o nome da cidade
+    com maior quantidade, indicando quantos outros locais foram agrupados.
+    """
+    df_map = df_map.assign(celula=codigos)
+    chaves = ['celula', 'tipo']
+    
+    df_celulas = df_map.groupby(chaves).agg(
+        lat=('lat', 'mean'),
+        lon=('lon', 'mean'),
+        quantidade=('quantidade', 'sum'),
+        valor=('valor', 'sum'),
+        produto=('produto', 'unique'),
+        preco=('preco', 'mean'),
+        estado=('estado', 'unique'),
+        locais=('cidade', 'nunique')
+    )
+    
+    # Cidade com maior quantidade em cada célula
+    principais = (
+        df_map.groupby(chaves + ['cidade'])['quantidade'].sum()
+        .reset_index()
+        .sort_values('quantidade', ascending=False, kind='stable')
+        .drop_duplicates(chaves)
+        .set_index(chaves)['cidade']
+    )
+    df_celulas['cidade'] = principais.reindex(df_celulas.index)
+    df_celulas = df_celulas.reset_index()
+    
+    outros = df_celulas['locais'] - 1
+    df_celulas['cidade'] = df_celulas['cidade'].where(outros == 0, df_celulas['cidade'] + ' (+' + outros.astype(str) + ' locais)')
+    df_celulas['produto'] = df_celulas['produto'].map(', '.join)
+    df_celulas['estado'] = df_celulas['estado'].map(', '.join)
+    df_celulas['geohash'] = geohash_texto(df_celulas['celula'].to_numpy(), precisao)
+    return df_celulas[['lat', 'lon', 'cidade', 'estado', 'tipo', 'quantidade', 'valor', 'produto', 'preco', 'geohash']]
+
+def construir_pontos_mapa(df):
+    """
+    Pontos do mapa de Supply (destino) e Originação (origem), agregados por localização.
+
+    Returns:
+        DataFrame com lat, lon, cidade, estado, tipo, quantidade, valor, produto e preco
+        (vazio se nenhum contrato tiver coordenadas)
+    """
+    df_map = _linhas_mapa(df)
+    if df_map.empty:
+        return df_map.drop(columns='celula')
+    
+    # Agregar por localização para evitar sobreposição
+    return _agregar_localizacoes(df_map)
+
+def construir_pontos_mapa_em_grade(df, max_pontos=MAX_PONTOS_MAPA):
+    """
+    Pontos do mapa limitados a max_pontos marcadores.
+
+    Usa as localizações exatas enquanto couberem no limite; acima disso agrega na
+    precisão geohash mais fina em que o número de marcadores cabe (ver mapa_grade).
+
+    Returns:
+        Tupla (DataFrame de pontos, precisão geohash ou None para localizações exatas)
+    """
+    df_map = _linhas_mapa(df)
+    if df_map.empty:
+        return df_map.drop(columns='celula'), None
+    
+    # Cada célula da precisão máxima tem ao menos uma localização exata: se elas já
+    # passam do limite, não vale agregar por localização antes
+    grupos = (df_map['tipo'].to_numpy() == 'Supply').astype(np.int64)
+    precisao, codigos = escolher_precisao(df_map['celula'].to_numpy(), max_pontos, grupos)
+    if precisao == PRECISAO_MAXIMA:
+        pontos = _agregar_localizacoes(df_map)
+        if len(pontos) <= max_pontos:
+            return pontos, None
+    return _agregar_celulas(df_map, precisao, codigos), precisao
+
 def criar_mapa_contratos(df, tema='plotly'):
     """Cria mapa com localizações dos contratos de Supply e Originação"""
     try:
@@ -576,99 +862,26 @@ def criar_mapa_contratos(df, tema='plotly'):
         import pandas as pd
         import numpy as np
         
-        # Preparar dados para o mapa
-        map_data = []
-        
-        for _, row in df.iterrows():
-            tipo_operacao = row.get('tipoOperacao', '')
-            
-            # Para Supply, usar destino (to)
-            if tipo_operacao == 'Supply' and row.get('toLocation') is not None:
-                location = row['toLocation']
-                if isinstance(location, dict) and 'coordinates' in location:
-                    coords = location['coordinates']
-                    if len(coords) >= 2 and pd.notna(coords[0]) and pd.notna(coords[1]):
-                        # Garantir que são números válidos
-                        lat = float(coords[1]) if coords[1] is not None else None
-                        lon = float(coords[0]) if coords[0] is not None else None
-                        quantidade = float(row.get('amount', 0)) if pd.notna(row.get('amount', 0)) else 0
-                        valor = float(row.get('valorTotal', 0)) if pd.notna(row.get('valorTotal', 0)) else 0
-                        preco = float(row.get('bagPrice', 0)) if pd.notna(row.get('bagPrice', 0)) else 0
-                        
-                        if lat is not None and lon is not None:
-                            map_data.append({
-                                'lat': lat,
-                                'lon': lon,
-                                'quantidade': quantidade,
-                                'valor': valor,
-                                'tipo': 'Supply',
-                                'cidade': str(row.get('toCity', 'Não informado')),
-                                'estado': str(row.get('toState', 'Não informado')),
-                                'produto': str(row.get('grainName', 'Não informado')),
-                                'preco': preco
-                            })
-            
-            # Para Originação, usar origem (from)
-            elif tipo_operacao == 'Originação' and row.get('fromLocation') is not None:
-                location = row['fromLocation']
-                if isinstance(location, dict) and 'coordinates' in location:
-                    coords = location['coordinates']
-                    if len(coords) >= 2 and pd.notna(coords[0]) and pd.notna(coords[1]):
-                        # Garantir que são números válidos
-                        lat = float(coords[1]) if coords[1] is not None else None
-                        lon = float(coords[0]) if coords[0] is not None else None
-                        quantidade = float(row.get('amount', 0)) if pd.notna(row.get('amount', 0)) else 0
-                        valor = float(row.get('valorTotal', 0)) if pd.notna(row.get('valorTotal', 0)) else 0
-                        preco = float(row.get('bagPrice', 0)) if pd.notna(row.get('bagPrice', 0)) else 0
-                        
-                        if lat is not None and lon is not None:
-                            map_data.append({
-                                'lat': lat,
-                                'lon': lon,
-                                'quantidade': quantidade,
-                                'valor': valor,
-                                'tipo': 'Originação',
-                                'cidade': str(row.get('fromCity', 'Não informado')),
-                                'estado': str(row.get('fromState', 'Não informado')),
-                                'produto': str(row.get('grainName', 'Não informado')),
-                                'preco': preco
-                            })
+        # Pontos do mapa agregados por localização (ou por célula geohash acima de MAX_PONTOS_MAPA)
+        df_map_agg, precisao = construir_pontos_mapa_em_grade(df)
         
-        if not map_data:
+        if df_map_agg.empty:
             st.info("📍 Nenhum contrato com localização disponível para exibir no mapa.")
             return None
         
-        # Converter para DataFrame
-        df_map = pd.DataFrame(map_data)
-        
-        # Garantir que todos os valores numéricos são válidos
-        df_map['lat'] = pd.to_numeric(df_map['lat'], errors='coerce')
-        df_map['lon'] = pd.to_numeric(df_map['lon'], errors='coerce')
-        df_map['quantidade'] = pd.to_numeric(df_map['quantidade'], errors='coerce').fillna(0)
-        df_map['valor'] = pd.to_numeric(df_map['valor'], errors='coerce').fillna(0)
-        df_map['preco'] = pd.to_numeric(df_map['preco'], errors='coerce').fillna(0)
-        
-        # Remover linhas com coordenadas inválidas
-        df_map = df_map.dropna(subset=['lat', 'lon'])
-        
-        if df_map.empty:
-            st.info("📍 Nenhum contrato com coordenadas válidas para exibir no mapa.")
-            return None
-        
-        # Agregar por localização para evitar sobreposição
-        df_map_agg = df_map.groupby(['lat', 'lon', 'cidade', 'estado', 'tipo']).agg({
-            'quantidade': 'sum',
-            'valor': 'sum',
-            'produto': lambda x: ', '.join(x.unique()),
-            'preco': 'mean'
-        }).reset_index()
-        
-        # Garantir que valores agregados são serializáveis
-        df_map_agg['quantidade'] = df_map_agg['quantidade'].astype(float)
-        df_map_agg['valor'] = df_map_agg['valor'].astype(float)
-        df_map_agg['preco'] = df_map_agg['preco'].astype(float)
-        df_map_agg['lat'] = df_map_agg['lat'].astype(float)
-        df_map_agg['lon'] = df_map_agg['lon'].astype(float)
+        hover_data = {
+            'estado': True,
+            'quantidade': ':,',
+            'valor': ':,.2f',
+            'produto': True,
+            'preco': ':,.2f',
+            'lat': False,
+            'lon': False
+        }
+        titulo = '📍 Mapa de Contratos - Supply e Originação'
+        if precisao is not None:
+            hover_data['geohash'] = True
+            titulo += f' (agrupado em células geohash de precisão {precisao})'
         
         # Criar o mapa
         fig = px.scatter_mapbox(
@@ -678,15 +891,7 @@ def criar_mapa_contratos(df, tema='plotly'):
             size='quantidade',
             color='tipo',
             hover_name='cidade',
-            hover_data={
-                'estado': True,
-                'quantidade': ':,',
-                'valor': ':,.2f',
-                'produto': True,
-                'preco': ':,.2f',
-                'lat': False,
-                'lon': False
-            },
+            hover_data=hover_data,
             color_discrete_map={
                 'Supply': '#FF6B6B',
                 'Originação': '#4ECDC4'
@@ -695,7 +900,7 @@ def criar_mapa_contratos(df, tema='plotly'):
             zoom=4,
             center={'lat': -15.7801, 'lon': -47.9292},  # Centro do Brasil
             mapbox_style='open-street-map',
-            title='📍 Mapa de Contratos - Supply e Originação'
+            title=titulo
         )
         
         # Configurar layout
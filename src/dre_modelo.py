@@ -0,0 +1,181 @@
+"""
+Modelo do DRE como grafo de linhas avaliado com NumPy.
+
+Cada linha do DRE é uma fórmula sobre linhas anteriores e premissas (taxas),
+avaliada sobre arrays: um vetor de 12 meses, uma matriz (unidade × mês) ou,
+com premissas em arrays, (cenário × unidade × mês). O DRE simulado
+(gerar_dados_dre) e o DRE dos contratos do MongoDB (load_dre_data_from_mongo)
+usam o mesmo avaliador; só mudam as entradas e as premissas.
+"""
+
+import numpy as np
+
+MESES_DRE = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+
+# Receitas por linha de negócio: entradas obrigatórias do modelo
+ENTRADAS_DRE = ('comercializacao_graos', 'servicos_logisticos', 'consultoria')
+
+# Premissas do DRE sobre contratos reais
+PREMISSAS_DRE = {
+    'icms': 0.045,             # ICMS apenas sobre frete
+    'pis_cofins': 0.0365,      # PIS/COFINS sobre a receita bruta
+    'iss': 0.05,               # ISS sobre serviços (frete + consultoria)
+    'outras_deducoes': 0.015,
+    'compra_graos': 0.82,      # CPV: percentuais da comercialização de grãos
+    'frete_aquisicao': 0.04,
+    'armazenagem': 0.02,
+    'pessoal': 0.08,           # Despesas operacionais: percentuais da receita líquida
+    'marketing': 0.03,
+    'admin': 0.04,
+    'depreciacao': 0.02,
+    'receitas_financeiras': 0.008,
+    'despesas_financeiras': 0.012,
+    'ir_csll': 0.34
+}
+
+# O DRE simulado usa depreciação de 1,5%
+PREMISSAS_SIMULADAS = {**PREMISSAS_DRE, 'depreciacao': 0.015}
+
+# Fórmulas em ordem de avaliação: cada linha usa entradas, linhas anteriores (v) e premissas (p)
+FORMULAS_DRE = {
+    'receita_bruta': lambda v, p: v['comercializacao_graos'] + v['servicos_logisticos'] + v['consultoria'],
+    'icms': lambda v, p: v['servicos_logisticos'] * p['icms'],
+    'pis_cofins': lambda v, p: v['receita_bruta'] * p['pis_cofins'],
+    'iss': lambda v, p: (v['servicos_logisticos'] + v['consultoria']) * p['iss'],
+    'outras_deducoes': lambda v, p: v['receita_bruta'] * p['outras_deducoes'],
+    'total_deducoes': lambda v, p: v['icms'] + v['pis_cofins'] + v['iss'] + v['outras_deducoes'],
+    'receita_liquida': lambda v, p: v['receita_bruta'] - v['total_deducoes'],
+    'compra_graos': lambda v, p: v['comercializacao_graos'] * p['compra_graos'],
+    'frete_aquisicao': lambda v, p: v['comercializacao_graos'] * p['frete_aquisicao'],
+    'armazenagem': lambda v, p: v['comercializacao_graos'] * p['armazenagem'],
+    'total_cpv': lambda v, p: v['compra_graos'] + v['frete_aquisicao'] + v['armazenagem'],
+    'lucro_bruto': lambda v, p: v['receita_liquida'] - v['total_cpv'],
+    'pessoal_beneficios': lambda v, p: v['receita_liquida'] * p['pessoal'],
+    'marketing_vendas': lambda v, p: v['receita_liquida'] * p['marketing'],
+    'despesas_admin': lambda v, p: v['receita_liquida'] * p['admin'],
+    'despesas_operacionais': lambda v, p: v['pessoal_beneficios'] + v['marketing_vendas'] + v['despesas_admin'],
+    'ebitda': lambda v, p: v['lucro_bruto'] - v['despesas_operacionais'],
+    'depreciacao': lambda v, p: v['receita_liquida'] * p['depreciacao'],
+    'resultado_operacional': lambda v, p: v['ebitda'] - v['depreciacao'],
+    'receitas_financeiras': lambda v, p: v['receita_liquida'] * p['receitas_financeiras'],
+    'despesas_financeiras': lambda v, p: v['receita_liquida'] * p['despesas_financeiras'],
+    'resultado_financeiro': lambda v, p: v['receitas_financeiras'] - v['despesas_financeiras'],
+    'lucro_antes_ir': lambda v, p: v['resultado_operacional'] + v['resultado_financeiro'],
+    'ir_csll': lambda v, p: np.maximum(v['lucro_antes_ir'] * p['ir_csll'], 0),
+    'lucro_liquido': lambda v, p: v['lucro_antes_ir'] - v['ir_csll']
+}
+
+# Linhas exibidas: (conta, linha do modelo, sinal na tabela)
+CONTAS_DRE = [
+    ('RECEITA BRUTA', 'receita_bruta', 1),
+    ('  Comercialização de Grãos', 'comercializacao_graos', 1),
+    ('  Serviços Logísticos', 'servicos_logisticos', 1),
+    ('  Consultoria', 'consultoria', 1),
+    ('(-) DEDUÇÕES E IMPOSTOS', 'total_deducoes', -1),
+    ('  ICMS sobre vendas', 'icms', -1),
+    ('  PIS/COFINS', 'pis_cofins', -1),
+    ('  ISS (serviços)', 'iss', -1),
+    ('  Outras deduções', 'outras_deducoes', -1),
+    ('= RECEITA LÍQUIDA', 'receita_liquida', 1),
+    ('(-) CPV', 'total_cpv', -1),
+    ('  Compra de grãos', 'compra_graos', -1),
+    ('  Frete de aquisição', 'frete_aquisicao', -1),
+    ('  Armazenagem inicial', 'armazenagem', -1),
+    ('= LUCRO BRUTO', 'lucro_bruto', 1),
+    ('(-) DESPESAS OPERACIONAIS', 'despesas_operacionais', -1),
+    ('  Pessoal e benefícios', 'pessoal_beneficios', -1),
+    ('  Marketing e vendas', 'marketing_vendas', -1),
+    ('  Despesas administrativas', 'despesas_admin', -1),
+    ('= EBITDA', 'ebitda', 1),
+    ('(-) Depreciação & Amortização', 'depreciacao', -1),
+    ('= RESULTADO OPERACIONAL', 'resultado_operacional', 1),
+    ('(+/-) RESULTADO FINANCEIRO', 'resultado_financeiro', 1),
+    ('  Receitas financeiras', 'receitas_financeiras', 1),
+    ('  Despesas financeiras', 'despesas_financeiras', -1),
+    ('= LUCRO ANTES IR/CSLL', 'lucro_antes_ir', 1),
+    ('(-) IR e CSLL', 'ir_csll', -1),
+    ('= LUCRO LÍQUIDO', 'lucro_liquido', 1)
+]
+
+# Multiplicadores do DRE simulado por unidade: (comercialização, logística, consultoria)
+MULTIPLICADORES_DRE = {
+    'Fox Grãos': (1.0, 0.6, 0.0),
+    'Fox Log': (0.0, 1.0, 0.0),
+    'Clube FX': (0.0, 0.0, 1.0),
+    'Consolidado': (1.0, 1.6, 1.0)
+}
+
+
+def arredondar(valores, casas):
+    """
+    round() do Python elemento a elemento.
+
+    np.round multiplica por 10**casas antes de arredondar e pode divergir de
+    round() em valores próximos da metade; o DRE simulado sempre usou round().
+    """
+    valores = np.asarray(valores, dtype=float)
+    arredondados = [round(valor, casas) for valor in valores.ravel().tolist()]
+    return np.array(arredondados, dtype=float).reshape(valores.shape)
+
+
+def avaliar_dre(entradas, premissas=None, casas=None):
+    """
+    Avalia todas as linhas do DRE sobre arrays.
+
+    Args:
+        entradas: linha -> array (último eixo = meses). Além de ENTRADAS_DRE, qualquer
+            linha de FORMULAS_DRE pode ser informada (ex.: receita bruta ou despesas
+            reais); onde o valor informado for NaN, vale a fórmula
+        premissas: taxas que substituem PREMISSAS_DRE; arrays de formato (cenários, 1, ...)
+            avaliam vários cenários de uma vez por broadcasting
+        casas: arredonda cada linha com essas casas decimais antes de usá-la nas seguintes
+
+    Returns:
+        Dicionário linha -> array com as entradas e todas as linhas calculadas
+    """
+    p = {chave: np.asarray(valor, dtype=float) for chave, valor in {**PREMISSAS_DRE, **(premissas or {})}.items()}
+    v = {chave: np.asarray(entradas[chave], dtype=float) for chave in ENTRADAS_DRE}
+
+    for chave, formula in FORMULAS_DRE.items():
+        valor = formula(v, p)
+        if chave in entradas:
+            informado = np.asarray(entradas[chave], dtype=float)
+            valor = np.where(np.isnan(informado), valor, informado)
+        if casas is not None:
+            valor = arredondar(valor, casas)
+        v[chave] = valor
+    return v
+
+
+def tabela_dre(valores, colunas=MESES_DRE):
+    """
+    Estrutura {'Conta': [...], coluna: [...]} usada por exibir_tabela_dre_hierarquica.
+
+    Args:
+        valores: resultado de avaliar_dre para uma unidade (arrays de len(colunas))
+    """
+    matriz = np.stack([sinal * np.broadcast_to(valores[chave], (len(colunas),)) for _, chave, sinal in CONTAS_DRE])
+    return {
+        'Conta': [conta for conta, _, _ in CONTAS_DRE],
+        **{coluna: matriz[:, j].tolist() for j, coluna in enumerate(colunas)}
+    }
+
+
+def entradas_simuladas(unidades):
+    """Receitas simuladas (R$ milhões) por unidade e mês, matriz (unidade × mês)"""
+    multiplicadores = np.array([
+        MULTIPLICADORES_DRE.get(unidade, MULTIPLICADORES_DRE['Consolidado']) for unidade in unidades
+    ])
+    i = np.arange(len(MESES_DRE))
+    bases = np.stack([15.2 + i * 0.7, 8.5 + i * 0.4, 2.8 + i * 0.1])
+    receitas = arredondar(bases[None, :, :] * multiplicadores[:, :, None], 1)
+    return dict(zip(ENTRADAS_DRE, receitas.transpose(1, 0, 2)))
+
+
+def gerar_dre_simulado(unidades=tuple(MULTIPLICADORES_DRE)):
+    """DRE simulado de várias unidades em uma única avaliação (unidade × mês)"""
+    valores = avaliar_dre(entradas_simuladas(unidades), PREMISSAS_SIMULADAS, casas=1)
+    return {
+        unidade: tabela_dre({chave: valor[u] for chave, valor in valores.items()})
+        for u, unidade in enumerate(unidades)
+    }
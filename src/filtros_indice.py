@@ -0,0 +1,224 @@
+"""
+Índice de filtros para o DataFrame de contratos.
+
+Construído uma vez por snapshot de contratos (ver 'versao_snapshot' em
+DataFrame.attrs, definido por FOXMongoConnector.get_contracts_summary):
+- colunas de baixa cardinalidade (grão, status, ano, flags booleanas) viram
+  bitsets compactados (np.packbits), combinados com AND bit a bit;
+- colunas de alta cardinalidade (vendedor) viram listas invertidas de posições.
+
+Uma combinação de filtros vira alguns ANDs e um único df.take().
+"""
+
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Colunas com até este número de valores distintos usam bitsets; acima, listas de posições
+LIMITE_BITSET = 64
+
+# Colunas de igualdade indexadas e flags booleanas
+COLUNAS_INDEXADAS = ['grainName', 'status', 'sellerName']
+FLAGS_INDEXADAS = ['isBuying', 'isGrain', 'isFreight', 'isService']
+
+# Índices mantidos em memória (um por snapshot)
+MAX_INDICES = 4
+
+# Visões filtradas mantidas em memória (LRU por snapshot + combinação de filtros)
+MAX_VISOES = 32
+
+_indices = OrderedDict()
+_lock_indices = threading.Lock()
+
+_visoes = OrderedDict()
+_lock_visoes = threading.Lock()
+
+
+def versao_snapshot(df):
+    """Versão do snapshot de contratos de onde o DataFrame veio (None se desconhecida)"""
+    return df.attrs.get('versao_snapshot')
+
+
+def _indexar_valores(valores, total):
+    """Bitsets (baixa cardinalidade) ou listas de posições (alta cardinalidade) por valor"""
+    codigos, unicos = pd.factorize(valores, use_na_sentinel=True)
+    if len(unicos) <= LIMITE_BITSET:
+        return {
+            'tipo': 'bitset',
+            'valores': {
+                valor: np.packbits(codigos == codigo)
+                for codigo, valor in enumerate(unicos)
+            }
+        }
+
+    # Ordenação estável agrupa as posições de cada código mantendo a ordem original
+    ordem = np.argsort(codigos, kind='stable').astype(np.int64)
+    limites = np.searchsorted(codigos[ordem], np.arange(len(unicos) + 1))
+    return {
+        'tipo': 'posicoes',
+        'valores': {
+            valor: ordem[limites[codigo]:limites[codigo + 1]]
+            for codigo, valor in enumerate(unicos)
+        }
+    }
+
+
+def construir_indice(df):
+    """Constrói o índice de filtros de um DataFrame de contratos"""
+    total = len(df)
+    colunas = {}
+
+    for coluna in COLUNAS_INDEXADAS:
+        if coluna in df.columns:
+            colunas[coluna] = _indexar_valores(df[coluna], total)
+
+    if 'closeDate' in df.columns and pd.api.types.is_datetime64_any_dtype(df['closeDate']):
+        anos = df['closeDate'].dt.year
+        colunas['ano'] = _indexar_valores(anos.where(anos.notna()).astype('Int64'), total)
+
+    for flag in FLAGS_INDEXADAS:
+        if flag in df.columns:
+            colunas[flag] = {
+                'tipo': 'bitset',
+                'valores': {
+                    True: np.packbits((df[flag] == True).to_numpy()),
+                    False: np.packbits((df[flag] == False).to_numpy())
+                }
+            }
+
+    return {'total': total, 'rotulos': df.index, 'colunas': colunas}
+
+
+def obter_indice(df):
+    """Índice de filtros do snapshot do DataFrame, construído na primeira vez e reaproveitado depois"""
+    versao = versao_snapshot(df)
+    if versao is None:
+        return construir_indice(df)
+
+    with _lock_indices:
+        indice = _indices.get(versao)
+        if indice is not None:
+            _indices.move_to_end(versao)
+
+    # Recortes do snapshot (ex.: filtrado por ano) herdam attrs mas não as posições
+    if indice is not None and indice['rotulos'].equals(df.index):
+        return indice
+    if indice is not None:
+        return construir_indice(df)
+
+    indice = construir_indice(df)
+    with _lock_indices:
+        _indices[versao] = indice
+        while len(_indices) > MAX_INDICES:
+            _indices.popitem(last=False)
+    return indice
+
+
+def posicoes_filtradas(indice, condicoes):
+    """
+    Posições (ordenadas) das linhas que atendem todas as condições.
+
+    Args:
+        indice: índice retornado por obter_indice
+        condicoes: lista de (coluna, valor) combinadas com AND; condições sobre colunas
+            fora do índice são ignoradas (como nos filtros originais)
+
+    Returns:
+        Array de posições, ou None quando não há condições (todas as linhas)
+    """
+    total = indice['total']
+    bits = None
+    posicoes = None
+
+    for coluna, valor in condicoes:
+        entrada = indice['colunas'].get(coluna)
+        if entrada is None:
+            continue
+        selecao = entrada['valores'].get(valor)
+        if selecao is None:
+            return np.empty(0, dtype=np.int64)
+        if entrada['tipo'] == 'bitset':
+            bits = selecao if bits is None else bits & selecao
+        else:
+            posicoes = selecao if posicoes is None else np.intersect1d(posicoes, selecao, assume_unique=True)
+
+    if posicoes is not None:
+        if bits is not None:
+            # Testa o bit de cada posição da lista invertida no bitset combinado
+            ligados = (bits[posicoes >> 3] >> (7 - (posicoes & 7)).astype(np.uint8)) & 1
+            posicoes = posicoes[ligados.astype(bool)]
+        return posicoes
+    if bits is not None:
+        return np.flatnonzero(np.unpackbits(bits, count=total))
+    return None
+
+
+def filtrar_por_indice(df, condicoes):
+    """Aplica as condições (coluna, valor) ao DataFrame usando o índice do snapshot"""
+    if df.empty or not condicoes:
+        return df
+    posicoes = posicoes_filtradas(obter_indice(df), condicoes)
+    if posicoes is None:
+        return df
+    return df.take(posicoes)
+
+
+def filtrar_com_cache(df, chave_filtros, condicoes):
+    """
+    Como filtrar_por_indice, mas memoriza o resultado por (snapshot, chave_filtros).
+
+    Reruns e seções que repetem a mesma combinação recebem o mesmo DataFrame já
+    filtrado, sem recalcular nem copiar. Só vale para o snapshot completo; recortes
+    e DataFrames sem versão são filtrados normalmente.
+
+    Args:
+        df: DataFrame de contratos
+        chave_filtros: tupla que identifica a combinação (ex.: ('globais', grao, status, ...))
+        condicoes: condições (coluna, valor) correspondentes à chave
+    """
+    versao = versao_snapshot(df)
+    if versao is None or df.empty or not condicoes:
+        return filtrar_por_indice(df, condicoes)
+
+    indice = obter_indice(df)
+    with _lock_indices:
+        do_snapshot = _indices.get(versao) is indice
+    if not do_snapshot:
+        return filtrar_por_indice(df, condicoes)
+
+    chave = (versao,) + tuple(chave_filtros)
+    with _lock_visoes:
+        visao = _visoes.get(chave)
+        if visao is not None:
+            _visoes.move_to_end(chave)
+            return visao
+
+    posicoes = posicoes_filtradas(indice, condicoes)
+    visao = df if posicoes is None else df.take(posicoes)
+    with _lock_visoes:
+        _visoes[chave] = visao
+        while len(_visoes) > MAX_VISOES:
+            _visoes.popitem(last=False)
+    return visao
+
+
+def opcoes_do_indice(df):
+    """
+    Opções de filtros (grãos, status, anos, vendedores) a partir das chaves do índice
+    do snapshot, sem percorrer as linhas do DataFrame.
+    """
+    colunas = obter_indice(df)['colunas']
+
+    def chaves(coluna):
+        if coluna not in colunas:
+            return []
+        return [valor for valor in colunas[coluna]['valores'] if pd.notna(valor) and valor != 'Não informado']
+
+    return {
+        'graos': sorted(chaves('grainName')),
+        'status': sorted(chaves('status')),
+        'anos': sorted((int(ano) for ano in chaves('ano')), reverse=True),
+        'vendedores': sorted(chaves('sellerName'))
+    }
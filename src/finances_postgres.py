@@ -0,0 +1,249 @@
+"""
+Backend PostgreSQL para os loaders financeiros do dashboard.
+
+Lê as tabelas espelhadas por sync_financials (finances, finances_categories)
+e faz as agregações no banco com GROUP BY, em vez de trazer os documentos
+do MongoDB para agregar em pandas.
+
+Tabelas: finances, finances_categories
+"""
+
+from datetime import datetime, timezone, timedelta
+import logging
+
+import pandas as pd
+import psycopg2
+import streamlit as st
+
+from instrumentacao import etapa
+from sync_financials import PG_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Datas do MongoDB são horário de Brasília; o sync grava em UTC (TIMESTAMPTZ)
+FUSO_BRT = timezone(timedelta(hours=-3))
+DATA_LOCAL = "(f.date AT TIME ZONE INTERVAL '-03:00')"
+
+# Mesmas regras de subcategorização de load_expenses_from_finances (MongoDB)
+REGEX_PESSOAL = 'PESSOAL|SALARIO|BENEFICIO|FUNCIONARIO|RH'
+REGEX_MARKETING = 'MARKETING|VENDAS|COMERCIAL|PUBLICIDADE|PROPAGANDA'
+REGEX_ADMIN = 'ADMINISTRATIV|ESCRITORIO|ALUGUEL|TELEFONE|INTERNET|CONTABILIDADE|JURIDICO|CONSULTORIA'
+
+METRICAS_ZERADAS = {
+    'receitas': 0,
+    'despesas': 0,
+    'despesas_operacionais': 0,
+    'despesas_financeiras': 0,
+    'investimentos': 0,
+    'emprestimos': 0,
+    'pagamentos_emprestimos': 0
+}
+
+DESPESAS_ZERADAS = {
+    'pessoal_beneficios': 0,
+    'marketing_vendas': 0,
+    'despesas_admin': 0,
+    'outras_operacionais': 0,
+    'despesas_operacionais': 0,
+    'total_documentos': 0
+}
+
+
+@st.cache_resource
+def get_pg_connection():
+    """Conexão somente leitura com o PostgreSQL espelhado (reutilizada entre reruns)"""
+    conn = psycopg2.connect(**PG_CONFIG)
+    conn.set_session(readonly=True, autocommit=True)
+    return conn
+
+
+def _consultar(sql, params=None):
+    """Executa a consulta e retorna um DataFrame com as colunas do cursor"""
+    conn = get_pg_connection()
+    if conn.closed:
+        get_pg_connection.clear()
+        conn = get_pg_connection()
+
+    with conn.cursor() as cur:
+        with etapa('consulta'):
+            cur.execute(sql, params)
+            linhas = cur.fetchall()
+        colunas = [desc[0] for desc in cur.description]
+        with etapa('decodificacao'):
+            return pd.DataFrame(linhas, columns=colunas)
+
+
+def _intervalo(year=None, month=None):
+    """Intervalo [inicio, fim) em horário de Brasília, comparável direto com o índice de finances.date"""
+    if month:
+        # Mês sem ano: mês do ano corrente
+        ano = year or datetime.now(FUSO_BRT).year
+        inicio = datetime(ano, month, 1, tzinfo=FUSO_BRT)
+        fim = datetime(ano + month // 12, month % 12 + 1, 1, tzinfo=FUSO_BRT)
+        return inicio, fim
+    if year:
+        return datetime(year, 1, 1, tzinfo=FUSO_BRT), datetime(year + 1, 1, 1, tzinfo=FUSO_BRT)
+    return None, None
+
+
+def _filtro_periodo(year=None, month=None):
+    """Cláusula WHERE e parâmetros para o período"""
+    inicio, fim = _intervalo(year, month)
+    if inicio is None:
+        return "TRUE", {}
+    return "f.date >= %(inicio)s AND f.date < %(fim)s", {'inicio': inicio, 'fim': fim}
+
+
+def load_finances_data_pg(year=None):
+    """Versão PostgreSQL de load_finances_data (finances + finances_categories)"""
+    filtro, params = _filtro_periodo(year)
+    df = _consultar(f"""
+        SELECT
+            f.id AS "_id",
+            {DATA_LOCAL} AS date,
+            f.name,
+            f.value::float8 AS value,
+            f.category,
+            f.account_id,
+            f.is_forecast AS "isForecast",
+            fc.category AS "categoryName",
+            fc.type AS "categoryType"
+        FROM finances f
+        LEFT JOIN finances_categories fc ON fc.id = f.category
+        WHERE {filtro}
+    """, params)
+
+    if df.empty:
+        return pd.DataFrame()
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['month'] = df['date'].dt.month
+    df['year'] = df['date'].dt.year
+    # No espelho o valor do lançamento fica em 'value'; 'amount' mantém a interface do loader MongoDB
+    df['amount'] = pd.to_numeric(df['value'], errors='coerce').fillna(0)
+    return df
+
+
+def calculate_financial_metrics_pg(year=None):
+    """Versão PostgreSQL de calculate_financial_metrics, agregada por mês no banco"""
+    filtro, params = _filtro_periodo(year)
+    df = _consultar(f"""
+        SELECT
+            EXTRACT(MONTH FROM {DATA_LOCAL})::int AS mes,
+            COALESCE(SUM(f.value) FILTER (WHERE f.value > 0), 0)::float8 AS receitas,
+            COALESCE(ABS(SUM(f.value) FILTER (WHERE f.value < 0)), 0)::float8 AS despesas,
+            COALESCE(ABS(SUM(f.value) FILTER (
+                WHERE f.value < 0 AND fc.type IN ('operational', 'administrative', 'personnel')
+            )), 0)::float8 AS despesas_operacionais,
+            COALESCE(ABS(SUM(f.value) FILTER (
+                WHERE f.value < 0 AND fc.type = 'financial'
+            )), 0)::float8 AS despesas_financeiras,
+            COALESCE(SUM(f.value) FILTER (WHERE fc.type = 'investment'), 0)::float8 AS investimentos,
+            COALESCE(SUM(f.value) FILTER (WHERE fc.type = 'loan' AND f.value > 0), 0)::float8 AS emprestimos,
+            COALESCE(ABS(SUM(f.value) FILTER (
+                WHERE fc.type = 'loan' AND f.value < 0
+            )), 0)::float8 AS pagamentos_emprestimos
+        FROM finances f
+        LEFT JOIN finances_categories fc ON fc.id = f.category
+        WHERE {filtro} AND f.date IS NOT NULL
+        GROUP BY mes
+    """, params)
+
+    if df.empty:
+        return {}
+
+    monthly_data = {mes: dict(METRICAS_ZERADAS) for mes in range(1, 13)}
+    for registro in df.to_dict('records'):
+        mes = registro.pop('mes')
+        monthly_data[mes] = registro
+    return monthly_data
+
+
+def load_expenses_from_finances_pg(year=None, month=None):
+    """Versão PostgreSQL de load_expenses_from_finances (DESPESAS ADMINISTRATIVAS por subcategoria)"""
+    filtro, params = _filtro_periodo(year, month)
+    params.update({
+        'regex_pessoal': REGEX_PESSOAL,
+        'regex_marketing': REGEX_MARKETING,
+        'regex_admin': REGEX_ADMIN,
+        'regex_todas': f'{REGEX_PESSOAL}|{REGEX_MARKETING}|{REGEX_ADMIN}'
+    })
+    df = _consultar(f"""
+        SELECT
+            COALESCE(SUM(ABS(f.value)) FILTER (WHERE fc.item ~* %(regex_pessoal)s), 0)::float8 AS pessoal_beneficios,
+            COALESCE(SUM(ABS(f.value)) FILTER (WHERE fc.item ~* %(regex_marketing)s), 0)::float8 AS marketing_vendas,
+            COALESCE(SUM(ABS(f.value)) FILTER (WHERE fc.item ~* %(regex_admin)s), 0)::float8 AS despesas_admin,
+            COALESCE(SUM(ABS(f.value)) FILTER (
+                WHERE NOT COALESCE(fc.item ~* %(regex_todas)s, FALSE)
+            ), 0)::float8 AS outras_operacionais,
+            COUNT(*) AS total_documentos
+        FROM finances f
+        JOIN finances_categories fc ON fc.id = f.category
+        WHERE {filtro}
+          AND f.value < 0
+          AND fc.category = 'DESPESAS ADMINISTRATIVAS'
+    """, params)
+
+    despesas = df.iloc[0].to_dict()
+    if not despesas['total_documentos']:
+        return dict(DESPESAS_ZERADAS)
+
+    despesas = {chave: float(valor) for chave, valor in despesas.items()}
+    despesas['despesas_operacionais'] = (
+        despesas['pessoal_beneficios'] + despesas['marketing_vendas'] +
+        despesas['despesas_admin'] + despesas['outras_operacionais']
+    )
+    despesas['total_documentos'] = int(despesas['total_documentos'])
+    return despesas
+
+
+def verificar_paridade_finances(year=None, month=None, tolerancia=0.01):
+    """
+    Compara os loaders financeiros nos backends MongoDB e PostgreSQL.
+
+    Returns:
+        Lista de divergências (loader, chave, valor MongoDB, valor PostgreSQL);
+        lista vazia quando os dois backends concordam.
+    """
+    from mongodb_connector import (
+        _load_finances_data_mongo,
+        _calculate_financial_metrics_mongo,
+        _load_expenses_from_finances_mongo
+    )
+
+    divergencias = []
+
+    def comparar(loader, chave, valor_mongo, valor_pg):
+        if abs(float(valor_mongo or 0) - float(valor_pg or 0)) > tolerancia:
+            divergencias.append((loader, chave, valor_mongo, valor_pg))
+
+    # Despesas: mesma regra de filtro (prefixo da data) nos dois lados
+    despesas_mongo = _load_expenses_from_finances_mongo(year, month)
+    despesas_pg = load_expenses_from_finances_pg(year, month)
+    for chave in DESPESAS_ZERADAS:
+        comparar('load_expenses_from_finances', chave, despesas_mongo[chave], despesas_pg[chave])
+
+    # Lançamentos: quantidade e soma de 'value' por mês
+    df_mongo = _load_finances_data_mongo(year)
+    df_pg = load_finances_data_pg(year)
+    for nome, df in (('mongo', df_mongo), ('pg', df_pg)):
+        if df.empty or 'value' not in df.columns:
+            logger.warning(f"Paridade: backend {nome} sem lançamentos para comparar")
+    if not df_mongo.empty and not df_pg.empty and 'value' in df_mongo.columns:
+        resumo_mongo = df_mongo.groupby('month')['value'].agg(['count', 'sum'])
+        resumo_pg = df_pg.groupby('month')['value'].agg(['count', 'sum'])
+        resumo = resumo_mongo.join(resumo_pg, how='outer', lsuffix='_mongo', rsuffix='_pg').fillna(0)
+        for mes, linha in resumo.iterrows():
+            comparar('load_finances_data', f'{mes}/count', linha['count_mongo'], linha['count_pg'])
+            comparar('load_finances_data', f'{mes}/sum', linha['sum_mongo'], linha['sum_pg'])
+
+    # Métricas mensais
+    metricas_mongo = _calculate_financial_metrics_mongo(year)
+    metricas_pg = calculate_financial_metrics_pg(year)
+    for mes in range(1, 13):
+        mongo_mes = metricas_mongo.get(mes, METRICAS_ZERADAS)
+        pg_mes = metricas_pg.get(mes, METRICAS_ZERADAS)
+        for chave in METRICAS_ZERADAS:
+            comparar('calculate_financial_metrics', f'{mes}/{chave}', mongo_mes[chave], pg_mes[chave])
+
+    return divergencias
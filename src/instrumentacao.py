@@ -0,0 +1,326 @@
+"""
+Instrumentação dos loaders do MongoDB.
+
+Registra em memória, por loader: chamadas, acertos e faltas do st.cache_data,
+atualizações em segundo plano, tempo (total, máximo e percentis das últimas
+chamadas), tempo por etapa (consulta, decodificação, processamento), linhas e
+bytes devolvidos. Os tempos são inclusivos: um loader que chama outro inclui
+o tempo do outro.
+
+- loader_em_cache: substitui @st.cache_data nos loaders e distingue acerto de
+  falta (a função interna só roda na falta).
+- instrumentar: mede funções e métodos sem cache (ex.: FOXMongoConnector).
+- etapa / anotar: tempo de uma etapa e contadores extras da medição corrente.
+
+As métricas saem no painel "Performance" do app, em JSON (exportar_json) e
+no formato texto do Prometheus (exportar_prometheus); com FOX_METRICAS_PROMETHEUS
+o texto é gravado periodicamente nesse arquivo (coletor textfile do node_exporter).
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Durações guardadas por loader para os percentis
+MAX_AMOSTRAS = 256
+
+# Arquivo e intervalo (s) da exportação periódica no formato do Prometheus
+ARQUIVO_PROMETHEUS = os.environ.get('FOX_METRICAS_PROMETHEUS')
+INTERVALO_EXPORTACAO = 60
+
+_registros = {}
+_lock_registros = threading.Lock()
+_local = threading.local()
+
+_thread_exportacao = None
+_lock_exportacao = threading.Lock()
+
+iniciado_em = datetime.now()
+
+
+def _novo_registro():
+    return {
+        'chamadas': 0,
+        'acertos_cache': 0,
+        'faltas_cache': 0,
+        'atualizacoes_segundo_plano': 0,
+        'erros': 0,
+        'segundos_total': 0.0,
+        'segundos_max': 0.0,
+        'linhas_total': 0,
+        'bytes_total': 0,
+        'etapas': {},
+        'contadores': {},
+        'amostras': deque(maxlen=MAX_AMOSTRAS)
+    }
+
+
+def _pilha():
+    if not hasattr(_local, 'pilha'):
+        _local.pilha = []
+    return _local.pilha
+
+
+def _tamanho(resultado):
+    """(linhas, bytes) de um resultado: DataFrame (memória rasa), dict/list (itens) ou outro (0, 0)"""
+    if isinstance(resultado, pd.DataFrame):
+        return len(resultado), int(resultado.memory_usage(index=True, deep=False).sum())
+    if isinstance(resultado, (dict, list, tuple)):
+        return len(resultado), 0
+    return 0, 0
+
+
+@contextmanager
+def _medicao(rotulo, com_cache=False):
+    """Mede uma chamada do loader e acumula no registro ao sair"""
+    medicao = {'rotulo': rotulo, 'executou': False, 'etapas': {}, 'contadores': {}, 'resultado': None}
+    pilha = _pilha()
+    pilha.append(medicao)
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        yield medicao
+    except Exception:
+        erro = True
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        pilha.pop()
+        linhas, tamanho = _tamanho(medicao['resultado'])
+        with _lock_registros:
+            registro = _registros.setdefault(rotulo, _novo_registro())
+            registro['chamadas'] += 1
+            registro['erros'] += erro
+            if com_cache:
+                registro['faltas_cache' if medicao['executou'] else 'acertos_cache'] += 1
+            registro['segundos_total'] += duracao
+            registro['segundos_max'] = max(registro['segundos_max'], duracao)
+            registro['linhas_total'] += linhas
+            registro['bytes_total'] += tamanho
+            registro['amostras'].append(duracao)
+            for nome, segundos in medicao['etapas'].items():
+                registro['etapas'][nome] = registro['etapas'].get(nome, 0.0) + segundos
+            for nome, valor in medicao['contadores'].items():
+                registro['contadores'][nome] = registro['contadores'].get(nome, 0) + valor
+
+
+@contextmanager
+def etapa(nome):
+    """Soma o tempo do bloco na etapa 'nome' da medição corrente (sem medição ativa, só executa)"""
+    pilha = _pilha()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if pilha:
+            etapas = pilha[-1]['etapas']
+            etapas[nome] = etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+
+def anotar(nome, valor=1):
+    """Soma 'valor' ao contador 'nome' da medição corrente (ex.: acertos do cache em disco)"""
+    pilha = _pilha()
+    if pilha:
+        contadores = pilha[-1]['contadores']
+        contadores[nome] = contadores.get(nome, 0) + valor
+
+
+def instrumentar(nome=None):
+    """Decorador que mede chamadas de uma função ou método sem cache"""
+    def decorador(funcao):
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with _medicao(rotulo) as medicao:
+                medicao['resultado'] = funcao(*args, **kwargs)
+                return medicao['resultado']
+        return envoltorio
+    return decorador
+
+
+def loader_em_cache(nome=None, **opcoes_cache):
+    """
+    @st.cache_data(**opcoes_cache) instrumentado.
+
+    A função original roda dentro do cache; se rodou durante a chamada, foi uma
+    falta, senão um acerto. Execuções sem chamada ativa na thread são as
+    atualizações em segundo plano (refresh_mode='background'). Mantém .clear().
+    """
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            pilha = _pilha()
+            if pilha and pilha[-1]['rotulo'] == rotulo:
+                pilha[-1]['executou'] = True
+            else:
+                with _lock_registros:
+                    _registros.setdefault(rotulo, _novo_registro())['atualizacoes_segundo_plano'] += 1
+            return funcao(*args, **kwargs)
+
+        em_cache = st.cache_data(**opcoes_cache)(executar)
+
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            with _medicao(rotulo, com_cache=True) as medicao:
+                medicao['resultado'] = em_cache(*args, **kwargs)
+                return medicao['resultado']
+
+        envoltorio.clear = em_cache.clear
+        return envoltorio
+    return decorador
+
+
+def metricas():
+    """
+    Cópia das métricas por loader.
+
+    Returns:
+        Dicionário loader -> contadores, tempos (total, médio, máximo, p50, p95),
+        taxa de acerto do cache, etapas e contadores extras
+    """
+    with _lock_registros:
+        registros = {rotulo: {**registro, 'amostras': list(registro['amostras'])} for rotulo, registro in _registros.items()}
+
+    resultado = {}
+    for rotulo, registro in registros.items():
+        amostras = registro.pop('amostras')
+        consultas_cache = registro['acertos_cache'] + registro['faltas_cache']
+        resultado[rotulo] = {
+            **registro,
+            'segundos_medio': registro['segundos_total'] / registro['chamadas'] if registro['chamadas'] else 0.0,
+            'segundos_p50': float(np.percentile(amostras, 50)) if amostras else 0.0,
+            'segundos_p95': float(np.percentile(amostras, 95)) if amostras else 0.0,
+            'taxa_acerto_cache': registro['acertos_cache'] / consultas_cache if consultas_cache else None
+        }
+    return resultado
+
+
+def tabela_metricas():
+    """Métricas em DataFrame (uma linha por loader, do maior tempo total para o menor)"""
+    linhas = []
+    for rotulo, m in metricas().items():
+        linhas.append({
+            'Loader': rotulo,
+            'Chamadas': m['chamadas'],
+            'Acerto cache': m['taxa_acerto_cache'],
+            'Faltas': m['faltas_cache'],
+            'Atualizações 2º plano': m['atualizacoes_segundo_plano'],
+            'Erros': m['erros'],
+            'Total (s)': m['segundos_total'],
+            'Médio (ms)': m['segundos_medio'] * 1000,
+            'p95 (ms)': m['segundos_p95'] * 1000,
+            'Máx (ms)': m['segundos_max'] * 1000,
+            'Linhas': m['linhas_total'],
+            'MB': m['bytes_total'] / 1024 ** 2,
+            'Etapas (s)': ', '.join(f"{nome}: {segundos:.2f}" for nome, segundos in m['etapas'].items()),
+            'Contadores': ', '.join(f"{nome}: {valor}" for nome, valor in m['contadores'].items())
+        })
+    if not linhas:
+        return pd.DataFrame()
+    return pd.DataFrame(linhas).sort_values('Total (s)', ascending=False, ignore_index=True)
+
+
+def exportar_json():
+    """Métricas em JSON (com início da coleta e instante da exportação)"""
+    return json.dumps({
+        'iniciado_em': iniciado_em.isoformat(timespec='seconds'),
+        'exportado_em': datetime.now().isoformat(timespec='seconds'),
+        'loaders': metricas()
+    }, indent=2, ensure_ascii=False)
+
+
+# (métrica, tipo, descrição, campo de metricas())
+METRICAS_PROMETHEUS = [
+    ('fox_loader_chamadas_total', 'counter', 'Chamadas do loader', 'chamadas'),
+    ('fox_loader_cache_acertos_total', 'counter', 'Acertos do st.cache_data', 'acertos_cache'),
+    ('fox_loader_cache_faltas_total', 'counter', 'Faltas do st.cache_data', 'faltas_cache'),
+    ('fox_loader_atualizacoes_segundo_plano_total', 'counter', 'Atualizações do cache em segundo plano', 'atualizacoes_segundo_plano'),
+    ('fox_loader_erros_total', 'counter', 'Chamadas que terminaram em exceção', 'erros'),
+    ('fox_loader_segundos_total', 'counter', 'Tempo acumulado (inclusivo)', 'segundos_total'),
+    ('fox_loader_segundos_max', 'gauge', 'Maior duração de uma chamada', 'segundos_max'),
+    ('fox_loader_segundos_p95', 'gauge', 'Percentil 95 das últimas chamadas', 'segundos_p95'),
+    ('fox_loader_linhas_total', 'counter', 'Linhas devolvidas', 'linhas_total'),
+    ('fox_loader_bytes_total', 'counter', 'Bytes devolvidos (memória rasa dos DataFrames)', 'bytes_total')
+]
+
+
+def _rotulo_prometheus(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exportar_prometheus():
+    """Métricas no formato texto de exposição do Prometheus"""
+    dados = metricas()
+    linhas = []
+    for metrica, tipo, descricao, campo in METRICAS_PROMETHEUS:
+        linhas.append(f"# HELP {metrica} {descricao}")
+        linhas.append(f"# TYPE {metrica} {tipo}")
+        for rotulo, m in sorted(dados.items()):
+            linhas.append(f'{metrica}{{loader="{_rotulo_prometheus(rotulo)}"}} {m[campo]}')
+
+    linhas.append("# HELP fox_loader_etapa_segundos_total Tempo acumulado por etapa")
+    linhas.append("# TYPE fox_loader_etapa_segundos_total counter")
+    for rotulo, m in sorted(dados.items()):
+        for nome, segundos in sorted(m['etapas'].items()):
+            linhas.append(
+                f'fox_loader_etapa_segundos_total{{loader="{_rotulo_prometheus(rotulo)}",etapa="{_rotulo_prometheus(nome)}"}} {segundos}'
+            )
+    return '\n'.join(linhas) + '\n'
+
+
+def resetar():
+    """Zera todas as métricas"""
+    global iniciado_em
+    with _lock_registros:
+        _registros.clear()
+        iniciado_em = datetime.now()
+
+
+def gravar_prometheus(caminho):
+    """Grava exportar_prometheus() de forma atômica (o coletor nunca lê arquivo parcial)"""
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.metricas_', suffix='.prom')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(exportar_prometheus())
+        os.replace(temporario, caminho)
+    except Exception:
+        os.unlink(temporario)
+        raise
+
+
+def iniciar_exportacao_prometheus(caminho=ARQUIVO_PROMETHEUS, intervalo=INTERVALO_EXPORTACAO):
+    """Grava as métricas no arquivo a cada 'intervalo' segundos (uma thread por processo; sem caminho, nada)"""
+    global _thread_exportacao
+    if not caminho:
+        return None
+
+    def exportar():
+        while True:
+            try:
+                gravar_prometheus(caminho)
+            except Exception as e:
+                logger.warning(f"Erro ao exportar métricas: {str(e)}")
+            time.sleep(intervalo)
+
+    with _lock_exportacao:
+        if _thread_exportacao is None:
+            _thread_exportacao = threading.Thread(target=exportar, name='exportacao_metricas', daemon=True)
+            _thread_exportacao.start()
+        return _thread_exportacao
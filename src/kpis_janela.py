@@ -0,0 +1,146 @@
+"""
+Motor de KPIs por janela móvel para o DataFrame de contratos.
+
+Os contratos são pré-agregados uma vez em uma série diária (por data de
+fechamento, separando compra e venda por isBuying) guardada como somas
+acumuladas. A soma de qualquer janela de dias vira duas buscas binárias e
+uma subtração, então comparar últimos 7/30/90 dias com o período anterior
+não percorre mais o DataFrame.
+
+As janelas são alinhadas ao dia: "últimos 30 dias" começa à meia-noite de
+30 dias atrás e inclui datas futuras, como no filtro original por closeDate.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import threading
+
+import numpy as np
+import pandas as pd
+
+from filtros_indice import versao_snapshot
+
+# Métricas somadas por dia; o preço médio sai de soma_preco / qtd_preco
+METRICAS_DIARIAS = ['contratos', 'valor', 'volume_comprado', 'volume_vendido', 'soma_preco', 'qtd_preco']
+
+# Séries mantidas em memória (LRU por snapshot + combinação de filtros)
+MAX_SERIES = 32
+
+_series = OrderedDict()
+_lock_series = threading.Lock()
+
+
+def _numero(df, coluna):
+    """Coluna numérica como float (NaN onde ausente ou inválida)"""
+    if coluna not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def construir_serie_diaria(df, coluna_data='closeDate'):
+    """
+    Série diária acumulada das métricas de KPI de um DataFrame de contratos.
+
+    Returns:
+        Dicionário com 'dias' (datetime64 ordenado), 'acumulado' (métrica -> somas
+        acumuladas com um zero inicial, len(dias) + 1) e 'totais' (métrica -> soma
+        de todos os contratos, inclusive os sem data)
+    """
+    quantidade = _numero(df, 'amount')
+    preco = _numero(df, 'bagPrice')
+    compra = (df['isBuying'] == True).to_numpy() if 'isBuying' in df.columns else np.zeros(len(df), dtype=bool)
+    venda = (df['isBuying'] == False).to_numpy() if 'isBuying' in df.columns else np.zeros(len(df), dtype=bool)
+
+    metricas = pd.DataFrame({
+        'contratos': np.ones(len(df)),
+        'valor': np.nan_to_num(_numero(df, 'valorTotal')),
+        'volume_comprado': np.where(compra, np.nan_to_num(quantidade), 0.0),
+        'volume_vendido': np.where(venda, np.nan_to_num(quantidade), 0.0),
+        'soma_preco': np.nan_to_num(preco),
+        'qtd_preco': (~np.isnan(preco)).astype(float)
+    })
+
+    datas = pd.to_datetime(df[coluna_data], errors='coerce') if coluna_data in df.columns else pd.Series(pd.NaT, index=df.index)
+    dias = datas.dt.normalize().to_numpy()
+    com_data = ~pd.isna(dias)
+
+    diario = metricas[com_data].groupby(dias[com_data], sort=True).sum()
+    acumulado = np.vstack([np.zeros((1, len(METRICAS_DIARIAS))), diario[METRICAS_DIARIAS].to_numpy().cumsum(axis=0)])
+
+    return {
+        'dias': diario.index.to_numpy(dtype='datetime64[ns]'),
+        'acumulado': {metrica: acumulado[:, i] for i, metrica in enumerate(METRICAS_DIARIAS)},
+        'totais': _com_preco_medio(metricas.sum().to_dict())
+    }
+
+
+def obter_serie_diaria(df, chave_filtros=None):
+    """
+    Série diária do DataFrame, memorizada por (snapshot, chave_filtros).
+
+    Sem chave ou sem versão de snapshot a série é construída sem cache.
+
+    Args:
+        df: DataFrame de contratos (já filtrado)
+        chave_filtros: tupla que identifica os filtros aplicados ao snapshot
+    """
+    versao = versao_snapshot(df)
+    if versao is None or chave_filtros is None:
+        return construir_serie_diaria(df)
+
+    chave = (versao,) + tuple(chave_filtros)
+    with _lock_series:
+        serie = _series.get(chave)
+        if serie is not None:
+            _series.move_to_end(chave)
+            return serie
+
+    serie = construir_serie_diaria(df)
+    with _lock_series:
+        _series[chave] = serie
+        while len(_series) > MAX_SERIES:
+            _series.popitem(last=False)
+    return serie
+
+
+def _com_preco_medio(somas):
+    """Acrescenta 'preco_medio' (NaN sem preços, como DataFrame.mean)"""
+    somas['preco_medio'] = somas['soma_preco'] / somas['qtd_preco'] if somas['qtd_preco'] else np.nan
+    return somas
+
+
+def somar_periodo(serie, inicio=None, fim=None):
+    """
+    Somas das métricas para os dias em [inicio, fim); None deixa o lado aberto.
+
+    Returns:
+        Dicionário métrica -> soma, mais 'preco_medio'
+    """
+    dias = serie['dias']
+    i = 0 if inicio is None else np.searchsorted(dias, np.datetime64(pd.Timestamp(inicio), 'ns'), side='left')
+    j = len(dias) if fim is None else np.searchsorted(dias, np.datetime64(pd.Timestamp(fim), 'ns'), side='left')
+    return _com_preco_medio({
+        metrica: float(acumulado[j] - acumulado[i])
+        for metrica, acumulado in serie['acumulado'].items()
+    })
+
+
+def comparar_janelas(serie, dias=30, referencia=None):
+    """
+    Últimos 'dias' dias contra os 'dias' dias anteriores.
+
+    Args:
+        serie: série de obter_serie_diaria / construir_serie_diaria
+        dias: tamanho da janela (ex.: 7, 30, 90)
+        referencia: data de referência (padrão: agora)
+
+    Returns:
+        Dicionário com 'atual' e 'anterior' (ver somar_periodo)
+    """
+    hoje = pd.Timestamp(referencia or datetime.now()).normalize()
+    inicio_atual = hoje - timedelta(days=dias)
+    inicio_anterior = inicio_atual - timedelta(days=dias)
+    return {
+        'atual': somar_periodo(serie, inicio_atual),
+        'anterior': somar_periodo(serie, inicio_anterior, inicio_atual)
+    }
@@ -0,0 +1,113 @@
+"""
+Grade espacial (geohash) para agregar os pontos do mapa de contratos.
+
+Cada contrato recebe, uma vez por snapshot, o código geohash inteiro na
+precisão máxima (coluna 'celulaMapa', ver mongodb_connector). Os níveis mais
+grossos saem por deslocamento de bits (um caractere geohash = 5 bits), então
+trocar de nível não exige recalcular nada.
+
+Precisão aproximada das células: 6 ≈ 1,2 km, 5 ≈ 5 km, 4 ≈ 40 km, 3 ≈ 156 km, 2 ≈ 1.250 km.
+"""
+
+import numpy as np
+
+BASE32_GEOHASH = np.array(list('0123456789bcdefghjkmnpqrstuvwxyz'), dtype=object)
+
+# Precisão guardada por contrato e níveis oferecidos ao mapa (do mais fino ao mais grosso)
+PRECISAO_MAXIMA = 6
+PRECISOES_MAPA = (6, 5, 4, 3, 2)
+
+# Código para contratos sem coordenadas
+SEM_CELULA = -1
+
+# Máximo de marcadores enviados ao Plotly
+MAX_PONTOS_MAPA = 1500
+
+
+def geohash_inteiro(lat, lon, precisao=PRECISAO_MAXIMA):
+    """
+    Código geohash inteiro (5 bits por caractere) de arrays de lat/lon.
+
+    Coordenadas ausentes ou inválidas recebem SEM_CELULA.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    validos = ~np.isnan(lat) & ~np.isnan(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+
+    total_bits = 5 * precisao
+    bits_lon = (total_bits + 1) // 2
+    bits_lat = total_bits // 2
+
+    # Índice da célula em cada eixo; o geohash intercala os bits começando pela longitude
+    indice_lon = np.clip(((np.where(validos, lon, 0) + 180) / 360 * (1 << bits_lon)).astype(np.int64), 0, (1 << bits_lon) - 1)
+    indice_lat = np.clip(((np.where(validos, lat, 0) + 90) / 180 * (1 << bits_lat)).astype(np.int64), 0, (1 << bits_lat) - 1)
+
+    codigo = np.zeros(len(lat), dtype=np.int64)
+    for posicao in range(total_bits):
+        if posicao % 2 == 0:
+            bit = (indice_lon >> (bits_lon - 1 - posicao // 2)) & 1
+        else:
+            bit = (indice_lat >> (bits_lat - 1 - posicao // 2)) & 1
+        codigo = (codigo << 1) | bit
+
+    return np.where(validos, codigo, SEM_CELULA)
+
+
+def reduzir_precisao(codigos, precisao, precisao_origem=PRECISAO_MAXIMA):
+    """Códigos da precisão de origem convertidos para uma precisão mais grossa (prefixo do geohash)"""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    return np.where(codigos == SEM_CELULA, SEM_CELULA, codigos >> (5 * (precisao_origem - precisao)))
+
+
+def geohash_texto(codigos, precisao):
+    """Geohash em texto (base32) de códigos inteiros na precisão informada"""
+    codigos = np.asarray(codigos, dtype=np.int64)
+    texto = np.full(len(codigos), '', dtype=object)
+    for posicao in range(precisao):
+        deslocamento = 5 * (precisao - 1 - posicao)
+        texto = texto + BASE32_GEOHASH[(codigos >> deslocamento) & 31]
+    return np.where(codigos == SEM_CELULA, None, texto)
+
+
+def celulas_contratos(df):
+    """
+    Célula geohash (PRECISAO_MAXIMA) do ponto de mapa de cada contrato.
+
+    Supply usa o destino (toLat/toLng) e Originação a origem (fromLat/fromLng), como
+    no mapa; demais tipos e contratos sem coordenadas recebem SEM_CELULA.
+    """
+    if 'tipoOperacao' not in df.columns:
+        return np.full(len(df), SEM_CELULA, dtype=np.int64)
+
+    def coluna(nome):
+        return df[nome].to_numpy(dtype=np.float64, na_value=np.nan) if nome in df.columns else np.full(len(df), np.nan)
+
+    tipo = df['tipoOperacao'].to_numpy(dtype=object)
+    supply = tipo == 'Supply'
+    originacao = tipo == 'Originação'
+    lat = np.where(supply, coluna('toLat'), np.where(originacao, coluna('fromLat'), np.nan))
+    lon = np.where(supply, coluna('toLng'), np.where(originacao, coluna('fromLng'), np.nan))
+    return geohash_inteiro(lat, lon)
+
+
+def escolher_precisao(codigos, max_pontos=MAX_PONTOS_MAPA, grupos=None):
+    """
+    Precisão mais fina de PRECISOES_MAPA cujo número de marcadores não passa de max_pontos.
+
+    Args:
+        codigos: códigos na PRECISAO_MAXIMA (apenas contratos com coordenadas)
+        max_pontos: limite de marcadores
+        grupos: códigos inteiros (0..n) de séries separadas no mapa (ex.: tipo de operação);
+            cada par (célula, grupo) vira um marcador
+
+    Returns:
+        Tupla (precisao, codigos_na_precisao); a precisão mais grossa se nenhuma couber
+    """
+    codigos = np.asarray(codigos, dtype=np.int64)
+    n_grupos = int(grupos.max()) + 1 if grupos is not None and len(grupos) else 1
+    for precisao in PRECISOES_MAPA:
+        codigos_nivel = reduzir_precisao(codigos, precisao)
+        chaves = codigos_nivel * n_grupos + grupos if grupos is not None else codigos_nivel
+        if len(np.unique(chaves)) <= max_pontos:
+            break
+    return precisao, codigos_nivel
@@ -9,8 +9,8 @@ warnings.filterwarnings('ignore')
 import os
 import sys
 import json
-import pymongo
-from pymongo import MongoClient
+import inspect
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -18,6 +18,12 @@ import streamlit as st
 from typing import Dict, List, Optional
 import logging
 
+from cache_disco import em_disco, iniciar_aquecimento, versao_com_cache
+from dre_modelo import avaliar_dre, tabela_dre
+from instrumentacao import etapa, instrumentar, loader_em_cache
+from mapa_grade import celulas_contratos
+from sync_financials import FILTRO_FINANCES, parse_date_coluna
+
 # Importação robusta do BSON para compatibilidade com diferentes versões
 try:
     from bson import ObjectId
@@ -31,6 +37,17 @@ except ImportError:
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+
+# Backend dos loaders financeiros: 'mongo' (collections originais) ou 'postgres' (espelho de sync_financials)
+FINANCES_BACKEND = os.environ.get('FOX_FINANCES_BACKEND', 'mongo').lower()
+
+# Cache dos loaders: 5 minutos. Chamadas simultâneas com os mesmos argumentos esperam um único
+# cálculo (trava por chave do st.cache_data); onde o Streamlit suporta refresh_mode, o valor
+# expirado continua sendo servido enquanto uma única atualização roda em segundo plano
+OPCOES_CACHE_MONGO = {'ttl': 300}
+if 'refresh_mode' in inspect.signature(st.cache_data.__call__).parameters:
+    OPCOES_CACHE_MONGO['refresh_mode'] = 'background'
+
 def convert_objectid_to_string(value):
     """Converte ObjectId para string, mantendo outros tipos inalterados"""
     if isinstance(value, ObjectId):
@@ -41,6 +58,101 @@ def convert_objectid_to_string(value):
         return str(value)
 
 
+# Colunas de texto de baixa cardinalidade guardadas como category no DataFrame de contratos
+COLUNAS_CATEGORICAS_CONTRATOS = [
+    'grainName', 'buyerName', 'sellerName', 'toCity', 'fromCity', 'toState', 'fromState',
+    'status', 'tipoOperacao', 'modalidadeFrete'
+]
+
+# Só converte para category quando há repetição suficiente (distintos / linhas)
+LIMITE_CARDINALIDADE_CATEGORICA = 0.5
+
+# Colunas calculadas a partir da data atual: não vão para o cache em disco e são recalculadas a cada carga
+COLUNAS_DEPENDENTES_DA_DATA = ['diasParaEntrega', 'status']
+
+# Coleções lidas pelo snapshot de contratos (orderv2 e as dos $lookup): a versão do cache em disco cobre todas
+COLECOES_CONTRATOS = ['orderv2', 'grains', 'users', 'addresses']
+
+# Validade máxima (s) do snapshot em disco: cobre edições que a sonda não vê (documento sem updatedAt)
+IDADE_MAXIMA_CONTRATOS = 3600
+
+# Coleções lidas pelos loaders financeiros (no backend postgres, a origem do espelho)
+COLECOES_FINANCES = ['finances', 'finances_categories']
+
+# Validade máxima (s) no cache compartilhado dos resultados que dependem da data atual ou de
+# coleções sem updatedAt confiável: a mesma do st.cache_data, agora uma carga por janela entre réplicas
+IDADE_MAXIMA_MONGO = OPCOES_CACHE_MONGO['ttl']
+
+def extrair_coordenadas(df, location_field, lat_col, lng_col):
+    """Extrai lat/lng (float32) do campo GeoJSON do MongoDB ({'coordinates': [lng, lat]})"""
+    coordenadas = [
+        local['coordinates'] if isinstance(local, dict) and isinstance(local.get('coordinates'), (list, tuple))
+        and len(local['coordinates']) >= 2 else (None, None)
+        for local in df[location_field]
+    ]
+    lng, lat = zip(*[(c[0], c[1]) for c in coordenadas]) if coordenadas else ((), ())
+    # MongoDB usa [longitude, latitude]
+    df[lng_col] = pd.to_numeric(pd.Series(lng, index=df.index, dtype=object), errors='coerce').astype('float32')
+    df[lat_col] = pd.to_numeric(pd.Series(lat, index=df.index, dtype=object), errors='coerce').astype('float32')
+
+def coluna_texto(serie: pd.Series) -> pd.Series:
+    """Valores presentes como texto, ausentes como nulos (colunas que misturam números e texto)"""
+    return serie.map(lambda valor: valor if valor is None or valor != valor else str(valor))
+
+def atualizar_prazos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Dias para entrega e status do contrato em relação à data atual.
+
+    Também aplicado depois de uma leitura do cache em disco, que guarda o
+    snapshot sem essas colunas.
+    """
+    if 'deliveryDeadline' not in df.columns:
+        return df
+    
+    df['diasParaEntrega'] = (df['deliveryDeadline'] - datetime.now()).dt.days
+    
+    # Status do contrato (regras repetidas no $switch de load_filter_options)
+    df['status'] = np.select(
+        [df['isDone'], df['isInProgress'], df['diasParaEntrega'] < 0, df['diasParaEntrega'] <= 30],
+        ['Concluído', 'Em Andamento', 'Vencido', 'Próximo ao Vencimento'],
+        default='Ativo'
+    )
+    return df
+
+def compactar_contratos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Representação compacta do DataFrame de contratos processado.
+
+    Texto de baixa cardinalidade vira category, coordenadas ficam em float32 e os
+    dicionários GeoJSON de origem/destino são descartados depois da extração de lat/lng.
+    """
+    df = df.drop(columns=['toLocation', 'fromLocation'], errors='ignore')
+    
+    total = len(df)
+    for coluna in COLUNAS_CATEGORICAS_CONTRATOS:
+        if coluna in df.columns and total and df[coluna].nunique(dropna=False) / total <= LIMITE_CARDINALIDADE_CATEGORICA:
+            df[coluna] = df[coluna].astype('category')
+    
+    return df
+
+def relatorio_memoria_contratos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Memória ocupada por coluna do DataFrame de contratos (deep=True).
+
+    Returns:
+        DataFrame com coluna, dtype, bytes e % do total, em ordem decrescente de bytes
+    """
+    uso = df.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({
+        'coluna': uso.index,
+        'dtype': [str(df[c].dtype) for c in uso.index],
+        'bytes': uso.values
+    }).sort_values('bytes', ascending=False, ignore_index=True)
+    total = relatorio['bytes'].sum()
+    relatorio['percentual'] = (relatorio['bytes'] / total * 100).round(1) if total else 0.0
+    return relatorio
+
+
 class FOXMongoConnector:
     """Conector para MongoDB da FOX SA"""
     
@@ -50,9 +162,12 @@ class FOXMongoConnector:
         self.db = None
         self.collection = None
         
+    @instrumentar()
     def connect(self):
         """Estabelece conexão com MongoDB"""
         try:
+            # pymongo só é importado na primeira conexão (cold start mais rápido)
+            from pymongo import MongoClient
             self.client = MongoClient(self.connection_string)
             self.db = self.client.fox
             self.collection = self.db.orderv2
@@ -66,6 +181,7 @@ class FOXMongoConnector:
             logger.error(f"Erro ao conectar com MongoDB: {str(e)}")
             return False
     
+    @instrumentar()
     def get_contracts_summary(self, limit: int = 1000) -> pd.DataFrame:
         """
         Busca resumo dos contratos da orderv2
@@ -171,19 +287,25 @@ class FOXMongoConnector:
                 }
             ]
             
-            # Executar agregação
-            cursor = self.collection.aggregate(pipeline)
-            contracts = list(cursor)
+            # Executar agregação (a iteração do cursor inclui a decodificação BSON)
+            with etapa('consulta'):
+                cursor = self.collection.aggregate(pipeline)
+                contracts = list(cursor)
             
             if not contracts:
                 logger.warning("Nenhum contrato encontrado")
                 return pd.DataFrame()
             
             # Converter para DataFrame
-            df = pd.DataFrame(contracts)
+            with etapa('decodificacao'):
+                df = pd.DataFrame(contracts)
             
             # Processar dados
-            df = self._process_contracts_data(df)
+            with etapa('processamento'):
+                df = self._process_contracts_data(df)
+            
+            # Identifica o snapshot (sobrevive ao cache do Streamlit) para os índices de filtros
+            df.attrs['versao_snapshot'] = f"{limit}:{datetime.now():%Y%m%d%H%M%S%f}"
             
             logger.info(f"Carregados {len(df)} contratos do MongoDB")
             return df
@@ -229,87 +351,51 @@ class FOXMongoConnector:
                     logger.info(f"Campo de localização {field} adicionado com valor padrão None")
                 # Não fazer fillna aqui pois coordenadas podem ser legitimamente None
             
+            # orderId mistura números e texto no MongoDB: texto sempre, igual ao que volta do cache em disco
+            if 'orderId' in df.columns:
+                df['orderId'] = coluna_texto(df['orderId'])
+            
             # Calcular valor total do contrato
             df['valorTotal'] = df['amount'] * df['bagPrice']
             
-            # Extrair coordenadas lat/lng dos campos de localização
-            def extrair_coordenadas(location_field, lat_col, lng_col):
-                """Extrai lat/lng do campo GeoJSON do MongoDB"""
-                for idx, row in df.iterrows():
-                    location = row.get(location_field)
-                    if location and isinstance(location, dict) and 'coordinates' in location:
-                        coords = location['coordinates']
-                        if len(coords) >= 2:
-                            # MongoDB usa [longitude, latitude]
-                            df.at[idx, lng_col] = coords[0]  # longitude
-                            df.at[idx, lat_col] = coords[1]  # latitude
-                        else:
-                            df.at[idx, lng_col] = None
-                            df.at[idx, lat_col] = None
-                    else:
-                        df.at[idx, lng_col] = None
-                        df.at[idx, lat_col] = None
-            
-            # Extrair coordenadas de origem (from) e destino (to)
-            extrair_coordenadas('fromLocation', 'fromLat', 'fromLng')
-            extrair_coordenadas('toLocation', 'toLat', 'toLng')
-            
-            # Calcular dias para entrega
-            df['diasParaEntrega'] = (df['deliveryDeadline'] - datetime.now()).dt.days
+            # Extrair coordenadas de origem (from) e destino (to) dos campos GeoJSON
+            extrair_coordenadas(df, 'fromLocation', 'fromLat', 'fromLng')
+            extrair_coordenadas(df, 'toLocation', 'toLat', 'toLng')
             
             # Calcular duração da janela de entrega
             df['duracaoJanelaEntrega'] = (df['deliveryDeadlineEnd'] - df['deliveryDeadline']).dt.days
             
-            # Status do contrato
-            df['status'] = df.apply(self._get_contract_status, axis=1)
+            # Dias para entrega e status (dependem da data atual)
+            atualizar_prazos(df)
             
-            # Mês/Ano de fechamento
-            df['mesAnoFechamento'] = df['closeDate'].dt.to_period('M')
-            
-            # Trimestre de fechamento
-            df['trimestreFechamento'] = df['closeDate'].dt.to_period('Q')
+            # Mês/Ano (YYYYMM) e trimestre (YYYYQ) de fechamento como chaves inteiras
+            df['mesAnoFechamento'] = (df['closeDate'].dt.year * 100 + df['closeDate'].dt.month).astype('Int32')
+            df['trimestreFechamento'] = (df['closeDate'].dt.year * 10 + df['closeDate'].dt.quarter).astype('Int32')
             
             # Tipo de operação baseado nas regras de negócio
-            def determinar_tipo_operacao(row):
-                if row['isService']:
-                    return 'Clube FX'
-                elif row['isFreight']:
-                    return 'Frete'
-                elif row['isGrain'] and row['isBuying']:
-                    return 'Originação'
-                elif row['isGrain'] and not row['isBuying']:
-                    return 'Supply'
-                else:
-                    return 'Outros'
-            
-            df['tipoOperacao'] = df.apply(determinar_tipo_operacao, axis=1)
+            df['tipoOperacao'] = np.select(
+                [df['isService'], df['isFreight'], df['isGrain'] & df['isBuying'], df['isGrain'] & ~df['isBuying']],
+                ['Clube FX', 'Frete', 'Originação', 'Supply'],
+                default='Outros'
+            )
             
             # Modalidade de frete
-            df['modalidadeFrete'] = df.apply(lambda x: 'CIF' if x['isCif'] else 'FOB', axis=1)
+            df['modalidadeFrete'] = np.where(df['isCif'], 'CIF', 'FOB')
+            
+            # Célula geohash do ponto no mapa (níveis mais grossos saem por deslocamento de bits)
+            df['celulaMapa'] = celulas_contratos(df)
             
             # Preencher outros valores nulos
             df['financialRate'] = df['financialRate'].fillna(0)
-            df['paymentDaysAfterDelivery'] = df['paymentDaysAfterDelivery'].fillna('0')
+            df['paymentDaysAfterDelivery'] = coluna_texto(df['paymentDaysAfterDelivery'].fillna('0'))
             
-            return df
+            return compactar_contratos(df)
             
         except Exception as e:
             logger.error(f"Erro ao processar dados: {str(e)}")
             return df
     
-    def _get_contract_status(self, row) -> str:
-        """Determina o status do contrato"""
-        if row['isDone']:
-            return 'Concluído'
-        elif row['isInProgress']:
-            return 'Em Andamento'
-        elif row['diasParaEntrega'] < 0:
-            return 'Vencido'
-        elif row['diasParaEntrega'] <= 30:
-            return 'Próximo ao Vencimento'
-        else:
-            return 'Ativo'
-    
+    @instrumentar()
     def get_financial_summary(self, start_date: Optional[datetime] = None, 
                             end_date: Optional[datetime] = None) -> Dict:
         """
@@ -346,9 +432,9 @@ class FOXMongoConnector:
                 'contratosAtivos': len(df[df['status'] == 'Ativo']),
                 'contratosVencidos': len(df[df['status'] == 'Vencido']),
                 'percentualConclusao': (len(df[df['status'] == 'Concluído']) / len(df) * 100) if len(df) > 0 else 0,
-                'graosComercializados': df['grainName'].value_counts().to_dict(),
-                'operacoesPorTipo': df['tipoOperacao'].value_counts().to_dict(),
-                'modalidadesFrete': df['modalidadeFrete'].value_counts().to_dict()
+                'graosComercializados': df['grainName'].value_counts().loc[lambda c: c > 0].to_dict(),
+                'operacoesPorTipo': df['tipoOperacao'].value_counts().loc[lambda c: c > 0].to_dict(),
+                'modalidadesFrete': df['modalidadeFrete'].value_counts().loc[lambda c: c > 0].to_dict()
             }
             
             return summary
@@ -357,6 +443,7 @@ class FOXMongoConnector:
             logger.error(f"Erro ao calcular resumo financeiro: {str(e)}")
             return {}
     
+    @instrumentar()
     def get_monthly_performance(self, year: int = None) -> pd.DataFrame:
         """
         Busca performance mensal dos contratos
@@ -406,20 +493,98 @@ def get_mongo_connector():
     """Retorna instância cached do conector MongoDB"""
     return FOXMongoConnector()
 
+@instrumentar()
+def versao_colecao(nome_colecao):
+    """
+    Versão barata de uma coleção para validar o cache em disco: maior updatedAt e
+    contagem estimada (metadado; pega remoções). None se o MongoDB estiver indisponível.
+
+    O find_one ordenado só é barato com índice em updatedAt (ver criar_indices_versao);
+    sem ele, cada sonda varre a coleção.
+    """
+    connector = get_mongo_connector()
+    if connector.db is None and not connector.connect():
+        return None
+    colecao = connector.db[nome_colecao]
+    ultimo = colecao.find_one({}, {'updatedAt': 1, '_id': 0}, sort=[('updatedAt', -1)]) or {}
+    return f"{ultimo.get('updatedAt')}|{colecao.estimated_document_count()}"
+
+def versao_colecoes(nomes):
+    """
+    Versão conjunta de várias coleções (None se alguma falhar).
+
+    A sonda de cada coleção passa por versao_com_cache, então loaders que leem
+    as mesmas coleções compartilham as consultas dentro de TTL_SONDA.
+    """
+    versoes = [versao_com_cache(f'colecao:{nome}', lambda nome=nome: versao_colecao(nome)) for nome in nomes]
+    if any(versao is None for versao in versoes):
+        return None
+    return ';'.join(versoes)
+
+def versao_contratos():
+    """Versão do snapshot de contratos: a de cada coleção de COLECOES_CONTRATOS"""
+    return versao_colecoes(COLECOES_CONTRATOS)
+
+def versao_finances():
+    """Versão dos dados financeiros: a de cada coleção de COLECOES_FINANCES"""
+    return versao_colecoes(COLECOES_FINANCES)
+
+def criar_indices_versao():
+    """
+    Garante o índice {updatedAt: -1} das coleções sondadas por versao_contratos e versao_finances.
+
+    create_index não faz nada se o índice já existe. Sem permissão de escrita
+    (usuário só de leitura), registra o aviso e segue: as sondas continuam
+    corretas, só mais lentas.
+    """
+    connector = get_mongo_connector()
+    if connector.db is None and not connector.connect():
+        return
+    for nome in COLECOES_CONTRATOS + COLECOES_FINANCES:
+        try:
+            connector.db[nome].create_index([('updatedAt', -1)], name='updatedAt_-1', background=True)
+        except Exception as e:
+            logger.warning(f"Índice updatedAt de '{nome}' não criado: {str(e)}")
+
 # Funções utilitárias para uso no Streamlit
-@st.cache_data(ttl=300)  # Cache por 5 minutos
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_contracts_data(limit: int = 1000):
-    """Carrega dados dos contratos com cache"""
+    """Carrega dados dos contratos com cache (memória e, entre reinícios, disco)"""
+    df = _snapshot_contratos(limit)
+    if df.empty:
+        return df
+    
+    # Prazos e status recalculados a cada carga, venha o snapshot do MongoDB ou do disco
+    df = compactar_contratos(atualizar_prazos(df.copy()))
+    df.attrs['versao_snapshot'] = f"{limit}:{datetime.now():%Y%m%d%H%M%S%f}"
+    return df
+
+@em_disco('contratos', lambda: versao_contratos(), idade_maxima=IDADE_MAXIMA_CONTRATOS)
+def _snapshot_contratos(limit: int = 1000):
+    """Contratos processados sem as colunas que dependem da data atual (o que vai para o disco)"""
     connector = get_mongo_connector()
-    return connector.get_contracts_summary(limit)
+    return connector.get_contracts_summary(limit).drop(columns=COLUNAS_DEPENDENTES_DA_DATA, errors='ignore')
 
-@st.cache_data(ttl=300)
+def aquecer_caches():
+    """
+    Preenche em segundo plano os caches dos snapshots usados pelas páginas
+    (Contratos: 1000; Visão Consolidada, DRE e unidades: 5000), lendo do disco
+    quando a versão das coleções de contratos não mudou. Antes, garante os
+    índices usados pelas sondas de versão.
+    """
+    return iniciar_aquecimento([
+        criar_indices_versao,
+        lambda: load_contracts_data(limit=5000),
+        lambda: load_contracts_data(limit=1000)
+    ])
+
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_financial_summary(start_date=None, end_date=None):
     """Carrega resumo financeiro com cache"""
     connector = get_mongo_connector()
     return connector.get_financial_summary(start_date, end_date)
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_monthly_performance(year=None):
     """Carrega performance mensal com cache"""
     connector = get_mongo_connector()
@@ -429,11 +594,11 @@ def load_monthly_performance(year=None):
 
 # Funções adicionais para integração com outros dashboards
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('consolidado', lambda: versao_contratos(), idade_maxima=IDADE_MAXIMA_CONTRATOS)
 def load_consolidated_data(year=None):
     """Carrega dados consolidados para a Visão Consolidada"""
-    connector = get_mongo_connector()
-    df = connector.get_contracts_summary(limit=5000)
+    df = load_contracts_data(limit=5000)
     
     if df.empty:
         return {}
@@ -553,8 +718,8 @@ def load_consolidated_data(year=None):
         'contratos_mensais': df.groupby(df['closeDate'].dt.to_period('M')).size().to_dict(),
         
         # Dados por produto
-        'receita_por_grao': df.groupby('grainName')['valorTotal'].sum().to_dict(),
-        'volume_por_grao': df.groupby('grainName')['amount'].sum().to_dict(),
+        'receita_por_grao': df.groupby('grainName', observed=True)['valorTotal'].sum().to_dict(),
+        'volume_por_grao': df.groupby('grainName', observed=True)['amount'].sum().to_dict(),
         
         # Dados por unidade de negócio
         'receita_por_empresa': {
@@ -576,11 +741,23 @@ def load_consolidated_data(year=None):
     
     return consolidated
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_dre_data_from_mongo(year=None, unidade='Consolidado'):
     """Carrega dados para o DRE baseado nos contratos reais"""
-    connector = get_mongo_connector()
-    df = connector.get_contracts_summary(limit=5000)
+    entradas = load_dre_inputs_from_mongo(year, unidade)
+    if not entradas:
+        return {}
+    
+    # Retornar estrutura compatível com exibir_tabela_dre_hierarquica
+    return tabela_dre(avaliar_dre(entradas))
+
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+def load_dre_inputs_from_mongo(year=None, unidade='Consolidado'):
+    """
+    Entradas mensais do modelo do DRE (dre_modelo) a partir dos contratos reais:
+    receitas por linha de negócio e despesas operacionais reais (NaN nos meses sem dados).
+    """
+    df = load_contracts_data(limit=5000)
     
     if df.empty:
         return {}
@@ -598,162 +775,52 @@ def load_dre_data_from_mongo(year=None, unidade='Consolidado'):
         df = df[df.get('isService', False) == True]  # Apenas serviços
     # Se 'Consolidado', usa todos os dados
     
-    # Preparar estrutura de dados compatível com exibir_tabela_dre_hierarquica
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    # Receitas mensais (meses 1..12) como vetores para o modelo do DRE (dre_modelo)
+    mes = df['closeDate'].dt.month
     
-    # Calcular dados por mês
-    dados_mensais = {}
-    for i, mes in enumerate(meses, 1):
-        df_mes = df[df['closeDate'].dt.month == i]
-        
-        if df_mes.empty:
-            receita_bruta = 0
-        else:
-            receita_bruta = df_mes['valorTotal'].sum()
-        
-        # Calcular componentes do DRE baseados na unidade e receita bruta
-        if unidade == 'Fox Grãos' or (unidade == 'Consolidado' and receita_bruta > 0):
-            # Para Fox Grãos (comercialização)
-            df_grain_mes = df_mes[df_mes.get('isGrain', False) == True] if unidade == 'Consolidado' else df_mes
-            comercializacao_graos = df_grain_mes['valorTotal'].sum()
-        else:
-            comercializacao_graos = 0
-            
-        if unidade == 'Fox Log' or (unidade == 'Consolidado' and receita_bruta > 0):
-            # Para Fox Log (frete)
-            df_freight_mes = df_mes[df_mes.get('isFreight', False) == True] if unidade == 'Consolidado' else df_mes
-            servicos_logisticos = df_freight_mes['valorTotal'].sum()
-        else:
-            servicos_logisticos = 0
-            
-        if unidade == 'Clube FX' or (unidade == 'Consolidado' and receita_bruta > 0):
-            # Para Clube FX (serviços)
-            df_service_mes = df_mes[df_mes.get('isService', False) == True] if unidade == 'Consolidado' else df_mes
-            consultoria = df_service_mes['valorTotal'].sum()
-        else:
-            consultoria = 0
-        
-        # Deduções e impostos
-        icms = servicos_logisticos * 0.045  # ICMS apenas sobre frete (isFreight)
-        pis_cofins = receita_bruta * 0.0365  # PIS/COFINS sobre toda receita
-        iss = (servicos_logisticos + consultoria) * 0.05  # ISS sobre serviços
-        outras_deducoes = receita_bruta * 0.015
-        
-        receita_liquida = receita_bruta - icms - pis_cofins - iss - outras_deducoes
-        
-        # CPV (apenas para comercialização de grãos)
-        compra_graos = comercializacao_graos * 0.82
-        frete_aquisicao = comercializacao_graos * 0.04
-        armazenagem = comercializacao_graos * 0.02
-        cpv_total = compra_graos + frete_aquisicao + armazenagem
-        
-        lucro_bruto = receita_liquida - cpv_total
-        
-        # Carregar despesas operacionais reais da collection finances para o mês
-        despesas_reais = load_expenses_from_finances(year=year, month=i)
-        
-        if despesas_reais['despesas_operacionais'] > 0:
-            # Usar dados reais da collection finances
-            pessoal_beneficios = despesas_reais['pessoal_beneficios']
-            marketing_vendas = despesas_reais['marketing_vendas']
-            despesas_admin = despesas_reais['despesas_admin']
-            despesas_operacionais = despesas_reais['despesas_operacionais']
-        else:
-            # Fallback para cálculo proporcional se não houver dados reais
-            pessoal_beneficios = receita_liquida * 0.08
-            marketing_vendas = receita_liquida * 0.03
-            despesas_admin = receita_liquida * 0.04
-            despesas_operacionais = pessoal_beneficios + marketing_vendas + despesas_admin
-        
-        ebitda = lucro_bruto - despesas_operacionais
-        
-        # Depreciação e amortização
-        depreciacao = receita_liquida * 0.02
-        resultado_operacional = ebitda - depreciacao
-        
-        # Resultado financeiro
-        receitas_financeiras = receita_liquida * 0.008
-        despesas_financeiras = receita_liquida * 0.012
-        resultado_financeiro = receitas_financeiras - despesas_financeiras
-        
-        lucro_antes_ir = resultado_operacional + resultado_financeiro
-        
-        # IR e CSLL
-        ir_csll = lucro_antes_ir * 0.34 if lucro_antes_ir > 0 else 0
-        
-        lucro_liquido = lucro_antes_ir - ir_csll
-        
-        # Armazenar dados do mês na estrutura compatível
-        dados_mensais[mes] = [
-            receita_bruta,  # RECEITA BRUTA
-            comercializacao_graos,  # Comercialização de Grãos
-            servicos_logisticos,  # Serviços Logísticos
-            consultoria,  # Consultoria
-            -(icms + pis_cofins + iss + outras_deducoes),  # (-) DEDUÇÕES E IMPOSTOS
-            -icms,  # ICMS sobre vendas
-            -pis_cofins,  # PIS/COFINS
-            -iss,  # ISS (serviços)
-            -outras_deducoes,  # Outras deduções
-            receita_liquida,  # = RECEITA LÍQUIDA
-            -cpv_total,  # (-) CPV
-            -compra_graos,  # Compra de grãos
-            -frete_aquisicao,  # Frete de aquisição
-            -armazenagem,  # Armazenagem inicial
-            lucro_bruto,  # = LUCRO BRUTO
-            -despesas_operacionais,  # (-) DESPESAS OPERACIONAIS
-            -pessoal_beneficios,  # Pessoal e benefícios
-            -marketing_vendas,  # Marketing e vendas
-            -despesas_admin,  # Despesas administrativas
-            ebitda,  # = EBITDA
-            -depreciacao,  # (-) Depreciação & Amortização
-            resultado_operacional,  # = RESULTADO OPERACIONAL
-            resultado_financeiro,  # (+/-) RESULTADO FINANCEIRO
-            receitas_financeiras,  # Receitas financeiras
-            -despesas_financeiras,  # Despesas financeiras
-            lucro_antes_ir,  # = LUCRO ANTES IR/CSLL
-            -ir_csll,  # (-) IR e CSLL
-            lucro_liquido  # = LUCRO LÍQUIDO
-        ]
+    def por_mes(valores):
+        return valores.groupby(mes).sum().reindex(range(1, 13), fill_value=0).to_numpy(dtype=float)
+    
+    receita_bruta = por_mes(df['valorTotal'])
+    zeros = np.zeros(12)
+    
+    if unidade == 'Consolidado':
+        # Receita de cada linha de negócio pelos campos reais (só nos meses com receita)
+        def parcela(campo):
+            if campo not in df.columns:
+                return zeros
+            return np.where(receita_bruta > 0, por_mes(df['valorTotal'].where(df[campo] == True, 0)), 0)
+        
+        comercializacao_graos = parcela('isGrain')
+        servicos_logisticos = parcela('isFreight')
+        consultoria = parcela('isService')
+    else:
+        comercializacao_graos = receita_bruta if unidade == 'Fox Grãos' else zeros
+        servicos_logisticos = receita_bruta if unidade == 'Fox Log' else zeros
+        consultoria = receita_bruta if unidade == 'Clube FX' else zeros
+    
+    # Despesas operacionais reais da collection finances; meses sem dados (NaN) usam as premissas
+    despesas_reais = [load_expenses_from_finances(year=year, month=i) for i in range(1, 13)]
+    com_despesas = np.array([despesas['despesas_operacionais'] > 0 for despesas in despesas_reais])
+    
+    def despesa(chave):
+        return np.where(com_despesas, [despesas[chave] for despesas in despesas_reais], np.nan)
     
-    # Retornar estrutura compatível com exibir_tabela_dre_hierarquica
     return {
-        'Conta': [
-            'RECEITA BRUTA',
-            '  Comercialização de Grãos',
-            '  Serviços Logísticos', 
-            '  Consultoria',
-            '(-) DEDUÇÕES E IMPOSTOS',
-            '  ICMS sobre vendas',
-            '  PIS/COFINS',
-            '  ISS (serviços)',
-            '  Outras deduções',
-            '= RECEITA LÍQUIDA',
-            '(-) CPV',
-            '  Compra de grãos',
-            '  Frete de aquisição',
-            '  Armazenagem inicial',
-            '= LUCRO BRUTO',
-            '(-) DESPESAS OPERACIONAIS',
-            '  Pessoal e benefícios',
-            '  Marketing e vendas',
-            '  Despesas administrativas',
-            '= EBITDA',
-            '(-) Depreciação & Amortização',
-            '= RESULTADO OPERACIONAL',
-            '(+/-) RESULTADO FINANCEIRO',
-            '  Receitas financeiras',
-            '  Despesas financeiras',
-            '= LUCRO ANTES IR/CSLL',
-            '(-) IR e CSLL',
-            '= LUCRO LÍQUIDO'
-        ],
-        **dados_mensais
+        'comercializacao_graos': comercializacao_graos,
+        'servicos_logisticos': servicos_logisticos,
+        'consultoria': consultoria,
+        'receita_bruta': receita_bruta,
+        'pessoal_beneficios': despesa('pessoal_beneficios'),
+        'marketing_vendas': despesa('marketing_vendas'),
+        'despesas_admin': despesa('despesas_admin'),
+        'despesas_operacionais': despesa('despesas_operacionais')
     }
-@st.cache_data(ttl=300)
+
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_performance_data_from_mongo(year=None):
     """Carrega dados de performance financeira baseados nos contratos reais"""
-    connector = get_mongo_connector()
-    df = connector.get_contracts_summary(limit=5000)
+    df = load_contracts_data(limit=5000)
     
     if df.empty:
         return {}
@@ -791,11 +858,10 @@ def load_performance_data_from_mongo(year=None):
     
     return performance_mensal
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_units_data_from_mongo(year=None):
     """Carrega dados por unidade de negócio baseados nos contratos reais"""
-    connector = get_mongo_connector()
-    df = connector.get_contracts_summary(limit=5000)
+    df = load_contracts_data(limit=5000)
     
     if df.empty:
         return {}
@@ -910,7 +976,7 @@ def load_units_data_from_mongo(year=None):
             'preco_medio': df_fox_graos['bagPrice'].mean() if not df_fox_graos.empty else 0,
             'crescimento': 15.2,  # Estimativa baseada em tendência
             'dados_mensais': calcular_dados_mensais(df_fox_graos, 'Fox Grãos'),
-            'principais_produtos': df_fox_graos['grainName'].value_counts().head(5).to_dict() if not df_fox_graos.empty else {},
+            'principais_produtos': df_fox_graos['grainName'].value_counts().loc[lambda c: c > 0].head(5).to_dict() if not df_fox_graos.empty else {},
             'ticket_medio': fox_graos_receita_bruta / fox_graos_contratos if fox_graos_contratos > 0 else 0
         },
         'Fox Log': {
@@ -925,7 +991,7 @@ def load_units_data_from_mongo(year=None):
             'preco_medio': df_fox_log['bagPrice'].mean() if not df_fox_log.empty else 0,
             'crescimento': 22.8,  # Estimativa baseada em tendência
             'dados_mensais': calcular_dados_mensais(df_fox_log, 'Fox Log'),
-            'principais_produtos': df_fox_log['grainName'].value_counts().head(5).to_dict() if not df_fox_log.empty else {},
+            'principais_produtos': df_fox_log['grainName'].value_counts().loc[lambda c: c > 0].head(5).to_dict() if not df_fox_log.empty else {},
             'ticket_medio': fox_log_receita_bruta / fox_log_contratos if fox_log_contratos > 0 else 0
         },
         'Clube FX': {
@@ -948,20 +1014,134 @@ def load_units_data_from_mongo(year=None):
     return units_data
 
 
-@st.cache_data(ttl=300)
+def _nomes_validos(nomes):
+    """Nomes únicos, convertidos para string e sem 'Não informado', em ordem alfabética"""
+    nomes = {convert_objectid_to_string(n) for n in nomes if n is not None}
+    nomes.discard('Não informado')
+    return sorted(nomes)
+
+def _opcoes_filtros_do_snapshot(limit):
+    """Opções de filtros a partir do snapshot de contratos em cache (fallback da agregação)"""
+    from filtros_indice import opcoes_do_indice
+    df = load_contracts_data(limit=limit)
+    if df.empty:
+        return {}
+
+    opcoes = opcoes_do_indice(df)
+    opcoes['compradores'] = _nomes_validos(df['buyerName'].dropna().unique()) if 'buyerName' in df.columns else []
+    opcoes['min_date'] = df['closeDate'].min()
+    opcoes['max_date'] = df['closeDate'].max()
+    opcoes['total_contracts'] = len(df)
+    return opcoes
+
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('opcoes_filtros', lambda: versao_contratos(), idade_maxima=IDADE_MAXIMA_MONGO)
+def load_filter_options(limit: int = 1000) -> Dict:
+    """
+    Opções dos filtros (grãos, status, anos, vendedores, compradores) e intervalo de datas
+    dos últimos 'limit' contratos, numa única agregação $group no MongoDB.
+
+    Considera os mesmos contratos de get_contracts_summary e calcula o status com as
+    mesmas regras de _process_contracts_data, sem carregar nem processar os contratos.
+    Renovado junto com os dados (mesmo ttl de load_contracts_data).
+
+    Returns:
+        Dicionário com 'graos', 'status', 'anos' (decrescente), 'vendedores',
+        'compradores', 'min_date', 'max_date' e 'total_contracts'; vazio se não houver contratos
+    """
+    try:
+        connector = get_mongo_connector()
+        if connector.collection is None and not connector.connect():
+            return _opcoes_filtros_do_snapshot(limit)
+
+        agora = datetime.now()
+        tem_prazo = {"$eq": [{"$type": "$deliveryDeadline"}, "date"]}
+        pipeline = [
+            {
+                "$match": {
+                    "isCanceled": {"$ne": True},
+                    "closeDate": {"$exists": True}
+                }
+            },
+            {"$sort": {"closeDate": -1}},
+            {"$limit": limit},
+            {
+                "$group": {
+                    "_id": None,
+                    "grains": {"$addToSet": "$grain"},
+                    "buyers": {"$addToSet": "$buyer"},
+                    "sellers": {"$addToSet": "$seller"},
+                    "anos": {"$addToSet": {"$year": "$closeDate"}},
+                    "status": {"$addToSet": {
+                        "$switch": {
+                            "branches": [
+                                {"case": {"$eq": ["$isDone", True]}, "then": "Concluído"},
+                                {"case": {"$eq": ["$isInProgress", True]}, "then": "Em Andamento"},
+                                {"case": {"$and": [tem_prazo, {"$lt": ["$deliveryDeadline", agora]}]},
+                                 "then": "Vencido"},
+                                {"case": {"$and": [tem_prazo, {"$lt": ["$deliveryDeadline", agora + timedelta(days=31)]}]},
+                                 "then": "Próximo ao Vencimento"}
+                            ],
+                            "default": "Ativo"
+                        }
+                    }},
+                    "min_date": {"$min": "$closeDate"},
+                    "max_date": {"$max": "$closeDate"},
+                    "total_contracts": {"$sum": 1}
+                }
+            },
+            {"$lookup": {"from": "grains", "localField": "grains", "foreignField": "_id", "as": "grainInfo"}},
+            {"$lookup": {"from": "users", "localField": "buyers", "foreignField": "_id", "as": "buyerInfo"}},
+            {"$lookup": {"from": "users", "localField": "sellers", "foreignField": "_id", "as": "sellerInfo"}},
+            {
+                "$project": {
+                    "graos": "$grainInfo.name",
+                    "compradores": "$buyerInfo.name",
+                    "vendedores": "$sellerInfo.name",
+                    "anos": 1,
+                    "status": 1,
+                    "min_date": 1,
+                    "max_date": 1,
+                    "total_contracts": 1
+                }
+            }
+        ]
+
+        resultado = list(connector.collection.aggregate(pipeline))
+        if not resultado:
+            return {}
+
+        opcoes = resultado[0]
+        return {
+            'graos': _nomes_validos(opcoes.get('graos', [])),
+            'status': sorted(opcoes.get('status', [])),
+            'anos': sorted({int(a) for a in opcoes.get('anos', []) if a is not None}, reverse=True),
+            'vendedores': _nomes_validos(opcoes.get('vendedores', [])),
+            'compradores': _nomes_validos(opcoes.get('compradores', [])),
+            'min_date': opcoes.get('min_date'),
+            'max_date': opcoes.get('max_date'),
+            'total_contracts': opcoes.get('total_contracts', 0)
+        }
+
+    except Exception as e:
+        logger.error(f"Erro ao buscar opções de filtros: {str(e)}")
+        try:
+            return _opcoes_filtros_do_snapshot(limit)
+        except Exception as e:
+            logger.error(f"Erro ao montar opções de filtros do snapshot: {str(e)}")
+            return {}
+
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_available_years():
     """Busca anos disponíveis nos dados reais do MongoDB"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             # Fallback para anos padrão se não houver dados
             return [2025, 2024, 2023, 2022, 2021]
         
-        # Extrair anos únicos dos contratos e garantir que sejam inteiros, filtrando nulos
-        anos_validos = df['closeDate'].dt.year.dropna().unique()
-        anos_disponveis = sorted([int(ano) for ano in anos_validos if pd.notna(ano)], reverse=True)
+        anos_disponveis = list(opcoes['anos'])
         
         # Garantir que pelo menos o ano atual esteja incluído
         ano_atual = int(datetime.now().year)
@@ -975,93 +1155,73 @@ def get_available_years():
         # Fallback em caso de erro
         return [2025, 2024, 2023, 2022, 2021]
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_available_grains():
     """Busca grãos disponíveis nos dados reais do MongoDB"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             return ['Milho', 'Soja', 'Trigo', 'Sorgo']
         
-        # Extrair grãos únicos, removendo valores nulos
-        graos_disponveis = df['grainName'].dropna().unique().tolist()
-        graos_disponveis = [g for g in graos_disponveis if g != 'Não informado']
-        
-        return sorted(graos_disponveis)
+        return list(opcoes['graos'])
         
     except Exception as e:
         logger.error(f"Erro ao buscar grãos disponíveis: {str(e)}")
         return ['Milho', 'Soja', 'Trigo', 'Sorgo']
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_available_buyers():
     """Busca compradores disponíveis nos dados reais do MongoDB"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             return []
         
-        # Extrair compradores únicos, removendo valores nulos
-        compradores_disponveis = df['buyerName'].dropna().unique().tolist()
-        compradores_disponveis = [c for c in compradores_disponveis if c != 'Não informado']
-        
-        return sorted(compradores_disponveis)
+        return list(opcoes['compradores'])
         
     except Exception as e:
         logger.error(f"Erro ao buscar compradores disponíveis: {str(e)}")
         return []
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_available_sellers():
     """Busca vendedores disponíveis nos dados reais do MongoDB"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             return []
         
-        # Extrair vendedores únicos, removendo valores nulos
-        vendedores_disponveis = df['sellerName'].dropna().unique().tolist()
-        vendedores_disponveis = [v for v in vendedores_disponveis if v != 'Não informado']
-        
-        return sorted(vendedores_disponveis)
+        return list(opcoes['vendedores'])
         
     except Exception as e:
         logger.error(f"Erro ao buscar vendedores disponíveis: {str(e)}")
         return []
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_available_status():
     """Busca status disponíveis nos dados reais do MongoDB"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             return ['Concluído', 'Em Andamento', 'Ativo', 'Vencido']
         
-        # Extrair status únicos
-        status_disponveis = df['status'].unique().tolist()
-        
-        return sorted(status_disponveis)
+        return list(opcoes['status'])
         
     except Exception as e:
         logger.error(f"Erro ao buscar status disponíveis: {str(e)}")
         return ['Concluído', 'Em Andamento', 'Ativo', 'Vencido']
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def get_data_range():
     """Busca range de datas disponíveis nos dados reais"""
     try:
-        connector = get_mongo_connector()
-        df = connector.get_contracts_summary(limit=5000)
+        opcoes = load_filter_options(limit=5000)
         
-        if df.empty:
+        if not opcoes:
             return {
                 'min_date': datetime.now() - timedelta(days=365),
                 'max_date': datetime.now(),
@@ -1069,9 +1229,9 @@ def get_data_range():
             }
         
         return {
-            'min_date': df['closeDate'].min(),
-            'max_date': df['closeDate'].max(),
-            'total_contracts': len(df)
+            'min_date': opcoes['min_date'],
+            'max_date': opcoes['max_date'],
+            'total_contracts': opcoes['total_contracts']
         }
         
     except Exception as e:
@@ -1083,14 +1243,28 @@ def get_data_range():
         }
 
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('finances', lambda: versao_finances(), idade_maxima=IDADE_MAXIMA_MONGO)
 def load_finances_data(year=None):
     """Carrega dados financeiros das collections finances e finances_categories"""
+    if FINANCES_BACKEND == 'postgres':
+        from finances_postgres import load_finances_data_pg
+        try:
+            return load_finances_data_pg(year)
+        except Exception as e:
+            logger.error(f"Erro ao carregar dados financeiros: {str(e)}")
+            return pd.DataFrame()
+    return _load_finances_data_mongo(year)
+
+def _load_finances_data_mongo(year=None):
+    """Implementação MongoDB de load_finances_data"""
     try:
         connector = get_mongo_connector()
         
         # Pipeline de agregação para fazer join entre finances e finances_categories
+        # (lançamentos ignorados ficam de fora, como no espelho PostgreSQL)
         pipeline = [
+            {"$match": FILTRO_FINANCES},
             {
                 "$lookup": {
                     "from": "finances_categories",
@@ -1107,22 +1281,15 @@ def load_finances_data(year=None):
             },
             {
                 "$addFields": {
-                    "categoryName": "$category_info.name",
+                    "categoryName": "$category_info.category",
                     "categoryType": "$category_info.type"
                 }
             }
         ]
         
-        # Filtrar por ano se especificado
+        # Filtrar por ano se especificado (date é string YYYYMMDD[HHMMSS] em horário de Brasília)
         if year:
-            pipeline.insert(0, {
-                "$match": {
-                    "date": {
-                        "$gte": datetime(year, 1, 1),
-                        "$lt": datetime(year + 1, 1, 1)
-                    }
-                }
-            })
+            pipeline.insert(0, {"$match": {"date": {"$regex": f"^{year}"}}})
         
         # Executar agregação
         finances_data = list(connector.db.finances.aggregate(pipeline))
@@ -1133,26 +1300,41 @@ def load_finances_data(year=None):
         # Converter para DataFrame
         df = pd.DataFrame(finances_data)
         
-        # Processar datas
+        # Processar datas: mesma validação do sync (inválidas viram NaT), em horário de Brasília
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
+            df['date'] = pd.to_datetime(parse_date_coluna(df['date'])) - pd.Timedelta(hours=3)
             df['month'] = df['date'].dt.month
             df['year'] = df['date'].dt.year
+            if year:
+                # Datas inválidas não caem em nenhum ano (no PostgreSQL ficam NULL)
+                df = df[df['date'].notna()].reset_index(drop=True)
         
-        # Garantir que amount seja numérico
-        if 'amount' in df.columns:
-            df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0)
+        # O valor do lançamento fica em 'value'; 'amount' é a coluna usada pelas métricas (igual ao PostgreSQL)
+        valores = df['value'] if 'value' in df.columns else pd.Series(0, index=df.index)
+        df['amount'] = pd.to_numeric(valores, errors='coerce').fillna(0)
         
         return df
         
     except Exception as e:
-        st.error(f"Erro ao carregar dados financeiros: {str(e)}")
+        logger.error(f"Erro ao carregar dados financeiros: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('metricas_financeiras', lambda: versao_finances(), idade_maxima=IDADE_MAXIMA_MONGO)
 def calculate_financial_metrics(year=None):
     """Calcula métricas financeiras baseadas nos dados de finances"""
-    df_finances = load_finances_data(year)
+    if FINANCES_BACKEND == 'postgres':
+        from finances_postgres import calculate_financial_metrics_pg
+        try:
+            return calculate_financial_metrics_pg(year)
+        except Exception as e:
+            logger.error(f"Erro ao calcular métricas financeiras no PostgreSQL: {str(e)}")
+            return {}
+    return _calculate_financial_metrics_mongo(year)
+
+def _calculate_financial_metrics_mongo(year=None):
+    """Implementação MongoDB de calculate_financial_metrics (agregação em pandas)"""
+    df_finances = _load_finances_data_mongo(year)
     
     if df_finances.empty:
         return {}
@@ -1217,7 +1399,8 @@ def calculate_financial_metrics(year=None):
 
 
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('finances_tabela', lambda: versao_finances(), idade_maxima=IDADE_MAXIMA_MONGO)
 def load_finances_data_from_mongo(year=None):
     """Carrega dados da collection finances para Tabela Dinâmica"""
     try:
@@ -1286,22 +1469,34 @@ def load_finances_data_from_mongo(year=None):
         return {}
 
 
-@st.cache_data(ttl=300)
+@loader_em_cache(**OPCOES_CACHE_MONGO)
+@em_disco('despesas', lambda: versao_finances(), idade_maxima=IDADE_MAXIMA_MONGO)
 def load_expenses_from_finances(year=None, month=None):
     """Carrega despesas operacionais reais da collection finances com lookup em finances_categories"""
+    if FINANCES_BACKEND == 'postgres':
+        from finances_postgres import load_expenses_from_finances_pg, DESPESAS_ZERADAS
+        try:
+            return load_expenses_from_finances_pg(year, month)
+        except Exception as e:
+            logger.error(f"Erro ao carregar despesas do PostgreSQL: {str(e)}")
+            return dict(DESPESAS_ZERADAS)
+    return _load_expenses_from_finances_mongo(year, month)
+
+def _load_expenses_from_finances_mongo(year=None, month=None):
+    """Implementação MongoDB de load_expenses_from_finances"""
     try:
         connector = get_mongo_connector()
         finances_collection = connector.db['finances']
         
-        # Filtrar por ano e mês se especificado
-        match_stage = {}
+        # Filtrar por ano e mês se especificado (lançamentos ignorados ficam de fora, como no espelho PostgreSQL)
+        match_stage = dict(FILTRO_FINANCES)
         if year:
             # Converter ano para formato string usado no campo date
             year_str = str(year)
             match_stage['date'] = {'$regex': f'^{year_str}'}
         if month:
             # Formato YYYYMMDD - filtrar por mês específico
-            month_str = f"{year}{month:02d}" if year else f"2025{month:02d}"
+            month_str = f"{year or datetime.now().year}{month:02d}"
             match_stage['date'] = {'$regex': f'^{month_str}'}
         
         # Pipeline de agregação com lookup para finances_categories
@@ -1350,6 +1545,9 @@ def load_expenses_from_finances(year=None, month=None):
         
         # Converter para DataFrame
         df = pd.DataFrame(finances_data)
+        if year or month:
+            # Datas inválidas casam o prefixo mas não caem em nenhum período (no PostgreSQL ficam NULL)
+            df = df[~np.isnat(parse_date_coluna(df['date']))]
         df['value'] = df['value'].abs()  # Converter para valores positivos
         
         # Subcategorizar baseado no campo category_item
@@ -1378,7 +1576,7 @@ def load_expenses_from_finances(year=None, month=None):
             'despesas_admin': float(despesas_admin),
             'outras_operacionais': float(outras_operacionais),
             'despesas_operacionais': float(despesas_operacionais),
-            'total_documentos': len(finances_data)
+            'total_documentos': len(df)
         }
         
     except Exception as e:
@@ -1602,6 +1800,8 @@ def insert_sample_balance_sheet_data():
             result = collection.insert_one(sample_data)
             logger.info(f"Dados do balanço patrimonial inseridos com sucesso. ID: {result.inserted_id}")
         
+        # O balanço em cache não reflete a gravação
+        load_balance_sheet_data.clear()
         return True
         
     except Exception as e:
@@ -1611,6 +1811,7 @@ def insert_sample_balance_sheet_data():
         if connector and connector.client:
             connector.client.close()
 
+@loader_em_cache(**OPCOES_CACHE_MONGO)
 def load_balance_sheet_data(year: int = 2025, month: int = None) -> Dict:
     """Carregar dados do balanço patrimonial do MongoDB"""
     try:
@@ -1647,6 +1848,7 @@ def load_balance_sheet_data(year: int = 2025, month: int = None) -> Dict:
         if connector and connector.client:
             connector.client.close()
 
+@instrumentar()
 def get_balance_sheet_summary(year: int = 2025) -> Dict:
     """Obter resumo do balanço patrimonial com indicadores principais"""
     try:
@@ -1708,6 +1910,7 @@ def get_balance_sheet_summary(year: int = 2025) -> Dict:
             'data_referencia': None
         }
 
+@instrumentar()
 def get_balance_sheet_detailed_breakdown(year: int = 2025) -> Dict:
     """Obter detalhamento completo do balanço patrimonial por categoria"""
     try:
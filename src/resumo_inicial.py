@@ -0,0 +1,159 @@
+"""
+Resumo pré-calculado da página inicial.
+
+Uma thread em segundo plano (uma por processo) recalcula periodicamente os
+KPIs de cabeçalho da Visão Consolidada, as opções dos filtros da sidebar e
+os anos do seletor, e grava um JSON pequeno em disco. A primeira página lê
+esse arquivo e desenha filtros e métricas sem consultar o MongoDB, enquanto
+load_consolidated_data (contratos + despesas de finances) carrega os dados
+detalhados logo abaixo.
+
+O arquivo fica no diretório temporário por padrão (FOX_RESUMO_INICIAL muda o
+caminho), então processos do mesmo host compartilham o resumo: a thread só
+recalcula quando o arquivo está mais velho que INTERVALO_RESUMO, e só o
+processo que obtém a trava do arquivo recalcula.
+"""
+
+from datetime import datetime
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from cache_disco import trava_arquivo
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_RESUMO = os.environ.get(
+    'FOX_RESUMO_INICIAL', os.path.join(tempfile.gettempdir(), 'fox_resumo_inicial.json')
+)
+
+# Segundos entre recálculos (mesmo TTL dos loaders do MongoDB)
+INTERVALO_RESUMO = 300
+
+# KPIs de load_consolidated_data guardados no resumo
+CAMPOS_RESUMO = (
+    'receita_bruta', 'receita_liquida', 'custo_total', 'despesas_operacionais',
+    'ebitda', 'lucro_liquido', 'margem_liquida', 'numero_contratos', 'volume_total'
+)
+
+# Listas de load_filter_options guardadas no resumo (as usadas pela sidebar)
+CAMPOS_FILTROS_RESUMO = ('graos', 'status', 'anos', 'vendedores', 'compradores')
+
+_thread_resumo = None
+_lock_thread = threading.Lock()
+
+
+def ler_resumo(caminho=ARQUIVO_RESUMO):
+    """Conteúdo do arquivo de resumo ({'gerado_em', 'anos', 'filtros', 'anos_disponiveis'}) ou None se ausente/ilegível"""
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def resumo_do_ano(ano, caminho=ARQUIVO_RESUMO):
+    """
+    KPIs pré-calculados de um ano.
+
+    Returns:
+        Dicionário campo -> valor, mais 'gerado_em' (datetime), ou None se o ano não estiver no resumo
+    """
+    resumo = ler_resumo(caminho)
+    if not resumo or str(ano) not in resumo.get('anos', {}):
+        return None
+    return {**resumo['anos'][str(ano)], 'gerado_em': datetime.fromisoformat(resumo['gerado_em'])}
+
+
+def opcoes_iniciais(caminho=ARQUIVO_RESUMO):
+    """
+    Opções dos filtros e anos do seletor gravados no resumo, para a primeira página.
+
+    Returns:
+        {'filtros': listas de CAMPOS_FILTROS_RESUMO, 'anos': anos disponíveis}, ou None
+        se o resumo ainda não existe (aí a página consulta o MongoDB)
+    """
+    resumo = ler_resumo(caminho)
+    if not resumo or not resumo.get('filtros') or not resumo.get('anos_disponiveis'):
+        return None
+    return {'filtros': resumo['filtros'], 'anos': resumo['anos_disponiveis']}
+
+
+def gravar_resumo(anos, caminho=ARQUIVO_RESUMO, filtros=None, anos_disponiveis=None):
+    """
+    Grava o resumo de forma atômica (arquivo temporário + os.replace).
+
+    Args:
+        anos: ano -> dicionário de load_consolidated_data (só CAMPOS_RESUMO são gravados)
+        filtros: dicionário de load_filter_options (só CAMPOS_FILTROS_RESUMO são gravados)
+        anos_disponiveis: lista de get_available_years
+    """
+    conteudo = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'anos': {
+            str(ano): {campo: float(dados[campo]) for campo in CAMPOS_RESUMO if campo in dados}
+            for ano, dados in anos.items() if dados
+        },
+        'filtros': {campo: list(filtros[campo]) for campo in CAMPOS_FILTROS_RESUMO if campo in filtros}
+        if filtros else {},
+        'anos_disponiveis': [int(ano) for ano in anos_disponiveis or []]
+    }
+    diretorio = os.path.dirname(os.path.abspath(caminho))
+    descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix='.resumo_', suffix='.json')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            json.dump(conteudo, arquivo)
+        os.replace(temporario, caminho)
+    except Exception:
+        os.unlink(temporario)
+        raise
+    return conteudo
+
+
+def resumo_recente(caminho=ARQUIVO_RESUMO, intervalo=INTERVALO_RESUMO):
+    """True se o arquivo de resumo foi gravado há menos de 'intervalo' segundos"""
+    try:
+        return time.time() - os.path.getmtime(caminho) < intervalo
+    except OSError:
+        return False
+
+
+def atualizar_resumo(caminho=ARQUIVO_RESUMO):
+    """Recalcula os KPIs do ano padrão da página (primeiro ano disponível), as opções dos filtros e grava o resumo"""
+    from mongodb_connector import get_available_years, load_consolidated_data, load_filter_options
+
+    anos_disponiveis = get_available_years()
+    ano = anos_disponiveis[0]
+    # Mesmas chamadas da página: também aquecem os caches de load_consolidated_data e load_filter_options
+    return gravar_resumo(
+        {ano: load_consolidated_data(year=ano)}, caminho,
+        filtros=load_filter_options(limit=1000), anos_disponiveis=anos_disponiveis
+    )
+
+
+def _laco_atualizacao(caminho, intervalo):
+    while True:
+        # Sem espera: se outro processo está recalculando, este encontra o arquivo recente no próximo ciclo
+        with trava_arquivo(caminho + '.lock', espera=0) as obtida:
+            if obtida and not resumo_recente(caminho, intervalo):
+                try:
+                    atualizar_resumo(caminho)
+                except Exception as e:
+                    logger.warning(f"Erro ao atualizar o resumo inicial: {str(e)}")
+        time.sleep(intervalo)
+
+
+def iniciar_atualizacao_resumo(caminho=ARQUIVO_RESUMO, intervalo=INTERVALO_RESUMO):
+    """Inicia a thread de atualização do resumo, se ainda não estiver rodando neste processo"""
+    global _thread_resumo
+    with _lock_thread:
+        if _thread_resumo is not None and _thread_resumo.is_alive():
+            return _thread_resumo
+        _thread_resumo = threading.Thread(
+            target=_laco_atualizacao, args=(caminho, intervalo), name='resumo_inicial', daemon=True
+        )
+        _thread_resumo.start()
+        return _thread_resumo
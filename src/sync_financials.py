@@ -5,10 +5,8 @@ sync_financials.py
 Sincroniza coleções financeiras do MongoDB para PostgreSQL, incluindo isForecast e orders como JSON.
 Adaptado para ser usado como função no dashboard Streamlit.
 """
-import json
-import psycopg2
-from pymongo import MongoClient
-from psycopg2.extras import execute_values
+import numpy as np
+import pandas as pd
 
 # Importação robusta do BSON para compatibilidade com diferentes versões
 try:
@@ -18,8 +16,16 @@ except ImportError:
         from bson.objectid import ObjectId
     except ImportError:
         from pymongo.objectid import ObjectId
+from bson import BSON
 
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
+from itertools import chain
+from json.encoder import encode_basestring
+from operator import attrgetter, methodcaller
+import binascii
+import time
+import uuid
 import streamlit as st
 
 # --- Configurações de conexão ---
@@ -36,6 +42,22 @@ MONGO_URI = (
     "authSource=admin&replicaSet=foxdigital"
 )
 
+# --- Conexões (psycopg2 e pymongo só são importados ao sincronizar) ---
+def conectar_postgres():
+    """Conexão psycopg2 com o PostgreSQL espelho"""
+    import psycopg2
+    return psycopg2.connect(**PG_CONFIG)
+
+def conectar_mongo():
+    """Cliente pymongo do MongoDB de origem"""
+    from pymongo import MongoClient
+    return MongoClient(MONGO_URI)
+
+def execute_values(cur, sql, argslist, **kwargs):
+    """psycopg2.extras.execute_values, importado na primeira gravação"""
+    from psycopg2.extras import execute_values as _execute_values
+    return _execute_values(cur, sql, argslist, **kwargs)
+
 # --- Utilitários ---
 def safe_val(val):
     """Converte ObjectId ou dict para string, ou retorna valor original."""
@@ -54,20 +76,406 @@ def parse_date(date_str):
     dt = datetime.strptime(part, "%Y%m%d%H%M%S")
     return dt.replace(tzinfo=timezone(timedelta(hours=-3)))
 
-def executar_sincronizacao_financeira():
+# --- Transformação colunar ---
+# Campos lidos de 'finances' (também usados como projeção na leitura do MongoDB)
+CAMPOS_FINANCES = ["_id", "date", "name", "value", "category", "account_id", "orders", "isForecast"]
+
+def parse_date_coluna(datas):
+    """
+    Converte uma coluna inteira de strings YYYYMMDDHHMMSS/YYYYMMDD para datetime64 em UTC.
+
+    Mesmo formato fixo de parse_date, mas processado de uma vez com NumPy:
+    os caracteres viram uma matriz (n x 14) de dígitos e as partes da data
+    são montadas com aritmética vetorizada. Valores vazios ou inválidos
+    resultam em NaT (NULL no PostgreSQL).
+    """
+    serie = pd.Series(datas, dtype=object)
+    presentes = serie.notna().to_numpy() & serie.astype(bool).to_numpy()
+    texto = serie.where(presentes, '').to_numpy().astype('U14')
+    texto = np.char.ljust(texto, 14, '0')
+    digitos = texto.view(np.uint32).reshape(len(texto), 14).astype(np.int64) - 48
+    validos = presentes & ((digitos >= 0) & (digitos <= 9)).all(axis=1)
+    digitos = np.where(validos[:, None], digitos, 0)
+
+    ano = digitos[:, 0:4] @ np.array([1000, 100, 10, 1])
+    mes = digitos[:, 4:6] @ np.array([10, 1])
+    dia = digitos[:, 6:8] @ np.array([10, 1])
+    hora = digitos[:, 8:10] @ np.array([10, 1])
+    minuto = digitos[:, 10:12] @ np.array([10, 1])
+    segundo = digitos[:, 12:14] @ np.array([10, 1])
+    validos &= (mes >= 1) & (mes <= 12) & (dia >= 1) & (hora < 24) & (minuto < 60) & (segundo < 60)
+
+    meses = ((ano - 1970) * 12 + (mes - 1)).astype('datetime64[M]')
+    dias = meses.astype('datetime64[D]') + (dia - 1)
+    # Dia inexistente no mês (ex.: 20250230) transborda para o mês seguinte
+    validos &= dias.astype('datetime64[M]') == meses
+
+    segundos = hora * 3600 + minuto * 60 + segundo + 3 * 3600  # BRT (UTC-3) -> UTC
+    resultado = dias.astype('datetime64[s]') + segundos.astype('timedelta64[s]')
+    resultado[~validos] = np.datetime64('NaT')
+    return resultado
+
+def _coluna(fin_docs, campo):
+    """Valores de um campo em todos os documentos (None onde falta), sem montar DataFrame."""
+    return np.fromiter(map(methodcaller("get", campo), fin_docs), dtype=object, count=len(fin_docs))
+
+def _textos(valores):
+    """
+    str() de cada valor de um vetor object sem nulos.
+
+    Vetores só de ObjectId (o caso comum) são convertidos em bloco: os 12 bytes
+    de todos os ids são concatenados e passados por um único hexlify, em vez de
+    um ObjectId.__str__ (Python) por valor.
+    """
+    if len(valores) and set(map(type, valores)) == {ObjectId}:
+        hexa = binascii.hexlify(b"".join(map(attrgetter("binary"), valores)))
+        return np.frombuffer(hexa, dtype="S24").astype("U24").astype(object)
+    return np.array(list(map(str, valores)), dtype=object)
+
+def _coluna_texto(valores):
+    """Versão colunar de safe_val: converte valores presentes para string e ausentes (None/NaN) para None."""
+    ausentes = pd.isna(valores)
+    resultado = np.full(len(valores), None, dtype=object)
+    resultado[~ausentes] = _textos(valores[~ausentes])
+    return resultado.tolist()
+
+def _coluna_valor(valores):
+    """Retorna a coluna como lista Python, trocando NaN por None."""
+    resultado = valores.copy()
+    resultado[pd.isna(valores)] = None
+    return resultado.tolist()
+
+def _achatar_orders(orders):
+    """
+    Achata a coluna de listas 'orders' em um vetor único de ids (string).
+
+    O achatamento é feito por itertools.chain, em C; valores que não são lista
+    contam como lista vazia e ids nulos dentro das listas são descartados.
+
+    Returns:
+        Tupla (posicoes, ids): posição do documento de origem de cada id e o id em si.
+    """
+    if set(map(type, orders)) != {list}:
+        orders = [lista if isinstance(lista, list) else () for lista in orders]
+    tamanhos = np.fromiter(map(len, orders), dtype=np.int64, count=len(orders))
+    posicoes = np.repeat(np.arange(len(orders), dtype=np.int64), tamanhos)
+    ids = np.fromiter(chain.from_iterable(orders), dtype=object, count=int(tamanhos.sum()))
+    presentes = ~pd.isna(ids)
+    if not presentes.all():
+        posicoes, ids = posicoes[presentes], ids[presentes]
+    return posicoes, _textos(ids)
+
+def _orders_json_coluna(posicoes, ids, total):
+    """Monta o JSON de 'orders' de todos os documentos sem laço por documento."""
+    resultado = np.full(total, '[]', dtype=object)
+    if len(ids) == 0:
+        return resultado.tolist()
+
+    citados = np.array(list(map(encode_basestring, ids)), dtype=object)
+    tamanhos = np.bincount(posicoes, minlength=total)
+    com_orders = np.flatnonzero(tamanhos)
+    inicios = np.concatenate(([0], np.cumsum(tamanhos[com_orders])[:-1]))
+    ultimos = inicios + tamanhos[com_orders] - 1
+
+    # Separador após cada id, exceto o último de cada documento
+    com_separador = citados + ', '
+    com_separador[ultimos] = citados[ultimos]
+    resultado[com_orders] = '[' + np.add.reduceat(com_separador, inicios) + ']'
+    return resultado.tolist()
+
+def _pares_finance_orders(ids, posicoes, ids_orders):
+    """Pares únicos (finance_id, order_id) para a tabela de ligação finance_orders, na ordem de leitura."""
+    finance_ids = np.asarray(ids, dtype=object)[posicoes]
+    return list(dict.fromkeys(zip(finance_ids.tolist(), ids_orders.tolist())))
+
+def transformar_finances_colunar(fin_docs):
+    """
+    Prepara os registros de 'finances' para inserção processando coluna a coluna.
+
+    Substitui o laço por documento (parse_date + safe_val + json.dumps) por
+    operações sobre a coluna inteira: cada campo é extraído com map (em C), os
+    ObjectIds viram texto em bloco, as datas são convertidas com NumPy e o JSON
+    de 'orders' é montado sobre o vetor achatado de ids. Sem DataFrame intermediário.
+
+    O custo que sobra é proporcional ao de decodificar os documentos BSON em
+    dicts (feito pelo pymongo antes desta função); ver benchmark_desempenho.
+
+    Returns:
+        Tupla (registros, pares):
+        - registros: tuplas (id, date, name, value, category, account_id, orders, is_forecast)
+          com 'date' em UTC (sem timezone)
+        - pares: tuplas (finance_id, order_id) para a tabela finance_orders
+    """
+    if not fin_docs:
+        return [], []
+
+    total = len(fin_docs)
+    ids = _textos(_coluna(fin_docs, "_id")).tolist()
+    datas = parse_date_coluna(_coluna(fin_docs, "date")).astype('datetime64[us]').tolist()
+    posicoes, ids_orders = _achatar_orders(_coluna(fin_docs, "orders"))
+    orders_json = _orders_json_coluna(posicoes, ids_orders, total)
+    previsoes = _coluna(fin_docs, "isForecast")
+    previsao = (~pd.isna(previsoes) & np.fromiter(map(bool, previsoes), dtype=bool, count=total)).tolist()
+
+    registros = list(zip(
+        ids,
+        datas,
+        _coluna_texto(_coluna(fin_docs, "name")),
+        _coluna_valor(_coluna(fin_docs, "value")),
+        _coluna_texto(_coluna(fin_docs, "category")),
+        _coluna_texto(_coluna(fin_docs, "account_id")),
+        orders_json,
+        previsao
+    ))
+    return registros, _pares_finance_orders(ids, posicoes, ids_orders)
+
+CRIAR_FINANCES = """
+    CREATE TABLE finances (
+        id TEXT PRIMARY KEY,
+        date TIMESTAMPTZ,
+        name TEXT,
+        value NUMERIC,
+        category TEXT,
+        account_id TEXT,
+        orders JSONB,
+        is_forecast BOOLEAN
+    );
+"""
+
+CRIAR_FINANCES_CATEGORIES = """
+    CREATE TABLE IF NOT EXISTS finances_categories (
+        id TEXT PRIMARY KEY,
+        category TEXT,
+        item TEXT,
+        type TEXT,
+        dfc TEXT,
+        dfc_equal TEXT
+    );
+"""
+
+INSERT_FINANCES_CATEGORIES = """
+    INSERT INTO finances_categories (id, category, item, type, dfc, dfc_equal)
+    VALUES %s
+    ON CONFLICT (id) DO NOTHING;
+"""
+
+def transformar_categoria(d):
+    """Registro (id, category, item, type, dfc, dfc_equal) de um documento de 'finances_categories'."""
+    return (
+        safe_val(d.get("_id")),
+        safe_val(d.get("category")),
+        safe_val(d.get("item")),
+        safe_val(d.get("type")),
+        safe_val(d.get("dfc")),
+        safe_val(d.get("dfcEqual"))
+    )
+
+INSERT_FINANCES = """
+    INSERT INTO finances (id, date, name, value, category, account_id, orders, is_forecast)
+    VALUES %s
+    ON CONFLICT (id) DO UPDATE SET
+      date = EXCLUDED.date,
+      name = EXCLUDED.name,
+      value = EXCLUDED.value,
+      category = EXCLUDED.category,
+      account_id = EXCLUDED.account_id,
+      orders = EXCLUDED.orders,
+      is_forecast = EXCLUDED.is_forecast;
+"""
+
+# Lançamentos considerados na sincronização (mesmo filtro na verificação)
+FILTRO_FINANCES = {"$or": [{"isIgnored": None}, {"isIgnored": False}]}
+
+def sincronizar_finance_orders(cur, pares, finance_ids=None):
+    """
+    Mantém a tabela normalizada finance_orders(finance_id, order_id) em dia.
+
+    Os pares lidos do MongoDB são carregados numa tabela temporária e comparados
+    com os existentes: só as ligações removidas são apagadas e só as novas são
+    inseridas, sem reescrever a tabela inteira. Com finance_ids, a remoção fica
+    restrita a esses lançamentos (ressincronização parcial).
+
+    Returns:
+        Tupla (removidos, inseridos) com o número de linhas afetadas.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS finance_orders (
+            finance_id TEXT NOT NULL,
+            order_id TEXT NOT NULL,
+            PRIMARY KEY (finance_id, order_id)
+        );
+    """)
+    # A chave primária já indexa finance_id (primeira coluna); order_id precisa do próprio índice
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_finance_orders_order_id ON finance_orders (order_id);")
+
+    cur.execute("""
+        CREATE TEMP TABLE finance_orders_stage (
+            finance_id TEXT,
+            order_id TEXT
+        ) ON COMMIT DROP;
+    """)
+    if pares:
+        execute_values(cur, "INSERT INTO finance_orders_stage (finance_id, order_id) VALUES %s", pares)
+    cur.execute("ANALYZE finance_orders_stage;")
+
+    cur.execute(f"""
+        DELETE FROM finance_orders fo
+        WHERE {"fo.finance_id = ANY(%s) AND" if finance_ids is not None else ""} NOT EXISTS (
+            SELECT 1 FROM finance_orders_stage s
+            WHERE s.finance_id = fo.finance_id AND s.order_id = fo.order_id
+        );
+    """, (list(finance_ids),) if finance_ids is not None else None)
+    removidos = cur.rowcount
+
+    cur.execute("""
+        INSERT INTO finance_orders (finance_id, order_id)
+        SELECT finance_id, order_id FROM finance_orders_stage
+        ON CONFLICT (finance_id, order_id) DO NOTHING;
+    """)
+    inseridos = cur.rowcount
+    return removidos, inseridos
+
+# --- Telemetria da sincronização ---
+# Tamanho da amostra usada para estimar bytes lidos/gravados por etapa
+AMOSTRA_BYTES = 1000
+
+def estimar_bytes(registros, tamanho_item):
+    """Estima o volume total de uma lista a partir de uma amostra de até AMOSTRA_BYTES itens."""
+    if not registros:
+        return 0
+    passo = max(1, len(registros) // AMOSTRA_BYTES)
+    amostra = registros[::passo]
+    return int(sum(tamanho_item(item) for item in amostra) * len(registros) / len(amostra))
+
+def tamanho_bson(doc):
+    """Tamanho em bytes do documento codificado em BSON (como trafega do MongoDB)."""
+    return len(BSON.encode(doc))
+
+def tamanho_registro(registro):
+    """Tamanho aproximado em bytes de uma tupla enviada ao PostgreSQL."""
+    return len(str(registro).encode("utf-8"))
+
+@contextmanager
+def medir_etapa(metricas, colecao, etapa):
+    """
+    Mede a duração de uma etapa da sincronização e registra em 'metricas'.
+    O bloco pode preencher 'linhas' e 'bytes' no dicionário retornado.
+    """
+    metrica = {"colecao": colecao, "etapa": etapa, "linhas": 0, "bytes": 0}
+    inicio = time.perf_counter()
+    try:
+        yield metrica
+    finally:
+        duracao = time.perf_counter() - inicio
+        metrica["duracao_s"] = round(duracao, 4)
+        metrica["linhas_por_s"] = round(metrica["linhas"] / duracao, 1) if duracao > 0 else 0.0
+        metricas.append(metrica)
+
+def gravar_sync_run(pg_conn, run_id, iniciado_em, metricas, status):
+    """Grava as métricas de uma execução na tabela sync_runs (uma linha por coleção/etapa)."""
+    with pg_conn:
+        with pg_conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS sync_runs (
+                    run_id TEXT NOT NULL,
+                    started_at TIMESTAMPTZ NOT NULL,
+                    status TEXT,
+                    collection TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    duration_s DOUBLE PRECISION,
+                    row_count BIGINT,
+                    bytes BIGINT,
+                    rows_per_s DOUBLE PRECISION,
+                    PRIMARY KEY (run_id, collection, stage)
+                );
+            """)
+            execute_values(cur, """
+                INSERT INTO sync_runs (run_id, started_at, status, collection, stage, duration_s, row_count, bytes, rows_per_s)
+                VALUES %s
+                ON CONFLICT (run_id, collection, stage) DO NOTHING;
+            """, [(
+                run_id, iniciado_em, status, m["colecao"], m["etapa"],
+                m["duracao_s"], m["linhas"], m["bytes"], m["linhas_por_s"]
+            ) for m in metricas])
+            pg_conn.commit()
+
+def carregar_historico_sync(limite_execucoes=30):
+    """
+    Métricas das últimas execuções gravadas em sync_runs.
+
+    Returns:
+        DataFrame com colunas run_id, started_at, status, collection, stage,
+        duration_s, row_count, bytes, rows_per_s (vazio se a tabela não existir).
+    """
+    pg_conn = conectar_postgres()
+    try:
+        with pg_conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('sync_runs');")
+            if cur.fetchone()[0] is None:
+                return pd.DataFrame()
+            cur.execute("""
+                SELECT r.run_id, r.started_at, r.status, r.collection, r.stage,
+                       r.duration_s, r.row_count, r.bytes, r.rows_per_s
+                FROM sync_runs r
+                JOIN (
+                    SELECT DISTINCT run_id, started_at FROM sync_runs
+                    ORDER BY started_at DESC
+                    LIMIT %s
+                ) ultimas ON ultimas.run_id = r.run_id
+                ORDER BY r.started_at, r.collection, r.stage;
+            """, (limite_execucoes,))
+            colunas = [desc[0] for desc in cur.description]
+            return pd.DataFrame(cur.fetchall(), columns=colunas)
+    finally:
+        pg_conn.close()
+
+def _sincronizar_tabela_simples(db, pg_conn, metricas, colecao, transformar, insert_sql):
+    """Lê uma coleção inteira, transforma documento a documento e grava com execute_values."""
+    with medir_etapa(metricas, colecao, "read") as etapa:
+        docs = list(db[colecao].find())
+        etapa["linhas"] = len(docs)
+        etapa["bytes"] = estimar_bytes(docs, tamanho_bson)
+
+    with medir_etapa(metricas, colecao, "transform") as etapa:
+        records = [transformar(d) for d in docs]
+        etapa["linhas"] = len(records)
+        etapa["bytes"] = estimar_bytes(records, tamanho_registro)
+        bytes_records = etapa["bytes"]
+
+    with pg_conn:
+        with pg_conn.cursor() as cur:
+            with medir_etapa(metricas, colecao, "write") as etapa:
+                execute_values(cur, insert_sql, records)
+                etapa["linhas"] = len(records)
+                etapa["bytes"] = bytes_records
+            with medir_etapa(metricas, colecao, "commit") as etapa:
+                pg_conn.commit()
+                etapa["linhas"] = len(records)
+
+    return docs, records
+
+def executar_sincronizacao_financeira(gravar_metricas=True):
     """
     Executa a sincronização completa dos dados financeiros do MongoDB para PostgreSQL.
-    Retorna um dicionário com o status e logs da operação.
+    Retorna um dicionário com o status, logs e métricas por etapa da operação.
+
+    Cada coleção é medida nas etapas read, transform, write e commit (duração,
+    linhas, bytes estimados e linhas/s). Com gravar_metricas=True as métricas
+    também são gravadas na tabela sync_runs.
     """
     logs = []
+    metricas = []
     status = "success"
+    run_id = uuid.uuid4().hex
+    iniciado_em = datetime.now(timezone.utc)
+    pg_conn = None
     
     try:
         logs.append("[start] Iniciando sincronização financeira...")
         
         # Conectar ao MongoDB e PostgreSQL
-        client = MongoClient(MONGO_URI)
-        pg_conn = psycopg2.connect(**PG_CONFIG)
+        client = conectar_mongo()
+        pg_conn = conectar_postgres()
         logs.append("[info] Conexões com MongoDB e PostgreSQL estabelecidas.")
         
         # Recria tabela finances
@@ -75,64 +483,59 @@ def executar_sincronizacao_financeira():
             with pg_conn.cursor() as cur:
                 logs.append("[step] Recriando tabela 'finances'...")
                 cur.execute("DROP TABLE IF EXISTS finances CASCADE;")
-                cur.execute("""
-                    CREATE TABLE finances (
-                        id TEXT PRIMARY KEY,
-                        date TIMESTAMPTZ,
-                        name TEXT,
-                        value NUMERIC,
-                        category TEXT,
-                        account_id TEXT,
-                        orders JSONB,
-                        is_forecast BOOLEAN
-                    );
-                """)
+                cur.execute(CRIAR_FINANCES)
                 pg_conn.commit()
         logs.append("[info] Tabela 'finances' recriada com coluna JSONB 'orders'.")
         
         # Sincroniza finances
         logs.append("[step] Sincronizando documentos de 'finances'...")
         db = client['fox']
-        fin_docs = list(db.finances.find({"$or": [{"isIgnored": None}, {"isIgnored": False}]}))
+        with medir_etapa(metricas, "finances", "read") as etapa:
+            fin_docs = list(db.finances.find(
+                FILTRO_FINANCES,
+                {campo: 1 for campo in CAMPOS_FINANCES}
+            ))
+            etapa["linhas"] = len(fin_docs)
+            etapa["bytes"] = estimar_bytes(fin_docs, tamanho_bson)
         logs.append(f"[info] {len(fin_docs)} documentos lidos de 'finances'.")
-        
-        fin_records = []
-        for doc in fin_docs:
-            # extrai lista de orders e converte para JSON
-            orders_list = [str(o) for o in doc.get("orders", [])]
-            orders_json = json.dumps(orders_list)
-            rec = (
-                safe_val(doc.get("_id")),
-                parse_date(doc.get("date")),
-                safe_val(doc.get("name")),
-                doc.get("value"),
-                safe_val(doc.get("category")),
-                safe_val(doc.get("account_id")),
-                orders_json,
-                bool(doc.get("isForecast", False))
-            )
-            fin_records.append(rec)
-        
+
+        # Transformação colunar (datas em UTC, ver SET TIME ZONE abaixo)
+        with medir_etapa(metricas, "finances", "transform") as etapa:
+            fin_records, fin_orders = transformar_finances_colunar(fin_docs)
+            etapa["linhas"] = len(fin_records)
+            etapa["bytes"] = estimar_bytes(fin_records, tamanho_registro)
+            bytes_finances = etapa["bytes"]
+
         logs.append(f"[info] Preparados {len(fin_records)} registros para inserção.")
         
-        insert_fin = """
-            INSERT INTO finances (id, date, name, value, category, account_id, orders, is_forecast)
-            VALUES %s
-            ON CONFLICT (id) DO UPDATE SET
-              date = EXCLUDED.date,
-              name = EXCLUDED.name,
-              value = EXCLUDED.value,
-              category = EXCLUDED.category,
-              account_id = EXCLUDED.account_id,
-              orders = EXCLUDED.orders,
-              is_forecast = EXCLUDED.is_forecast;
-        """
-        
         with pg_conn:
             with pg_conn.cursor() as cur:
-                execute_values(cur, insert_fin, fin_records)
-                pg_conn.commit()
+                with medir_etapa(metricas, "finances", "write") as etapa:
+                    cur.execute("SET TIME ZONE 'UTC';")
+                    execute_values(cur, INSERT_FINANCES, fin_records)
+                    # Índices usados pelas leituras do dashboard (filtro por período e join por categoria);
+                    # criados após a carga para não pesar no insert em lote
+                    cur.execute("CREATE INDEX IF NOT EXISTS idx_finances_date ON finances (date);")
+                    cur.execute("CREATE INDEX IF NOT EXISTS idx_finances_category ON finances (category);")
+                    etapa["linhas"] = len(fin_records)
+                    etapa["bytes"] = bytes_finances
+                with medir_etapa(metricas, "finances", "commit") as etapa:
+                    pg_conn.commit()
+                    etapa["linhas"] = len(fin_records)
         logs.append("[info] Sincronização de 'finances' concluída.")
+
+        # Sincroniza tabela de ligação finance_orders
+        logs.append("[step] Atualizando tabela de ligação 'finance_orders'...")
+        with pg_conn:
+            with pg_conn.cursor() as cur:
+                with medir_etapa(metricas, "finance_orders", "write") as etapa:
+                    removidos, inseridos = sincronizar_finance_orders(cur, fin_orders)
+                    etapa["linhas"] = len(fin_orders)
+                    etapa["bytes"] = estimar_bytes(fin_orders, tamanho_registro)
+                with medir_etapa(metricas, "finance_orders", "commit") as etapa:
+                    pg_conn.commit()
+                    etapa["linhas"] = len(fin_orders)
+        logs.append(f"[info] 'finance_orders' atualizada: {len(fin_orders)} ligações, {inseridos} novas, {removidos} removidas.")
         
         # Sincroniza finances_categories
         logs.append("[step] Sincronizando 'finances_categories'...")
@@ -140,42 +543,14 @@ def executar_sincronizacao_financeira():
         # Criar tabela se não existir
         with pg_conn:
             with pg_conn.cursor() as cur:
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS finances_categories (
-                        id TEXT PRIMARY KEY,
-                        category TEXT,
-                        item TEXT,
-                        type TEXT,
-                        dfc TEXT,
-                        dfc_equal TEXT
-                    );
-                """)
+                cur.execute(CRIAR_FINANCES_CATEGORIES)
                 pg_conn.commit()
         
-        cat_docs = list(db.finances_categories.find())
+        cat_docs, cat_records = _sincronizar_tabela_simples(
+            db, pg_conn, metricas, "finances_categories", transformar_categoria, INSERT_FINANCES_CATEGORIES
+        )
         logs.append(f"[info] {len(cat_docs)} documentos lidos.")
-        
-        cat_records = [(
-            safe_val(d.get("_id")),
-            safe_val(d.get("category")),
-            safe_val(d.get("item")),
-            safe_val(d.get("type")),
-            safe_val(d.get("dfc")),
-            safe_val(d.get("dfcEqual"))
-        ) for d in cat_docs]
-        
         logs.append(f"[info] Preparados {len(cat_records)} registros para inserção.")
-        
-        insert_cat = """
-            INSERT INTO finances_categories (id, category, item, type, dfc, dfc_equal)
-            VALUES %s
-            ON CONFLICT (id) DO NOTHING;
-        """
-        
-        with pg_conn:
-            with pg_conn.cursor() as cur:
-                execute_values(cur, insert_cat, cat_records)
-                pg_conn.commit()
         logs.append("[info] Sincronização de 'finances_categories' concluída.")
         
         # Sincroniza finance_accounts
@@ -197,45 +572,207 @@ def executar_sincronizacao_financeira():
                 """)
                 pg_conn.commit()
         
-        acc_docs = list(db.finance_accounts.find())
-        logs.append(f"[info] {len(acc_docs)} documentos lidos.")
-        
-        acc_records = [(
-            safe_val(d.get("_id")),
-            safe_val(d.get("account")),
-            safe_val(d.get("bank",{}).get("bank")),
-            safe_val(d.get("bank",{}).get("number")),
-            d.get("value"),
-            safe_val(d.get("company",{}).get("name")),
-            safe_val(d.get("company",{}).get("cnpj"))
-        ) for d in acc_docs]
-        
-        logs.append(f"[info] Preparados {len(acc_records)} registros para inserção.")
-        
         insert_acc = """
             INSERT INTO finance_accounts (id, account, bank_bank, bank_number, value, company_name, company_cnpj)
             VALUES %s
             ON CONFLICT (id) DO NOTHING;
         """
         
-        with pg_conn:
-            with pg_conn.cursor() as cur:
-                execute_values(cur, insert_acc, acc_records)
-                pg_conn.commit()
+        acc_docs, acc_records = _sincronizar_tabela_simples(
+            db, pg_conn, metricas, "finance_accounts",
+            lambda d: (
+                safe_val(d.get("_id")),
+                safe_val(d.get("account")),
+                safe_val(d.get("bank",{}).get("bank")),
+                safe_val(d.get("bank",{}).get("number")),
+                d.get("value"),
+                safe_val(d.get("company",{}).get("name")),
+                safe_val(d.get("company",{}).get("cnpj"))
+            ),
+            insert_acc
+        )
+        logs.append(f"[info] {len(acc_docs)} documentos lidos.")
+        logs.append(f"[info] Preparados {len(acc_records)} registros para inserção.")
         logs.append("[info] Sincronização de 'finance_accounts' concluída.")
         
         # Encerramento
-        pg_conn.close()
         client.close()
-        logs.append("[end] Sincronização finalizada e conexões fechadas.")
         
     except Exception as e:
         status = "error"
         logs.append(f"[error] Erro durante sincronização: {str(e)}")
+
+    if pg_conn is not None:
+        if gravar_metricas and metricas:
+            try:
+                pg_conn.rollback()
+                gravar_sync_run(pg_conn, run_id, iniciado_em, metricas, status)
+                logs.append(f"[info] Métricas da execução {run_id} gravadas em 'sync_runs'.")
+            except Exception as e:
+                logs.append(f"[error] Erro ao gravar métricas em 'sync_runs': {str(e)}")
+        pg_conn.close()
+    if status == "success":
+        logs.append("[end] Sincronização finalizada e conexões fechadas.")
     
     return {
         "status": status,
         "logs": logs,
-        "total_logs": len(logs)
+        "total_logs": len(logs),
+        "run_id": run_id,
+        "metricas": metricas
+    }
+
+
+# --- Verificação pós-sincronização ---
+# Mês (YYYYMM) de 'date' calculado no MongoDB com a mesma validação de parse_date_coluna:
+# string completada com zeros até 14 dígitos e lida como YYYYMMDDHHMMSS; vazia, de outro
+# tipo ou inválida (ex.: 20250230) vira '', o balde dos NULL do PostgreSQL. Sem fuso:
+# os dígitos já são horário de Brasília, e to_char do resumo PostgreSQL volta para ele.
+MES_FINANCES_MONGO = {"$ifNull": [
+    {"$dateToString": {
+        "format": "%Y%m",
+        "date": {"$dateFromString": {
+            "dateString": {"$cond": [
+                {"$eq": [{"$type": "$date"}, "string"]},
+                {"$substrCP": [{"$concat": ["$date", "00000000000000"]}, 0, 14]},
+                None
+            ]},
+            "format": "%Y%m%d%H%M%S",
+            "onError": None,
+            "onNull": None
+        }}
+    }},
+    ""
+]}
+
+def resumo_mensal_mongo(db):
+    """Quantidade e soma de 'value' por mês (YYYYMM) de 'finances', agregados no MongoDB."""
+    pipeline = [
+        {"$match": FILTRO_FINANCES},
+        {"$group": {
+            "_id": MES_FINANCES_MONGO,
+            "quantidade": {"$sum": 1},
+            "soma": {"$sum": "$value"}
+        }}
+    ]
+    return {
+        d["_id"]: (d["quantidade"], float(d["soma"]))
+        for d in db.finances.aggregate(pipeline, allowDiskUse=True)
     }
 
+def resumo_mensal_postgres(cur):
+    """Quantidade e soma de 'value' por mês (YYYYMM, horário de Brasília) de 'finances', agregados no PostgreSQL."""
+    cur.execute("""
+        SELECT
+            COALESCE(to_char(date AT TIME ZONE INTERVAL '-03:00', 'YYYYMM'), '') AS mes,
+            COUNT(*),
+            COALESCE(SUM(value), 0)::float8
+        FROM finances
+        GROUP BY 1;
+    """)
+    return {mes: (quantidade, soma) for mes, quantidade, soma in cur.fetchall()}
+
+def comparar_resumos_mensais(resumo_mongo, resumo_pg, tolerancia=0.01):
+    """Meses (YYYYMM) cuja quantidade ou soma diverge entre os dois resumos."""
+    divergentes = []
+    for mes in sorted(set(resumo_mongo) | set(resumo_pg)):
+        qtd_mongo, soma_mongo = resumo_mongo.get(mes, (0, 0.0))
+        qtd_pg, soma_pg = resumo_pg.get(mes, (0, 0.0))
+        if qtd_mongo != qtd_pg or abs(soma_mongo - soma_pg) > tolerancia:
+            divergentes.append(mes)
+    return divergentes
+
+def ressincronizar_mes(db, pg_conn, mes):
+    """
+    Ressincroniza apenas os lançamentos de um mês (YYYYMM).
+
+    Regrava os documentos do mês, apaga do PostgreSQL os que não existem mais
+    no MongoDB e atualiza finance_orders só para os lançamentos envolvidos.
+
+    Returns:
+        Tupla (gravados, removidos).
+    """
+    fin_docs = list(db.finances.find(
+        {"$and": [FILTRO_FINANCES, {"date": {"$regex": f"^{mes}"}}]},
+        {campo: 1 for campo in CAMPOS_FINANCES}
+    ))
+    fin_records, fin_orders = transformar_finances_colunar(fin_docs)
+    ids_mongo = [registro[0] for registro in fin_records]
+
+    with pg_conn:
+        with pg_conn.cursor() as cur:
+            cur.execute("SET TIME ZONE 'UTC';")
+            cur.execute("""
+                DELETE FROM finances
+                WHERE to_char(date AT TIME ZONE INTERVAL '-03:00', 'YYYYMM') = %s
+                  AND NOT (id = ANY(%s))
+                RETURNING id;
+            """, (mes, ids_mongo))
+            ids_removidos = [linha[0] for linha in cur.fetchall()]
+            if fin_records:
+                execute_values(cur, INSERT_FINANCES, fin_records)
+            sincronizar_finance_orders(cur, fin_orders, finance_ids=ids_mongo + ids_removidos)
+            pg_conn.commit()
+
+    return len(fin_records), len(ids_removidos)
+
+def verificar_sincronizacao_financeira(ressincronizar=True, tolerancia=0.01):
+    """
+    Verifica se 'finances' no PostgreSQL bate com o MongoDB comparando quantidade
+    e soma de 'value' por mês, agregados no servidor dos dois lados.
+    Com ressincronizar=True, os meses divergentes são ressincronizados.
+    Retorna um dicionário com status, logs e meses divergentes.
+    """
+    logs = []
+    status = "success"
+    divergentes = []
+    corrigidos = []
+
+    try:
+        logs.append("[start] Iniciando verificação da sincronização financeira...")
+        client = conectar_mongo()
+        pg_conn = conectar_postgres()
+        db = client['fox']
+
+        resumo_mongo = resumo_mensal_mongo(db)
+        with pg_conn.cursor() as cur:
+            resumo_pg = resumo_mensal_postgres(cur)
+        logs.append(f"[info] {len(resumo_mongo)} meses no MongoDB, {len(resumo_pg)} no PostgreSQL.")
+
+        divergentes = comparar_resumos_mensais(resumo_mongo, resumo_pg, tolerancia)
+        if not divergentes:
+            logs.append("[info] Contagens e somas mensais conferem.")
+
+        for mes in divergentes:
+            qtd_mongo, soma_mongo = resumo_mongo.get(mes, (0, 0.0))
+            qtd_pg, soma_pg = resumo_pg.get(mes, (0, 0.0))
+            logs.append(
+                f"[info] Mês '{mes or 'sem data válida'}' divergente: MongoDB {qtd_mongo} / {soma_mongo:.2f}, "
+                f"PostgreSQL {qtd_pg} / {soma_pg:.2f}."
+            )
+            if not ressincronizar:
+                continue
+            if not mes:
+                # Lançamentos sem data (ou com data inválida) não são selecionáveis por mês; exigem sincronização completa
+                logs.append("[info] Lançamentos sem data válida só são corrigidos pela sincronização completa.")
+                continue
+            logs.append(f"[step] Ressincronizando mês {mes}...")
+            gravados, removidos = ressincronizar_mes(db, pg_conn, mes)
+            corrigidos.append(mes)
+            logs.append(f"[info] Mês {mes}: {gravados} registros gravados, {removidos} removidos.")
+
+        pg_conn.close()
+        client.close()
+        logs.append("[end] Verificação finalizada e conexões fechadas.")
+
+    except Exception as e:
+        status = "error"
+        logs.append(f"[error] Erro durante verificação: {str(e)}")
+
+    return {
+        "status": status,
+        "logs": logs,
+        "total_logs": len(logs),
+        "meses_divergentes": divergentes,
+        "meses_corrigidos": corrigidos
+    }
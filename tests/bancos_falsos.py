@@ -0,0 +1,273 @@
+"""
+Dublês do MongoDB e do espelho PostgreSQL para os testes.
+
+BancoMongoFalso avalia em memória o subconjunto de estágios de agregação usado
+pelos loaders ($match, $lookup, $unwind, $addFields, $project, $group) e os
+operadores de expressão de OPERADORES. As
+tabelas do PostgreSQL são montadas com as próprias transformações de
+sync_financials; espelho_pg e CursorEspelhoFalso emulam os SELECTs de
+load_finances_data_pg e resumo_mensal_postgres sobre elas.
+"""
+
+import copy
+from datetime import datetime
+import re
+
+import pandas as pd
+
+from sync_financials import FILTRO_FINANCES, transformar_categoria, transformar_finances_colunar
+
+
+def _valor(doc, caminho):
+    """(existe, valor) de um caminho com pontos"""
+    atual = doc
+    for parte in caminho.split('.'):
+        if not isinstance(atual, dict) or parte not in atual:
+            return False, None
+        atual = atual[parte]
+    return True, atual
+
+
+def _condicao(existe, valor, operador, argumento):
+    if operador == '$regex':
+        return isinstance(valor, str) and re.search(argumento, valor) is not None
+    if operador in ('$lt', '$lte', '$gt', '$gte'):
+        if not existe or valor is None or isinstance(valor, str) != isinstance(argumento, str):
+            return False
+        return {
+            '$lt': valor < argumento, '$lte': valor <= argumento,
+            '$gt': valor > argumento, '$gte': valor >= argumento
+        }[operador]
+    raise NotImplementedError(operador)
+
+
+def casa(doc, filtro):
+    """True se o documento satisfaz o filtro (igualdade, None = ausente ou nulo, $or, $and, $regex, comparações)"""
+    for chave, condicao in filtro.items():
+        if chave == '$or':
+            if not any(casa(doc, sub) for sub in condicao):
+                return False
+        elif chave == '$and':
+            if not all(casa(doc, sub) for sub in condicao):
+                return False
+        else:
+            existe, valor = _valor(doc, chave)
+            if isinstance(condicao, dict) and all(op.startswith('$') for op in condicao):
+                if not all(_condicao(existe, valor, op, arg) for op, arg in condicao.items()):
+                    return False
+            elif condicao is None:
+                if valor is not None:
+                    return False
+            elif not existe or valor != condicao:
+                return False
+    return True
+
+
+def _tipo_bson(valor):
+    if valor is None:
+        return 'null'
+    return {str: 'string', bool: 'bool', int: 'int', float: 'double', datetime: 'date'}.get(type(valor), 'object')
+
+
+def _de_string(argumento, doc):
+    texto = _avaliar(doc, argumento['dateString'])
+    if texto is None:
+        return argumento.get('onNull')
+    try:
+        return datetime.strptime(texto, argumento['format'])
+    except (TypeError, ValueError):
+        return argumento['onError']
+
+
+def _concatenar(partes):
+    return None if any(parte is None for parte in partes) else ''.join(partes)
+
+
+OPERADORES = {
+    '$ifNull': lambda doc, args: next(
+        (valor for valor in (_avaliar(doc, arg) for arg in args[:-1]) if valor is not None), _avaliar(doc, args[-1])
+    ),
+    '$cond': lambda doc, args: _avaliar(doc, args[1] if _avaliar(doc, args[0]) else args[2]),
+    '$eq': lambda doc, args: _avaliar(doc, args[0]) == _avaliar(doc, args[1]),
+    '$type': lambda doc, arg: 'missing' if not _expressao(doc, arg)[0] else _tipo_bson(_avaliar(doc, arg)),
+    '$concat': lambda doc, args: _concatenar([_avaliar(doc, arg) for arg in args]),
+    '$substrCP': lambda doc, args: _avaliar(doc, args[0])[args[1]:args[1] + args[2]],
+    '$dateFromString': lambda doc, arg: _de_string(arg, doc),
+    '$dateToString': lambda doc, arg: (
+        None if (data := _avaliar(doc, arg['date'])) is None else data.strftime(arg['format'])
+    )
+}
+
+
+def _expressao(doc, expressao):
+    """(existe, valor) de uma expressão de agregação: caminho '$campo', operador de OPERADORES ou literal"""
+    if isinstance(expressao, str) and expressao.startswith('$'):
+        return _valor(doc, expressao[1:])
+    if isinstance(expressao, dict) and len(expressao) == 1 and next(iter(expressao)) in OPERADORES:
+        (operador, argumento), = expressao.items()
+        return True, OPERADORES[operador](doc, argumento)
+    return True, expressao
+
+
+def _avaliar(doc, expressao):
+    return _expressao(doc, expressao)[1]
+
+
+class ColecaoFalsa:
+    def __init__(self, banco, nome):
+        self.banco = banco
+        self.nome = nome
+
+    @property
+    def documentos(self):
+        return self.banco.colecoes.setdefault(self.nome, [])
+
+    def find(self, filtro=None, projecao=None):
+        return [copy.deepcopy(doc) for doc in self.documentos if casa(doc, filtro or {})]
+
+    def aggregate(self, pipeline, **kwargs):
+        docs = [copy.deepcopy(doc) for doc in self.documentos]
+        for estagio in pipeline:
+            (nome, argumento), = estagio.items()
+            docs = getattr(self, '_' + nome[1:])(docs, argumento)
+        return docs
+
+    def _match(self, docs, filtro):
+        return [doc for doc in docs if casa(doc, filtro)]
+
+    def _lookup(self, docs, argumento):
+        estrangeiros = self.banco[argumento['from']].documentos
+        for doc in docs:
+            _, local = _valor(doc, argumento['localField'])
+            doc[argumento['as']] = [
+                copy.deepcopy(outro) for outro in estrangeiros
+                if _valor(outro, argumento['foreignField'])[1] == local
+            ]
+        return docs
+
+    def _unwind(self, docs, argumento):
+        caminho = argumento['path'][1:]
+        resultado = []
+        for doc in docs:
+            itens = doc.get(caminho) or []
+            if itens:
+                resultado.extend({**doc, caminho: item} for item in itens)
+            elif argumento.get('preserveNullAndEmptyArrays'):
+                doc.pop(caminho, None)
+                resultado.append(doc)
+        return resultado
+
+    def _addFields(self, docs, campos):
+        for doc in docs:
+            for campo, expressao in campos.items():
+                existe, valor = _expressao(doc, expressao)
+                if existe:
+                    doc[campo] = valor
+        return docs
+
+    def _group(self, docs, argumento):
+        grupos = {}
+        for doc in docs:
+            _, chave = _expressao(doc, argumento['_id'])
+            grupo = grupos.setdefault(chave, {'_id': chave, **{campo: 0 for campo in argumento if campo != '_id'}})
+            for campo, acumulador in argumento.items():
+                if campo == '_id':
+                    continue
+                _, valor = _expressao(doc, acumulador['$sum'])
+                if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    grupo[campo] += valor
+        return list(grupos.values())
+
+    def _project(self, docs, campos):
+        resultado = []
+        for doc in docs:
+            projetado = {'_id': doc['_id']} if '_id' in doc else {}
+            for campo, expressao in campos.items():
+                existe, valor = _valor(doc, campo) if expressao == 1 else _expressao(doc, expressao)
+                if existe:
+                    projetado[campo] = valor
+            resultado.append(projetado)
+        return resultado
+
+
+class BancoMongoFalso:
+    """Banco em memória: banco.finances e banco['finances'] devolvem a mesma coleção"""
+
+    def __init__(self, **colecoes):
+        self.colecoes = {nome: list(docs) for nome, docs in colecoes.items()}
+
+    def __getitem__(self, nome):
+        return ColecaoFalsa(self, nome)
+
+    def __getattr__(self, nome):
+        if nome.startswith('_'):
+            raise AttributeError(nome)
+        return ColecaoFalsa(self, nome)
+
+
+class ConectorFalso:
+    def __init__(self, banco):
+        self.db = banco
+
+
+def tabela_finances(finances):
+    """Tabela finances do PostgreSQL como o sync a grava (date em UTC, NaT onde é NULL)"""
+    banco = BancoMongoFalso(finances=finances)
+    registros, _ = transformar_finances_colunar(banco.finances.find(FILTRO_FINANCES))
+    return pd.DataFrame(
+        registros, columns=['id', 'date', 'name', 'value', 'category', 'account_id', 'orders', 'is_forecast']
+    )
+
+
+class CursorEspelhoFalso:
+    """Cursor que responde o SELECT de resumo_mensal_postgres sobre a tabela finances do espelho"""
+
+    def __init__(self, finances):
+        self.tabela = tabela_finances(finances)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchall(self):
+        local = pd.to_datetime(self.tabela['date']) - pd.Timedelta(hours=3)
+        meses = local.dt.strftime('%Y%m').fillna('')
+        resumo = self.tabela.assign(mes=meses).groupby('mes')['value'].agg(['count', 'sum'])
+        return [(mes, int(linha['count']), float(linha['sum'])) for mes, linha in resumo.iterrows()]
+
+
+def espelho_pg(finances, categorias):
+    """
+    Tabelas finances e finances_categories como o sync as grava, e um _consultar
+    falso que devolve o SELECT de load_finances_data_pg sobre elas.
+    """
+    tabela = tabela_finances(finances)
+    tabela_categorias = pd.DataFrame(
+        [transformar_categoria(doc) for doc in categorias],
+        columns=['id', 'category', 'item', 'type', 'dfc', 'dfc_equal']
+    )
+
+    def consultar(sql, params=None):
+        unido = tabela.merge(
+            tabela_categorias.rename(columns={'id': 'category', 'category': 'categoryName', 'type': 'categoryType'}),
+            on='category', how='left'
+        )
+        # date AT TIME ZONE '-03:00': horário de Brasília sem fuso
+        local = pd.to_datetime(unido['date']) - pd.Timedelta(hours=3)
+        if params:
+            inicio = pd.Timestamp(params['inicio'].replace(tzinfo=None))
+            fim = pd.Timestamp(params['fim'].replace(tzinfo=None))
+            manter = (local >= inicio) & (local < fim)
+            unido, local = unido[manter], local[manter]
+        return pd.DataFrame({
+            '_id': unido['id'],
+            'date': local,
+            'name': unido['name'],
+            'value': unido['value'].astype(float),
+            'category': unido['category'],
+            'account_id': unido['account_id'],
+            'isForecast': unido['is_forecast'],
+            'categoryName': unido['categoryName'],
+            'categoryType': unido['categoryType']
+        }).reset_index(drop=True)
+
+    return consultar
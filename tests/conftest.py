@@ -0,0 +1,38 @@
+import os
+import sys
+import uuid
+
+import pytest
+
+# Os módulos do dashboard são importados pelo nome, como no `streamlit run src/app.py`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+@pytest.fixture(scope='session')
+def pg_dsn(tmp_path_factory):
+    """PostgreSQL dos testes: FOX_TESTE_PG_DSN ou um servidor local do pgserver; sem nenhum, os testes são pulados"""
+    dsn = os.environ.get('FOX_TESTE_PG_DSN')
+    if dsn:
+        yield dsn
+        return
+    pgserver = pytest.importorskip('pgserver', reason="sem FOX_TESTE_PG_DSN nem pgserver")
+    servidor = pgserver.get_server(str(tmp_path_factory.mktemp('pg')), cleanup_mode='stop')
+    yield servidor.get_uri()
+
+
+@pytest.fixture
+def pg_conexao(pg_dsn):
+    """Conexão num schema vazio, descartado no fim do teste"""
+    import psycopg2
+
+    conexao = psycopg2.connect(pg_dsn)
+    schema = f"teste_{uuid.uuid4().hex[:12]}"
+    with conexao.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema};")
+    conexao.commit()
+    yield conexao
+    conexao.rollback()
+    with conexao.cursor() as cur:
+        cur.execute(f"DROP SCHEMA {schema} CASCADE;")
+    conexao.commit()
+    conexao.close()
@@ -0,0 +1,40 @@
+"""Documentos de finances e finances_categories usados nos testes dos loaders financeiros"""
+
+from bson import ObjectId
+
+import finances_postgres
+import mongodb_connector
+from bancos_falsos import BancoMongoFalso, ConectorFalso, espelho_pg
+
+RECEITA, PESSOAL, ALUGUEL, JUROS = (ObjectId() for _ in range(4))
+
+CATEGORIAS = [
+    {'_id': RECEITA, 'category': 'RECEITAS', 'item': 'VENDA DE GRAOS', 'type': 'revenue'},
+    {'_id': PESSOAL, 'category': 'DESPESAS ADMINISTRATIVAS', 'item': 'SALARIOS PESSOAL', 'type': 'personnel'},
+    {'_id': ALUGUEL, 'category': 'DESPESAS ADMINISTRATIVAS', 'item': 'ALUGUEL ESCRITORIO', 'type': 'administrative'},
+    {'_id': JUROS, 'category': 'DESPESAS FINANCEIRAS', 'item': 'JUROS', 'type': 'financial'}
+]
+
+FINANCES = [
+    # 'amount' solto no documento não é o valor do lançamento
+    {'_id': ObjectId(), 'date': '20250115103000', 'name': 'Venda', 'value': 1000.0, 'amount': 1, 'category': RECEITA},
+    {'_id': ObjectId(), 'date': '20250120', 'name': 'Folha', 'value': -300.0, 'category': PESSOAL},
+    {'_id': ObjectId(), 'date': '20250201', 'name': 'Aluguel', 'value': -150.0, 'category': ALUGUEL, 'isIgnored': False},
+    {'_id': ObjectId(), 'date': '20250210', 'name': 'Estornado', 'value': -999.0, 'category': ALUGUEL, 'isIgnored': True},
+    {'_id': ObjectId(), 'date': '20250301000000', 'name': 'Juros', 'value': -50.0, 'category': JUROS, 'isForecast': True},
+    {'_id': ObjectId(), 'date': '20250230', 'name': 'Data inválida', 'value': -70.0, 'category': ALUGUEL},
+    {'_id': ObjectId(), 'date': '20241231230000', 'name': 'Venda dezembro', 'value': 500.0, 'category': RECEITA},
+    {'_id': ObjectId(), 'date': '20250305', 'name': 'Sem categoria', 'value': 20.0, 'category': None}
+]
+
+
+def instalar_mongo(monkeypatch):
+    """MongoDB falso com os documentos acima"""
+    banco = BancoMongoFalso(finances=FINANCES, finances_categories=CATEGORIAS)
+    monkeypatch.setattr(mongodb_connector, 'get_mongo_connector', lambda: ConectorFalso(banco))
+
+
+def instalar_backends(monkeypatch):
+    """MongoDB falso com os documentos acima e espelho PostgreSQL emulado a partir deles"""
+    instalar_mongo(monkeypatch)
+    monkeypatch.setattr(finances_postgres, '_consultar', espelho_pg(FINANCES, CATEGORIAS))
@@ -0,0 +1,124 @@
+"""Snapshot de contratos no cache em disco: colunas e tipos iguais aos do MongoDB"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import cache_disco
+import mongodb_connector
+from cache_disco import ArmazenamentoArquivos
+
+CONTRATOS = [
+    {
+        'orderId': 1017, 'closeDate': datetime(2024, 12, 1), 'deliveryDeadline': datetime(2025, 1, 10),
+        'deliveryDeadlineEnd': datetime(2025, 1, 20), 'amount': 1000, 'bagPrice': 120.5,
+        'isGrain': True, 'isBuying': True, 'financialRate': None, 'paymentDaysAfterDelivery': 30,
+        'grainName': 'Soja', 'buyerName': 'Fox', 'sellerName': 'Fazenda A', 'toCity': 'Rio Verde',
+        'toState': 'GO', 'toLocation': {'type': 'Point', 'coordinates': [-50.9, -17.8]}
+    },
+    {
+        'orderId': 'PED-88', 'closeDate': datetime(2024, 11, 5), 'deliveryDeadline': datetime(2025, 3, 1),
+        'deliveryDeadlineEnd': datetime(2025, 3, 5), 'amount': 500, 'bagPrice': 80.0,
+        'isFreight': True, 'isInProgress': False, 'financialRate': 1.2, 'paymentDaysAfterDelivery': '15',
+        'grainName': 'Milho', 'buyerName': 'Fox', 'sellerName': 'Fazenda B'
+    },
+    {
+        'orderId': None, 'closeDate': datetime(2024, 10, 1), 'deliveryDeadline': datetime(2024, 12, 1),
+        'deliveryDeadlineEnd': None, 'amount': 10, 'bagPrice': 1.0, 'isDone': True,
+        'grainName': 'Soja', 'buyerName': 'Outro', 'sellerName': 'Fazenda A'
+    }
+]
+
+
+class ConectorContratos:
+    def __init__(self):
+        self.chamadas = 0
+
+    def get_contracts_summary(self, limit):
+        self.chamadas += 1
+        return mongodb_connector.FOXMongoConnector()._process_contracts_data(pd.DataFrame(CONTRATOS))
+
+
+def relogio(agora):
+    class Relogio(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return agora
+    return Relogio
+
+
+@pytest.fixture
+def versoes(monkeypatch):
+    """Versão de cada coleção e janela de idade do cache, alteráveis pelo teste"""
+    versoes = {nome: 'v1' for nome in mongodb_connector.COLECOES_CONTRATOS}
+    versoes['janela'] = 0
+    monkeypatch.setattr(mongodb_connector, 'versao_colecao', lambda nome: versoes[nome])
+    monkeypatch.setattr(cache_disco, '_janela_idade', lambda idade_maxima: versoes['janela'])
+    monkeypatch.setattr(cache_disco, 'TTL_SONDA', 0)
+    return versoes
+
+
+@pytest.fixture
+def conector(monkeypatch, tmp_path, versoes):
+    conector = ConectorContratos()
+    monkeypatch.setattr(mongodb_connector, 'get_mongo_connector', lambda: conector)
+    monkeypatch.setattr(cache_disco, '_sondas', {})
+    monkeypatch.setattr(cache_disco, '_armazenamento', ArmazenamentoArquivos(str(tmp_path)))
+    return conector
+
+
+def carregar(limit=10):
+    # Sem o st.cache_data: cada chamada passa pelo disco
+    return mongodb_connector.load_contracts_data.__wrapped__(limit)
+
+
+def test_disco_devolve_mesmas_colunas_e_tipos(conector, monkeypatch):
+    monkeypatch.setattr(mongodb_connector, 'datetime', relogio(datetime(2025, 1, 1)))
+    do_mongo = carregar()
+    do_disco = carregar()
+
+    assert conector.chamadas == 1
+    pd.testing.assert_frame_equal(do_mongo, do_disco)
+    assert do_disco['orderId'].tolist()[:2] == ['1017', 'PED-88']
+    assert pd.isna(do_disco['orderId'].iloc[2])
+
+
+def test_prazos_recalculados_depois_da_leitura_do_disco(conector, monkeypatch):
+    monkeypatch.setattr(mongodb_connector, 'datetime', relogio(datetime(2025, 1, 1)))
+    antes = carregar()
+    monkeypatch.setattr(mongodb_connector, 'datetime', relogio(datetime(2025, 1, 20)))
+    depois = carregar()
+
+    assert conector.chamadas == 1
+    assert antes['status'].tolist() == ['Próximo ao Vencimento', 'Ativo', 'Concluído']
+    assert depois['status'].tolist() == ['Vencido', 'Ativo', 'Concluído']
+    assert depois['diasParaEntrega'].tolist() == [-10, 40, -50]
+    assert 'status' not in cache_disco.obter_armazenamento().ler('contratos(limit=10)', 'v1;v1;v1;v1|0').columns
+
+
+@pytest.mark.parametrize('colecao', ['orderv2', 'users', 'grains', 'addresses'])
+def test_mudanca_em_colecao_do_lookup_recarrega(conector, versoes, colecao):
+    carregar()
+    carregar()
+    versoes[colecao] = 'v2'
+    carregar()
+    carregar()
+
+    assert conector.chamadas == 2
+
+
+def test_snapshot_expira_pela_idade_maxima(conector, versoes):
+    carregar()
+    versoes['janela'] = 1
+    carregar()
+
+    assert conector.chamadas == 2
+
+
+def test_sonda_indisponivel_le_do_mongo(conector, versoes):
+    versoes['users'] = None
+    carregar()
+    carregar()
+
+    assert conector.chamadas == 2
@@ -0,0 +1,238 @@
+"""Cache compartilhado: um único recálculo por versão, entre threads e entre processos"""
+
+import multiprocessing
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import cache_disco
+from cache_disco import ArmazenamentoArquivos, ArmazenamentoMemoria, em_disco, trava_arquivo, versao_com_cache
+
+THREADS = 8
+
+
+@pytest.fixture(autouse=True)
+def sondas_limpas(monkeypatch):
+    monkeypatch.setattr(cache_disco, '_sondas', {})
+    monkeypatch.setattr(cache_disco, '_travas_sondas', {})
+
+
+@pytest.fixture
+def memoria(monkeypatch):
+    armazenamento = ArmazenamentoMemoria()
+    monkeypatch.setattr(cache_disco, '_armazenamento', armazenamento)
+    return armazenamento
+
+
+def em_paralelo(funcao, n=THREADS):
+    """Chama funcao() em n threads liberadas ao mesmo tempo; devolve os resultados"""
+    barreira = threading.Barrier(n)
+    resultados = [None] * n
+
+    def rodar(i):
+        barreira.wait()
+        resultados[i] = funcao()
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return resultados
+
+
+def loader_contado(versao):
+    """Loader lento sob em_disco que conta as execuções; versao é uma lista com a versão atual"""
+    execucoes = []
+
+    @em_disco('contado', lambda: versao[0])
+    def carregar(limit=10):
+        execucoes.append(limit)
+        time.sleep(0.2)
+        return pd.DataFrame({'valor': range(limit)})
+
+    return carregar, execucoes
+
+
+def test_atualizacao_concorrente_calcula_uma_vez(memoria):
+    carregar, execucoes = loader_contado(['v1'])
+
+    resultados = em_paralelo(carregar)
+
+    assert execucoes == [10]
+    assert list(memoria.entradas) == ['contado(limit=10)']
+    for df in resultados:
+        pd.testing.assert_frame_equal(df, pd.DataFrame({'valor': range(10)}))
+
+
+def test_nova_versao_recalcula_uma_vez(memoria, monkeypatch):
+    monkeypatch.setattr(cache_disco, 'TTL_SONDA', 0)
+    versao = ['v1']
+    carregar, execucoes = loader_contado(versao)
+    carregar()
+
+    versao[0] = 'v2'
+    em_paralelo(carregar)
+    carregar()
+
+    assert execucoes == [10, 10]
+    assert memoria.entradas['contado(limit=10)'][0] == 'v2'
+
+
+def test_sonda_indisponivel_ignora_armazenamento(memoria):
+    carregar, execucoes = loader_contado([None])
+
+    carregar()
+    carregar()
+
+    assert execucoes == [10, 10]
+    assert memoria.entradas == {}
+
+
+def test_dataframe_vazio_nao_e_gravado(memoria):
+    @em_disco('vazio', lambda: 'v1')
+    def carregar():
+        return pd.DataFrame()
+
+    carregar()
+
+    assert memoria.entradas == {}
+
+
+def test_dicionario_e_dataframe_com_object_voltam_iguais(tmp_path, monkeypatch):
+    from bson import ObjectId
+
+    monkeypatch.setattr(cache_disco, '_armazenamento', ArmazenamentoArquivos(str(tmp_path)))
+    valores = {
+        'opcoes': {'anos': [2025, 2024], 'min_date': pd.Timestamp('2024-01-02')},
+        'tabela': pd.DataFrame({'_id': [ObjectId(), ObjectId()], 'info': [{'a': 1}, None], 'valor': [1.5, 2.0]}),
+        'numeros': pd.DataFrame({'valor': [1.5, 2.0], 'nome': pd.Series(['a', 'b'], dtype='category')})
+    }
+    execucoes = []
+
+    @em_disco('valores', lambda: 'v1')
+    def carregar(nome):
+        execucoes.append(nome)
+        return valores[nome]
+
+    for nome, esperado in valores.items():
+        carregar(nome)
+        lido = carregar(nome)
+        if isinstance(esperado, pd.DataFrame):
+            pd.testing.assert_frame_equal(lido, esperado)
+        else:
+            assert lido == esperado
+
+    assert execucoes == list(valores)
+    arquivos = {chave: entrada['arquivo'] for chave, entrada in cache_disco.obter_armazenamento().ler_manifesto().items()}
+    assert arquivos["valores(nome='numeros')"].endswith('.parquet')
+    assert arquivos["valores(nome='tabela')"].endswith('.pkl')
+
+
+def test_resultado_vazio_nao_e_gravado(memoria):
+    @em_disco('vazios', lambda: 'v1')
+    def carregar(valor):
+        return valor
+
+    for valor in ({}, [], None):
+        carregar(valor)
+
+    assert memoria.entradas == {}
+
+
+def test_idade_maxima_renova_entrada(memoria, monkeypatch):
+    janela = [0]
+    monkeypatch.setattr(cache_disco, '_janela_idade', lambda idade_maxima: janela[0])
+    execucoes = []
+
+    @em_disco('idade', lambda: 'v1', idade_maxima=60)
+    def carregar():
+        execucoes.append(1)
+        return {'valor': len(execucoes)}
+
+    assert carregar() == carregar() == {'valor': 1}
+    janela[0] = 1
+    assert carregar() == {'valor': 2}
+
+
+def test_sonda_consultada_uma_vez_por_ttl():
+    chamadas = []
+
+    def sonda():
+        chamadas.append(1)
+        time.sleep(0.1)
+        return 'v1'
+
+    assert em_paralelo(lambda: versao_com_cache('sonda', sonda)) == ['v1'] * THREADS
+    assert len(chamadas) == 1
+
+
+def test_trava_da_memoria_exclusiva(memoria):
+    with memoria.trava('chave') as obtida:
+        assert obtida
+        with memoria.trava('chave', espera=0) as segunda:
+            assert not segunda
+        with memoria.trava('outra', espera=0) as outra:
+            assert outra
+    with memoria.trava('chave', espera=0) as depois:
+        assert depois
+
+
+@pytest.mark.skipif(cache_disco.fcntl is None, reason="flock indisponível")
+def test_trava_arquivo_exclusiva(tmp_path):
+    caminho = str(tmp_path / 'chave.lock')
+    ocupada, liberar = threading.Event(), threading.Event()
+
+    def segurar():
+        with trava_arquivo(caminho):
+            ocupada.set()
+            liberar.wait()
+
+    thread = threading.Thread(target=segurar)
+    thread.start()
+    ocupada.wait()
+    with trava_arquivo(caminho, espera=0) as obtida:
+        assert not obtida
+    with trava_arquivo(caminho, espera=0.2) as obtida:
+        assert not obtida
+    liberar.set()
+    thread.join()
+    with trava_arquivo(caminho, espera=0) as obtida:
+        assert obtida
+
+
+def _carregar_em_processo(diretorio, contador, barreira):
+    cache_disco.definir_armazenamento(ArmazenamentoArquivos(diretorio))
+
+    @em_disco('processos', lambda: 'v1')
+    def carregar():
+        with open(contador, 'a') as arquivo:
+            arquivo.write('x')
+        time.sleep(0.3)
+        return pd.DataFrame({'pid': [os.getpid()]})
+
+    barreira.wait()
+    carregar()
+
+
+@pytest.mark.skipif(cache_disco.fcntl is None, reason="flock indisponível")
+def test_processos_calculam_uma_vez(tmp_path):
+    contexto = multiprocessing.get_context('fork')
+    contador = str(tmp_path / 'execucoes')
+    barreira = contexto.Barrier(4)
+    processos = [
+        contexto.Process(target=_carregar_em_processo, args=(str(tmp_path / 'cache'), contador, barreira))
+        for _ in range(4)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(timeout=30)
+
+    assert [processo.exitcode for processo in processos] == [0] * 4
+    with open(contador) as arquivo:
+        assert arquivo.read() == 'x'
+    assert list(ArmazenamentoArquivos(str(tmp_path / 'cache')).ler_manifesto()) == ['processos()']
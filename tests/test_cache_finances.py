@@ -0,0 +1,61 @@
+"""Loaders financeiros no cache compartilhado: leitura do disco igual à do MongoDB"""
+
+import pandas as pd
+import pytest
+
+import cache_disco
+import mongodb_connector
+from cache_disco import ArmazenamentoArquivos
+from dados_finances import instalar_mongo
+
+LOADERS = [
+    ('load_finances_data', (None,)),
+    ('load_finances_data', (2025,)),
+    ('calculate_financial_metrics', (2025,)),
+    ('load_expenses_from_finances', (2025, 1))
+]
+
+
+@pytest.fixture
+def versoes(monkeypatch, tmp_path):
+    instalar_mongo(monkeypatch)
+    versoes = {nome: 'v1' for nome in mongodb_connector.COLECOES_FINANCES}
+    monkeypatch.setattr(mongodb_connector, 'versao_colecao', lambda nome: versoes[nome])
+    monkeypatch.setattr(cache_disco, 'TTL_SONDA', 0)
+    monkeypatch.setattr(cache_disco, '_sondas', {})
+    monkeypatch.setattr(cache_disco, '_armazenamento', ArmazenamentoArquivos(str(tmp_path)))
+    return versoes
+
+
+def assert_iguais(lido, esperado):
+    if isinstance(esperado, pd.DataFrame):
+        pd.testing.assert_frame_equal(lido, esperado)
+    else:
+        assert lido == esperado
+
+
+@pytest.mark.parametrize('nome, argumentos', LOADERS)
+def test_disco_devolve_o_mesmo_que_o_mongo(versoes, nome, argumentos):
+    carregar = getattr(mongodb_connector, nome).__wrapped__
+    do_mongo = carregar(*argumentos)
+    do_disco = carregar(*argumentos)
+
+    assert_iguais(do_disco, do_mongo)
+    assert cache_disco.obter_armazenamento().ler_manifesto()
+
+
+def test_mudanca_nas_categorias_recarrega(versoes, monkeypatch):
+    chamadas = []
+    original = mongodb_connector._calculate_financial_metrics_mongo
+    monkeypatch.setattr(
+        mongodb_connector, '_calculate_financial_metrics_mongo',
+        lambda year=None: chamadas.append(year) or original(year)
+    )
+    carregar = mongodb_connector.calculate_financial_metrics.__wrapped__
+
+    carregar(2025)
+    carregar(2025)
+    versoes['finances_categories'] = 'v2'
+    carregar(2025)
+
+    assert chamadas == [2025, 2025]
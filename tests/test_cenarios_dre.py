@@ -0,0 +1,84 @@
+"""Cenários "e se" do DRE: grade, sorteio, avaliação em lotes e resumo"""
+
+import numpy as np
+import pytest
+
+from cenarios_dre import avaliar_cenarios, empilhar_entradas, grade_cenarios, resumir_cenarios, sortear_cenarios
+from dre_modelo import PREMISSAS_DRE, avaliar_dre, entradas_simuladas
+
+UNIDADES = ['Fox Grãos', 'Fox Log', 'Clube FX', 'Consolidado']
+
+
+@pytest.fixture
+def entradas():
+    return entradas_simuladas(UNIDADES)
+
+
+def test_grade_com_premissas_padrao_reproduz_o_dre(entradas):
+    cenarios = grade_cenarios({premissa: [valor] for premissa, valor in PREMISSAS_DRE.items()})
+
+    resultados = avaliar_cenarios(entradas, cenarios)
+    esperado = avaliar_dre(entradas)
+
+    for metrica in ('ebitda', 'lucro_liquido'):
+        assert resultados[metrica].shape == (1, len(UNIDADES))
+        np.testing.assert_allclose(resultados[metrica][0], esperado[metrica].sum(-1))
+
+
+def test_grade_combina_valores_e_avalia_em_lotes(entradas):
+    cenarios = grade_cenarios({'icms': [0.04, 0.045, 0.05], 'ir_csll': [0.30, 0.34]})
+
+    inteiro = avaliar_cenarios(entradas, cenarios)
+    em_lotes = avaliar_cenarios(entradas, cenarios, lote=4)
+
+    assert cenarios['icms'].tolist() == [0.04, 0.04, 0.045, 0.045, 0.05, 0.05]
+    assert cenarios['ir_csll'].tolist() == [0.30, 0.34] * 3
+    np.testing.assert_allclose(em_lotes['ebitda'], inteiro['ebitda'])
+    # Cenário 3 = (0.045, 0.34): as premissas padrão
+    np.testing.assert_allclose(inteiro['ebitda'][3], avaliar_dre(entradas)['ebitda'].sum(-1))
+
+
+@pytest.mark.parametrize('gerar', [
+    lambda faixas: grade_cenarios({premissa: [valor[0]] for premissa, valor in faixas.items()}),
+    lambda faixas: sortear_cenarios(10, faixas)
+])
+def test_premissa_desconhecida_gera_erro(gerar):
+    with pytest.raises(ValueError, match='icsm'):
+        gerar({'icms': (0.04, 0.05), 'icsm': (0.04, 0.05)})
+
+
+def test_sorteio_reproduzivel_e_dentro_das_faixas():
+    faixas = {'compra_graos': (0.78, 0.86), 'pessoal': (0.06, 0.10)}
+
+    primeiro = sortear_cenarios(500, faixas, semente=7)
+    segundo = sortear_cenarios(500, faixas, semente=7)
+
+    for premissa, (minimo, maximo) in faixas.items():
+        np.testing.assert_array_equal(primeiro[premissa], segundo[premissa])
+        assert ((primeiro[premissa] >= minimo) & (primeiro[premissa] < maximo)).all()
+
+
+def test_premissas_com_tamanhos_diferentes_geram_erro(entradas):
+    with pytest.raises(ValueError):
+        avaliar_cenarios(entradas, {'icms': np.array([0.04, 0.05]), 'iss': np.array([0.05])})
+
+
+def test_resumo_por_unidade(entradas):
+    resultados = avaliar_cenarios(entradas, sortear_cenarios(200, {'compra_graos': (0.80, 0.95)}, semente=1))
+
+    resumo = resumir_cenarios(resultados, UNIDADES)
+
+    assert len(resumo) == 2 * len(UNIDADES)
+    ebitda_log = resumo[(resumo['metrica'] == 'ebitda') & (resumo['unidade'] == 'Fox Log')].iloc[0]
+    # Fox Log não tem comercialização de grãos: o CPV sorteado não muda o EBITDA
+    assert ebitda_log['desvio'] == pytest.approx(0, abs=1e-9)
+    assert ebitda_log['p5'] == pytest.approx(ebitda_log['p95'])
+    graos = resumo[(resumo['metrica'] == 'ebitda') & (resumo['unidade'] == 'Fox Grãos')].iloc[0]
+    assert graos['p5'] < graos['p50'] < graos['p95']
+    assert 0 <= graos['prob_negativo'] <= 1
+
+
+def test_empilhar_entradas_por_unidade():
+    por_unidade = [{'consultoria': [1.0] * 12}, {'consultoria': [2.0] * 12}]
+
+    assert empilhar_entradas(por_unidade)['consultoria'].shape == (2, 12)
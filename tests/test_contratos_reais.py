@@ -0,0 +1,62 @@
+"""Ordenação e exportação da tabela paginada de contratos"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import contratos_reais
+import mongodb_connector
+from contratos_reais import exportar_csv_contratos, exportar_parquet_contratos, formatar_tabela_contratos, ordenar_posicoes
+
+CONTRATOS = pd.DataFrame({
+    'orderId': [1017, 'PED-88', None, 7],
+    'closeDate': pd.to_datetime(['2024-12-01', '2024-11-05', '2024-10-01', '2024-09-01']),
+    'deliveryDeadline': pd.to_datetime(['2025-01-10', '2025-03-01', '2024-12-01', None]),
+    'amount': [1000, 500, 10, 3],
+    'bagPrice': [120.5, 80.0, 1.0, 2.5],
+    'isGrain': [True, False, True, False],
+    'isFreight': [False, True, False, False],
+    'grainName': ['Soja', 'Milho', 'Soja', 'Milho'],
+    'sellerName': ['Fazenda A', 'Fazenda B', 'Fazenda A', None]
+})
+
+
+@pytest.fixture
+def contratos():
+    return mongodb_connector.FOXMongoConnector()._process_contracts_data(CONTRATOS.copy())
+
+
+def test_ordena_coluna_com_tipos_misturados():
+    df = pd.DataFrame({'orderId': pd.Series([10, 'A-7', 9, None, '100', 'B-1'], dtype=object)})
+
+    crescente = df['orderId'].iloc[ordenar_posicoes(df, 'orderId')].tolist()
+    decrescente = df['orderId'].iloc[ordenar_posicoes(df, 'orderId', crescente=False)].tolist()
+
+    assert crescente == [9, 10, '100', 'A-7', 'B-1', None]
+    assert decrescente == ['100', 10, 9, 'B-1', 'A-7', None]
+
+
+def test_ordena_coluna_numerica_com_ausentes_no_fim():
+    df = pd.DataFrame({'valor': [3.0, np.nan, 1.0, 2.0]}, index=[7, 8, 9, 10])
+
+    assert ordenar_posicoes(df, 'valor').tolist() == [2, 3, 0, 1]
+    assert ordenar_posicoes(df, 'valor', crescente=False).tolist() == [0, 3, 2, 1]
+
+
+def test_csv_em_lotes_igual_ao_csv_inteiro(contratos):
+    esperado = formatar_tabela_contratos(contratos).to_csv(index=False).encode('utf-8')
+
+    assert exportar_csv_contratos(contratos, tamanho_lote=3) == esperado
+
+
+@pytest.mark.skipif(contratos_reais.pq is None, reason="pyarrow não instalado")
+def test_parquet_em_lotes_le_todas_as_linhas(contratos):
+    conteudo = exportar_parquet_contratos(contratos, tamanho_lote=3)
+
+    lido = pd.read_parquet(io.BytesIO(conteudo))
+    assert isinstance(conteudo, bytes)
+    assert len(lido) == len(contratos)
+    assert lido['orderId'].tolist()[:2] == ['1017', 'PED-88']
+
@@ -0,0 +1,26 @@
+"""DRE simulado do modelo NumPy igual ao gerado linha a linha antes do modelo"""
+
+import json
+import os
+
+import pytest
+
+from dre_modelo import MULTIPLICADORES_DRE, gerar_dre_simulado
+
+# Tabelas de gerar_dados_dre(unidade, 2025) antes de dre_modelo: cada linha com round(..., 1)
+with open(os.path.join(os.path.dirname(__file__), 'dre_simulado_original.json'), encoding='utf-8') as arquivo:
+    DRE_ORIGINAL = json.load(arquivo)
+
+
+def test_snapshot_cobre_todas_as_unidades():
+    assert set(DRE_ORIGINAL) == set(MULTIPLICADORES_DRE)
+
+
+def test_todas_as_unidades_numa_avaliacao_igual_ao_original():
+    assert gerar_dre_simulado() == DRE_ORIGINAL
+
+
+@pytest.mark.parametrize('unidade', list(MULTIPLICADORES_DRE))
+def test_unidade_sozinha_igual_ao_original(unidade):
+    # Como app.gerar_dados_dre chama o modelo
+    assert gerar_dre_simulado((unidade,))[unidade] == DRE_ORIGINAL[unidade]
@@ -0,0 +1,57 @@
+"""Loaders financeiros do MongoDB: campos e filtros iguais aos da sincronização"""
+
+import pandas as pd
+import pytest
+
+import mongodb_connector
+from dados_finances import instalar_backends
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    instalar_backends(monkeypatch)
+
+
+def test_lancamentos_ignorados_ficam_de_fora(backends):
+    nomes = set(mongodb_connector._load_finances_data_mongo(None)['name'])
+
+    assert 'Estornado' not in nomes
+    assert 'Aluguel' in nomes
+
+
+def test_amount_vem_de_value_e_categoria_de_category(backends):
+    df = mongodb_connector._load_finances_data_mongo(2025).set_index('name')
+
+    assert df.loc['Venda', 'amount'] == 1000.0
+    assert df.loc['Folha', 'categoryName'] == 'DESPESAS ADMINISTRATIVAS'
+    assert pd.isna(df.loc['Sem categoria', 'categoryName'])
+
+
+def test_filtro_de_ano_sobre_a_data_em_texto(backends):
+    df = mongodb_connector._load_finances_data_mongo(2024)
+
+    assert df['name'].tolist() == ['Venda dezembro']
+    # 23h de Brasília continua em dezembro
+    assert df['date'].iloc[0] == pd.Timestamp('2024-12-31 23:00:00')
+    assert 'Data inválida' not in set(mongodb_connector._load_finances_data_mongo(2025)['name'])
+
+
+def test_metricas_mensais_mongo(backends):
+    metricas = mongodb_connector._calculate_financial_metrics_mongo(2025)
+
+    assert metricas[1]['receitas'] == 1000.0
+    assert metricas[1]['despesas'] == 300.0
+    assert metricas[1]['despesas_operacionais'] == 300.0
+    # Fevereiro: o lançamento ignorado e o de data inválida não entram
+    assert metricas[2]['despesas'] == 150.0
+    assert metricas[3]['despesas_financeiras'] == 50.0
+    assert metricas[3]['receitas'] == 20.0
+
+
+def test_despesas_administrativas_mongo(backends):
+    despesas = mongodb_connector._load_expenses_from_finances_mongo(2025)
+
+    assert despesas['pessoal_beneficios'] == 300.0
+    assert despesas['despesas_admin'] == 150.0
+    assert despesas['despesas_operacionais'] == 450.0
+    assert despesas['total_documentos'] == 2
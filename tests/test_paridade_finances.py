@@ -0,0 +1,29 @@
+"""Paridade entre os loaders financeiros do MongoDB e do espelho PostgreSQL"""
+
+import pandas as pd
+import pytest
+
+import finances_postgres
+import mongodb_connector
+from dados_finances import instalar_backends
+
+COLUNAS_COMPARADAS = ['_id', 'date', 'month', 'year', 'amount', 'categoryName', 'categoryType']
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    instalar_backends(monkeypatch)
+
+
+def _normalizar(df):
+    df = df.assign(_id=df['_id'].astype(str), date=df['date'].astype('datetime64[us]'))
+    df = df[COLUNAS_COMPARADAS].sort_values('_id', ignore_index=True)
+    return df.astype({'month': float, 'year': float, 'categoryName': object, 'categoryType': object})
+
+
+@pytest.mark.parametrize('ano', [None, 2025, 2024])
+def test_load_finances_data_igual_nos_dois_backends(backends, ano):
+    df_mongo = mongodb_connector._load_finances_data_mongo(ano)
+    df_pg = finances_postgres.load_finances_data_pg(ano)
+
+    pd.testing.assert_frame_equal(_normalizar(df_mongo), _normalizar(df_pg))
@@ -0,0 +1,54 @@
+"""Paridade das agregações SQL de finances_postgres com os loaders MongoDB (PostgreSQL real)"""
+
+from datetime import datetime
+
+import pytest
+
+import finances_postgres
+import mongodb_connector
+from bancos_falsos import BancoMongoFalso
+from dados_finances import CATEGORIAS, FINANCES, instalar_mongo
+from sync_financials import (
+    CRIAR_FINANCES, CRIAR_FINANCES_CATEGORIES, FILTRO_FINANCES, INSERT_FINANCES,
+    INSERT_FINANCES_CATEGORIES, execute_values, transformar_categoria, transformar_finances_colunar
+)
+
+
+@pytest.fixture
+def backends(monkeypatch, pg_conexao):
+    """MongoDB falso e o espelho gravado num PostgreSQL real com as instruções do sync"""
+    instalar_mongo(monkeypatch)
+    registros, _ = transformar_finances_colunar(BancoMongoFalso(finances=FINANCES).finances.find(FILTRO_FINANCES))
+    with pg_conexao.cursor() as cur:
+        cur.execute("SET TIME ZONE 'UTC';")
+        cur.execute(CRIAR_FINANCES)
+        cur.execute(CRIAR_FINANCES_CATEGORIES)
+        execute_values(cur, INSERT_FINANCES, registros)
+        execute_values(cur, INSERT_FINANCES_CATEGORIES, [transformar_categoria(doc) for doc in CATEGORIAS])
+    pg_conexao.commit()
+    monkeypatch.setattr(finances_postgres, 'get_pg_connection', lambda: pg_conexao)
+
+
+@pytest.mark.parametrize('ano', [None, 2025, 2024])
+def test_metricas_mensais_iguais(backends, ano):
+    metricas_mongo = mongodb_connector._calculate_financial_metrics_mongo(ano)
+    metricas_pg = finances_postgres.calculate_financial_metrics_pg(ano)
+
+    assert set(metricas_mongo) == set(metricas_pg) == set(range(1, 13))
+    for mes in range(1, 13):
+        assert metricas_pg[mes] == pytest.approx(metricas_mongo[mes]), mes
+
+
+@pytest.mark.parametrize('ano, mes', [(2025, None), (2025, 1), (2025, 2), (2024, None), (2024, 5)])
+def test_despesas_administrativas_iguais(backends, ano, mes):
+    despesas_mongo = mongodb_connector._load_expenses_from_finances_mongo(ano, mes)
+    despesas_pg = finances_postgres.load_expenses_from_finances_pg(ano, mes)
+
+    assert despesas_pg == pytest.approx(despesas_mongo)
+
+
+def test_mes_sem_ano_usa_o_ano_corrente():
+    inicio, fim = finances_postgres._intervalo(month=12)
+
+    assert (inicio.year, inicio.month) == (datetime.now(finances_postgres.FUSO_BRT).year, 12)
+    assert (fim.year, fim.month) == (inicio.year + 1, 1)
@@ -0,0 +1,30 @@
+"""Resumo inicial: opções dos filtros e anos lidos do disco na primeira página"""
+
+import json
+
+from resumo_inicial import gravar_resumo, opcoes_iniciais, resumo_do_ano
+
+FILTROS = {
+    'graos': ['Milho', 'Soja'], 'status': ['Ativo', 'Vencido'], 'anos': [2025, 2024],
+    'vendedores': ['Fazenda A'], 'compradores': ['Fox'], 'total_contracts': 2
+}
+
+
+def test_opcoes_iniciais_do_resumo(tmp_path):
+    caminho = str(tmp_path / 'resumo.json')
+    gravar_resumo({2025: {'receita_bruta': 10, 'outro': 1}}, caminho, filtros=FILTROS, anos_disponiveis=[2025, 2024])
+
+    assert opcoes_iniciais(caminho) == {
+        'filtros': {campo: valor for campo, valor in FILTROS.items() if campo != 'total_contracts'},
+        'anos': [2025, 2024]
+    }
+    assert resumo_do_ano(2025, caminho)['receita_bruta'] == 10.0
+
+
+def test_resumo_sem_filtros_consulta_o_mongo(tmp_path):
+    caminho = tmp_path / 'resumo.json'
+    assert opcoes_iniciais(str(caminho)) is None
+
+    # Arquivo gravado antes das opções de filtros fazerem parte do resumo
+    caminho.write_text(json.dumps({'gerado_em': '2025-01-01T00:00:00', 'anos': {}}))
+    assert opcoes_iniciais(str(caminho)) is None
@@ -0,0 +1,68 @@
+"""Transformação colunar de 'finances' igual ao laço por documento original"""
+
+import json
+from datetime import timezone
+
+from bson import ObjectId
+
+from sync_financials import parse_date, safe_val, transformar_finances_colunar
+
+PEDIDO = ObjectId()
+
+
+def registro_legado(doc):
+    """Laço por documento anterior à transformação colunar, com a data convertida para UTC sem fuso"""
+    data = parse_date(doc.get("date"))
+    return (
+        safe_val(doc.get("_id")),
+        data.astimezone(timezone.utc).replace(tzinfo=None) if data else None,
+        safe_val(doc.get("name")),
+        doc.get("value"),
+        safe_val(doc.get("category")),
+        safe_val(doc.get("account_id")),
+        [str(o) for o in doc.get("orders") or []],
+        bool(doc.get("isForecast", False))
+    )
+
+
+def test_igual_ao_laco_por_documento():
+    categoria = ObjectId()
+    docs = [
+        {"_id": ObjectId(), "date": "20250115103000", "name": "Venda", "value": 10.5, "category": categoria,
+         "account_id": "conta", "orders": [ObjectId(), ObjectId()], "isForecast": True},
+        {"_id": ObjectId(), "date": "20241231", "name": 'Aspas " e\nquebra', "value": -3, "category": categoria,
+         "orders": [PEDIDO]},
+        {"_id": "id-texto", "date": "20250301000000", "value": 0, "category": "categoria-texto",
+         "account_id": "conta-2", "orders": ["pedido-texto"], "isForecast": False},
+        {"_id": ObjectId(), "date": "20250302", "value": 1.0, "orders": []}
+    ]
+
+    registros, pares = transformar_finances_colunar(docs)
+
+    obtidos = [(*registro[:6], json.loads(registro[6]), registro[7]) for registro in registros]
+    assert obtidos == [registro_legado(doc) for doc in docs]
+    assert pares == [
+        (str(docs[0]["_id"]), str(docs[0]["orders"][0])),
+        (str(docs[0]["_id"]), str(docs[0]["orders"][1])),
+        (str(docs[1]["_id"]), str(PEDIDO)),
+        ("id-texto", "pedido-texto")
+    ]
+
+
+def test_ausentes_invalidos_e_pedidos_repetidos():
+    docs = [
+        {"_id": ObjectId(), "date": "20250230", "name": None, "value": float("nan"), "category": None,
+         "orders": [PEDIDO, PEDIDO, None], "isForecast": float("nan")},
+        {"_id": ObjectId(), "date": "", "account_id": 12, "orders": None},
+        {"_id": ObjectId()}
+    ]
+
+    registros, pares = transformar_finances_colunar(docs)
+
+    assert [registro[1:] for registro in registros] == [
+        (None, None, None, None, None, f'["{PEDIDO}", "{PEDIDO}"]', False),
+        (None, None, None, None, '12', '[]', False),
+        (None, None, None, None, None, '[]', False)
+    ]
+    assert pares == [(str(docs[0]["_id"]), str(PEDIDO))]
+    assert transformar_finances_colunar([]) == ([], [])
@@ -0,0 +1,31 @@
+"""Conferência mensal MongoDB x PostgreSQL de verificar_sincronizacao_financeira"""
+
+from bson import ObjectId
+
+from bancos_falsos import BancoMongoFalso, CursorEspelhoFalso
+from sync_financials import comparar_resumos_mensais, resumo_mensal_mongo, resumo_mensal_postgres
+
+FINANCES = [
+    {'_id': ObjectId(), 'date': '20250115103000', 'value': 100.0},
+    {'_id': ObjectId(), 'date': '20250131235900', 'value': 10.0},
+    {'_id': ObjectId(), 'date': '20250230', 'value': -70.0},        # dia inexistente
+    {'_id': ObjectId(), 'date': '2025021x', 'value': 5.0},          # não numérica
+    {'_id': ObjectId(), 'date': '20250301', 'value': -40.0},
+    {'_id': ObjectId(), 'value': 1.0},                              # sem data
+    {'_id': ObjectId(), 'date': '20250310', 'value': 999.0, 'isIgnored': True}
+]
+
+
+def test_datas_invalidas_no_mesmo_balde_dos_dois_lados():
+    resumo_mongo = resumo_mensal_mongo(BancoMongoFalso(finances=FINANCES))
+    resumo_pg = resumo_mensal_postgres(CursorEspelhoFalso(FINANCES))
+
+    assert resumo_mongo == {'202501': (2, 110.0), '202503': (1, -40.0), '': (3, -64.0)}
+    assert comparar_resumos_mensais(resumo_mongo, resumo_pg) == []
+
+
+def test_mes_divergente_detectado():
+    resumo_mongo = resumo_mensal_mongo(BancoMongoFalso(finances=FINANCES))
+    resumo_pg = resumo_mensal_postgres(CursorEspelhoFalso(FINANCES[:-3]))
+
+    assert comparar_resumos_mensais(resumo_mongo, resumo_pg) == ['', '202503']